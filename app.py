@@ -1,9 +1,120 @@
+import argparse
+import asyncio
+import sys
+
+from batch import run_batch
 from console_dialogue import ConsoleDialogue
+from field import Field
+from instrumentation import enable_instrumentation, get_stage_stats, format_stage_stats
+from service import SimulationService, run_server
+from workloads import SCENARIO_WRITERS, TAPE_LENGTH_DISTRIBUTIONS, generate_scenarios
 
+_FILE_BUFFER_SIZE = 1 << 20
 
-if __name__ == "__main__":
-    try:
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Auto Driving Car Simulation")
+    parser.add_argument("--profile", action="store_true",
+                        help="print the time spent in each simulation stage to stderr on exit")
+    subparsers = parser.add_subparsers(dest="command")
+
+    batch_parser = subparsers.add_parser("batch", help="run scenarios from a file without prompting")
+    batch_parser.add_argument("input", nargs="?", default="-",
+                              help="scenario file in line-based or JSONL format, or - for stdin")
+    batch_parser.add_argument("--output-format", choices=["jsonl", "text"], default="jsonl")
+    batch_parser.add_argument("--engine", choices=Field.ENGINES, default="python")
+    batch_parser.add_argument("--workers", type=int, default=1,
+                              help="number of worker processes, 0 for one per CPU")
+    batch_parser.add_argument("--chunk-size", type=int, default=64,
+                              help="scenarios sent to a worker at a time")
+
+    serve_parser = subparsers.add_parser("serve", help="answer JSON scenario requests over a socket")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8765)
+    serve_parser.add_argument("--unix-socket", help="listen on this Unix socket path instead of TCP")
+    serve_parser.add_argument("--engine", choices=Field.ENGINES, default="python")
+    serve_parser.add_argument("--workers", type=int, default=0,
+                              help="number of worker processes, 0 for one per CPU")
+    serve_parser.add_argument("--max-batch-size", type=int, default=64,
+                              help="scenarios sent to a worker at a time")
+    serve_parser.add_argument("--batch-delay-ms", type=float, default=2.0,
+                              help="time to wait for more requests before sending a batch")
+    serve_parser.add_argument("--max-pending", type=int, default=1024,
+                              help="requests queued before connections stop being read")
+
+    generate_parser = subparsers.add_parser("generate", help="write seeded synthetic scenarios for load testing")
+    generate_parser.add_argument("--scenarios", type=int, default=1)
+    generate_parser.add_argument("--width", type=int, default=100)
+    generate_parser.add_argument("--height", type=int, default=100)
+    generate_parser.add_argument("--cars", type=int, default=100)
+    generate_parser.add_argument("--start-density", type=float,
+                                 help="share of cells taken in the block the cars start in; spread over the field "
+                                      "by default")
+    generate_parser.add_argument("--tape-length", type=int, default=100, help="mean number of commands per car")
+    generate_parser.add_argument("--tape-distribution", choices=list(TAPE_LENGTH_DISTRIBUTIONS), default="fixed")
+    generate_parser.add_argument("--forward-ratio", type=float, default=0.6)
+    generate_parser.add_argument("--collision-rate", type=float, default=0.0,
+                                 help="share of cars that collide, all on their first step; the other cars keep to "
+                                      "lanes of their own, so dense starts leave them less room to drive forward")
+    generate_parser.add_argument("--seed", type=int, default=0)
+    generate_parser.add_argument("--output-format", choices=list(SCENARIO_WRITERS), default="jsonl")
+
+    args = parser.parse_args(argv)
+    if args.profile:
+        enable_instrumentation()
+
+    if args.command == "batch":
+        _run_batch_command(args)
+    elif args.command == "serve":
+        _run_serve_command(args)
+    elif args.command == "generate":
+        _run_generate_command(args)
+    else:
         app = ConsoleDialogue()
         app.run()
+
+    if args.profile:
+        for line in format_stage_stats(get_stage_stats()):
+            print(line, file=sys.stderr)
+
+
+def _run_batch_command(args):
+    workers = args.workers or None
+    if args.input == "-":
+        summary = run_batch(sys.stdin, sys.stdout, args.output_format, args.engine, workers, args.chunk_size)
+    else:
+        with open(args.input, encoding="utf-8", buffering=_FILE_BUFFER_SIZE) as scenario_file:
+            summary = run_batch(scenario_file, sys.stdout, args.output_format, args.engine, workers, args.chunk_size)
+
+    print(f"Processed {summary['scenarios']} scenarios ({summary['failed']} failed) "
+          f"in {summary['seconds']:.2f}s, {summary['scenarios_per_second']:.1f} scenarios/s", file=sys.stderr)
+
+
+def _run_generate_command(args):
+    scenarios = generate_scenarios(args.scenarios, args.width, args.height, args.cars, args.start_density,
+                                   args.tape_length, args.tape_distribution, args.forward_ratio, args.collision_rate,
+                                   args.seed)
+    SCENARIO_WRITERS[args.output_format](scenarios, sys.stdout)
+
+
+def _run_serve_command(args):
+    service = SimulationService(args.engine, args.workers or None, args.max_batch_size, args.batch_delay_ms / 1000,
+                                args.max_pending)
+    address = args.unix_socket or f"{args.host}:{args.port}"
+    try:
+        asyncio.run(run_server(service, args.host, args.port, args.unix_socket,
+                               lambda _server: print(f"Listening on {address}", file=sys.stderr)))
+    except KeyboardInterrupt:
+        pass
+
+    stats = service.get_stats()
+    latency = ", ".join(f"{name} {value:.1f}ms" for name, value in stats["latency_ms"].items())
+    print(f"Served {stats['requests']} requests ({stats['failed']} failed) in {stats['batches']} batches, "
+          f"latency {latency}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    try:
+        main()
     except Exception as exception:
         print(f"Failed to process: {exception}")
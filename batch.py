@@ -0,0 +1,213 @@
+import json
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from field import Field
+from instrumentation import is_instrumentation_enabled, enable_instrumentation, get_stage_stats, merge_stage_stats
+
+_DIMENSIONS_PATTERN = re.compile(r"^(\d+) (\d+)$")
+_CAR_LINE_PATTERN = re.compile(r"^(.+?) (\d+ \d+ [nsewNSEW])(?: ([flrFLR0-9()xX]*))?$")
+_WRITE_BATCH_SIZE = 1000
+_DEFAULT_CHUNK_SIZE = 64
+PENDING_CHUNKS_PER_WORKER = 2
+
+
+def read_scenarios(lines):
+    scenario_count = 0
+    scenario_lines = []
+
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if not line.strip():
+            if scenario_lines:
+                scenario_count += 1
+                yield _parse_text_scenario(scenario_lines, scenario_count)
+                scenario_lines = []
+            continue
+
+        if not scenario_lines and line.lstrip().startswith("{"):
+            scenario_count += 1
+            yield _parse_json_scenario(line, scenario_count)
+            continue
+
+        scenario_lines.append(line)
+
+    if scenario_lines:
+        scenario_count += 1
+        yield _parse_text_scenario(scenario_lines, scenario_count)
+
+
+def build_field(scenario, engine="python"):
+    width, height = scenario["width"], scenario["height"]
+    if not isinstance(width, int) or not isinstance(height, int) or width < 0 or height < 0:
+        raise ValueError(f"Invalid field dimensions {width} x {height}")
+    if not scenario["cars"]:
+        raise ValueError("There are no cars in the scenario")
+
+    field = Field(width, height, engine=engine)
+    errors = field.add_cars((car["name"], car["position"], car.get("commands", "")) for car in scenario["cars"])
+    if errors:
+        _row, message = errors[0]
+        raise ValueError(message)
+
+    return field
+
+
+def run_scenario(scenario, engine="python"):
+    if "error" in scenario:
+        return {"id": scenario["id"], "error": scenario["error"]}
+
+    try:
+        results = build_field(scenario, engine).get_simulated_results()
+    except Exception as exception:
+        return {"id": scenario["id"], "error": f"{type(exception).__name__}: {exception}"}
+
+    return {"id": scenario["id"], "results": results}
+
+
+def run_scenarios_in_pool(scenarios, workers=None, chunk_size=_DEFAULT_CHUNK_SIZE, engine="python"):
+    workers = workers or os.cpu_count() or 1
+    max_pending = workers * PENDING_CHUNKS_PER_WORKER
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in _chunk(scenarios, chunk_size):
+            pending.append((chunk, executor.submit(run_scenario_chunk, chunk, engine, is_instrumentation_enabled())))
+            if len(pending) >= max_pending:
+                yield from collect_chunk(*pending.popleft())
+
+        while pending:
+            yield from collect_chunk(*pending.popleft())
+
+
+def write_records(records, output, output_format="jsonl"):
+    format_record = _RECORD_FORMATTERS[output_format]
+
+    record_count = 0
+    pending = []
+    for record in records:
+        pending.append(format_record(record))
+        record_count += 1
+        if len(pending) >= _WRITE_BATCH_SIZE:
+            output.write("".join(pending))
+            pending = []
+
+    if pending:
+        output.write("".join(pending))
+    output.flush()
+
+    return record_count
+
+
+def run_batch(lines, output, output_format="jsonl", engine="python", workers=1, chunk_size=_DEFAULT_CHUNK_SIZE):
+    started = time.perf_counter()
+    summary = {"scenarios": 0, "failed": 0}
+
+    scenarios = read_scenarios(lines)
+    if workers == 1:
+        records = (run_scenario(scenario, engine) for scenario in scenarios)
+    else:
+        records = run_scenarios_in_pool(scenarios, workers, chunk_size, engine)
+    write_records(_count_records(records, summary), output, output_format)
+
+    summary["seconds"] = time.perf_counter() - started
+    summary["scenarios_per_second"] = summary["scenarios"] / summary["seconds"] if summary["seconds"] else 0.0
+    return summary
+
+
+def run_scenario_chunk(scenarios, engine, instrumentation_enabled):
+    if instrumentation_enabled:
+        enable_instrumentation()
+    records = [run_scenario(scenario, engine) for scenario in scenarios]
+    return records, get_stage_stats()
+
+
+def collect_chunk(chunk, future):
+    try:
+        records, stage_stats = future.result()
+        merge_stage_stats(stage_stats)
+        return records
+    except Exception as exception:
+        error = f"Worker failed: {type(exception).__name__}: {exception}"
+        return [{"id": scenario["id"], "error": error} for scenario in chunk]
+
+
+def _chunk(items, chunk_size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _count_records(records, summary):
+    for record in records:
+        summary["scenarios"] += 1
+        if "error" in record:
+            summary["failed"] += 1
+        yield record
+
+
+def _parse_json_scenario(line, scenario_count):
+    try:
+        scenario = json.loads(line)
+    except json.JSONDecodeError as exception:
+        return {"id": str(scenario_count), "error": f"Invalid JSON: {exception}"}
+
+    return parse_scenario_object(scenario, scenario_count)
+
+
+def parse_scenario_object(scenario, scenario_count):
+    if not isinstance(scenario, dict):
+        return {"id": str(scenario_count), "error": "Scenario must be a JSON object"}
+
+    scenario_id = str(scenario.get("id", scenario_count))
+    if "width" not in scenario or "height" not in scenario:
+        return {"id": scenario_id, "error": "Scenario is missing the field width or height"}
+
+    return {
+        "id": scenario_id,
+        "width": scenario["width"],
+        "height": scenario["height"],
+        "cars": scenario.get("cars", [])
+    }
+
+
+def _parse_text_scenario(scenario_lines, scenario_count):
+    scenario_id = str(scenario_count)
+
+    dimensions = _DIMENSIONS_PATTERN.match(scenario_lines[0].strip())
+    if not dimensions:
+        return {"id": scenario_id, "error": f"Invalid field dimensions \"{scenario_lines[0]}\""}
+
+    cars = []
+    for car_line in scenario_lines[1:]:
+        car_match = _CAR_LINE_PATTERN.match(car_line.strip())
+        if not car_match:
+            return {"id": scenario_id, "error": f"Invalid car line \"{car_line}\""}
+        name, initial_pos, commands = car_match.groups()
+        cars.append({"name": name, "position": initial_pos, "commands": commands or ""})
+
+    return {"id": scenario_id, "width": int(dimensions[1]), "height": int(dimensions[2]), "cars": cars}
+
+
+def _format_jsonl_record(record):
+    return json.dumps(record) + "\n"
+
+
+def _format_text_record(record):
+    if "error" in record:
+        return f"Scenario {record['id']}: Failed to process: {record['error']}\n\n"
+    return f"Scenario {record['id']}:\n" + "\n".join(record["results"]) + "\n\n"
+
+
+_RECORD_FORMATTERS = {
+    "jsonl": _format_jsonl_record,
+    "text": _format_text_record
+}
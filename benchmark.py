@@ -0,0 +1,156 @@
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+from datetime import datetime, timezone
+
+from car import Car
+from utils import get_max_steps, synchronise_paths, generate_collisions, generate_incident_reports
+from vectorized import is_numpy_available, generate_collisions_vectorized
+
+WORKLOADS = {
+    "sparse": {"width": 1000, "height": 1000, "cars": 1000, "tape_length": 200, "forward_ratio": 0.6,
+               "layout": "random"},
+    "dense": {"width": 60, "height": 60, "cars": 1800, "tape_length": 200, "forward_ratio": 0.6,
+              "layout": "random"},
+    "long_tapes": {"width": 500, "height": 500, "cars": 100, "tape_length": 5000, "forward_ratio": 0.5,
+                   "layout": "random"},
+    "uneven_tapes": {"width": 300, "height": 300, "cars": 1000, "tape_length": 2000, "forward_ratio": 0.5,
+                     "layout": "uneven"},
+    "converging": {"width": 401, "height": 401, "cars": 800, "tape_length": 200, "forward_ratio": 1.0,
+                   "layout": "converging"},
+}
+
+
+def generate_cars(width, height, cars, tape_length, forward_ratio=0.6, layout="random", seed=0):
+    rng = random.Random(seed)
+    if layout == "converging":
+        return _generate_converging_cars(width, height, cars)
+
+    car_list = []
+    for index, cell in enumerate(rng.sample(range(width * height), min(cars, width * height))):
+        if layout == "uneven":
+            commands_count = int(tape_length * rng.random() ** 4)
+        else:
+            commands_count = tape_length
+        commands = "".join(_random_command(rng, forward_ratio) for _ in range(commands_count))
+        car_list.append(Car(f"car {index}", f"{cell % width} {cell // width} {rng.choice('NESW')}", commands))
+    return car_list
+
+
+def run_workload(car_list, width, height, repeat=3):
+    stages = {}
+    for _ in range(repeat):
+        started = time.perf_counter()
+        cars_data = {}
+        for car in car_list:
+            path, _destination = car.get_path_and_destination()
+            cars_data[car.name] = path
+        _record_stage(stages, "get_path_and_destination", started)
+
+        started = time.perf_counter()
+        max_steps = get_max_steps(cars_data)
+        synced_paths = synchronise_paths(cars_data, max_steps)
+        _record_stage(stages, "synchronise_paths", started)
+
+        started = time.perf_counter()
+        collisions = generate_collisions(synced_paths, max_steps, width, height)
+        _record_stage(stages, "generate_collisions", started)
+
+        started = time.perf_counter()
+        generate_collisions(synced_paths, max_steps, width, height, use_grid=True)
+        _record_stage(stages, "generate_collisions_grid", started)
+
+        if is_numpy_available():
+            started = time.perf_counter()
+            generate_collisions_vectorized(synced_paths, max_steps, width, height)
+            _record_stage(stages, "generate_collisions_vectorized", started)
+
+        started = time.perf_counter()
+        reports = generate_incident_reports(collisions)
+        _record_stage(stages, "generate_incident_reports", started)
+
+    return {
+        "max_steps": max_steps,
+        "incidents": len(reports),
+        "stages": {name: _summarise(timings) for name, timings in stages.items()}
+    }
+
+
+def run_benchmarks(workload_names, repeat=3, scale=1.0, seed=0):
+    results = []
+    for name in workload_names:
+        parameters = dict(WORKLOADS[name])
+        parameters["cars"] = max(2, int(parameters["cars"] * scale))
+        car_list = generate_cars(seed=seed, **parameters)
+        result = run_workload(car_list, parameters["width"], parameters["height"], repeat)
+        results.append({"workload": name, "parameters": parameters, **result})
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": is_numpy_available(),
+        "repeat": repeat,
+        "scale": scale,
+        "seed": seed,
+        "results": results
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the simulation pipeline on synthetic fleets")
+    parser.add_argument("--workload", action="append", choices=list(WORKLOADS), dest="workloads",
+                        help="workload to run, can be repeated; all of them by default")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplier applied to the number of cars")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON results to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.workloads or list(WORKLOADS), args.repeat, args.scale, args.seed)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(report, output_file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    for result in report["results"]:
+        stage_times = ", ".join(f"{name} {stage['min']:.4f}s" for name, stage in result["stages"].items())
+        print(f"{result['workload']}: {stage_times}", file=sys.stderr)
+
+
+def _generate_converging_cars(width, height, cars):
+    center_x, center_y = width // 2, height // 2
+    headings = [('E', -1, 0), ('W', 1, 0), ('N', 0, -1), ('S', 0, 1)]
+
+    car_list = []
+    for index in range(cars):
+        direction, offset_x, offset_y = headings[index % len(headings)]
+        distance = index // len(headings) + 1
+        x, y = center_x + offset_x * distance, center_y + offset_y * distance
+        if not (0 <= x < width and 0 <= y < height):
+            break
+        car_list.append(Car(f"car {index}", f"{x} {y} {direction}", "F" * distance))
+    return car_list
+
+
+def _random_command(rng, forward_ratio):
+    if rng.random() < forward_ratio:
+        return "F"
+    return rng.choice("LR")
+
+
+def _record_stage(stages, name, started):
+    stages.setdefault(name, []).append(time.perf_counter() - started)
+
+
+def _summarise(timings):
+    return {"min": min(timings), "mean": sum(timings) / len(timings), "runs": len(timings)}
+
+
+if __name__ == "__main__":
+    main()
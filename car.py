@@ -1,11 +1,10 @@
+from kernel import DIRECTIONS, DIRECTION_CODES, FORWARD, LEFT, RIGHT, STEP_TABLE
+from tapes import compile_tape, iter_run_positions, get_runs_final_state, get_runs_wall_collision, \
+    get_runs_last_move_step
+
+
 class Car:
-    _DIRECTIONS_ORDER = ['N', 'E', 'S', 'W']
-    _MOVE_OFFSETS = {
-        'N': (0, 1),
-        'E': (1, 0),
-        'S': (0, -1),
-        'W': (-1, 0)
-    }
+    __slots__ = ("name", "initial_position", "position", "direction", "_commands", "_runs")
 
     def __init__(self, car_name, initial_pos, commands):
         self.name = car_name
@@ -13,43 +12,63 @@ class Car:
         [x, y, direction] = initial_pos.split(" ")
         self.position = (int(x), int(y))
         self.direction = direction.upper()
-        self.commands = list(commands.upper())
-        self._INSTRUCTIONS = {
-            'F': self._move_forward,
-            'L': self._turn_left,
-            'R': self._turn_right
-        }
+        self._commands = commands.upper().encode("ascii")
+        self._runs = None
+
+    @property
+    def commands(self):
+        return list(self._commands.decode("ascii"))
+
+    def get_runs(self):
+        if self._runs is None:
+            self._runs = compile_tape(self._commands.decode("ascii"))
+        return self._runs
 
     def get_path_and_destination(self):
-        path = [self.position]
-        for command in self.commands:
-            self._INSTRUCTIONS[command]()
-            path.append(self.position)
+        return list(self.iter_positions()), self.get_destination()
 
-        destination = f"{self.position} {self.direction}"
-        self._reset_position()
-        return path, destination
+    def iter_positions(self):
+        x, y = self.position
+        yield x, y
+        yield from iter_run_positions(self.get_runs(), x, y, DIRECTION_CODES[self.direction])
 
-    def _move_forward(self):
-        current_x, current_y = self.position
-        delta_x, delta_y = self._MOVE_OFFSETS[self.direction]
+    def get_destination(self):
+        position, direction = self.get_final_state()
+        return f"{position} {direction}"
 
-        new_x = current_x + delta_x
-        new_y = current_y + delta_y
+    def get_final_state(self):
+        x, y, direction_index = get_runs_final_state(self.get_runs(), *self.position,
+                                                     DIRECTION_CODES[self.direction])
+        return (x, y), DIRECTIONS[direction_index]
 
-        self.position = (new_x, new_y)
+    def get_wall_collision(self, width, height):
+        x, y = self.position
+        if not (0 <= x < width and 0 <= y < height):
+            return 0, (x, y)
+        return get_runs_wall_collision(self.get_runs(), x, y, DIRECTION_CODES[self.direction], width,
+                                       height)
+
+    def get_last_active_step(self, width, height):
+        # Nothing changes for a car after it leaves the field or makes its last move, so its path can stop there
+        wall_step, _position = self.get_wall_collision(width, height)
+        if wall_step > 0:
+            return wall_step
+        return get_runs_last_move_step(self.get_runs())
+
+    def _move_forward(self):
+        self._step(FORWARD)
 
     def _turn_left(self):
-        current_index = self._DIRECTIONS_ORDER.index(self.direction)
-        new_index = (current_index - 1) % len(self._DIRECTIONS_ORDER)
-        self.direction = self._DIRECTIONS_ORDER[new_index]
+        self._step(LEFT)
 
     def _turn_right(self):
-        current_index = self._DIRECTIONS_ORDER.index(self.direction)
-        new_index = (current_index + 1) % len(self._DIRECTIONS_ORDER)
-        self.direction = self._DIRECTIONS_ORDER[new_index]
+        self._step(RIGHT)
 
-    def _reset_position(self):
-        [x, y, direction] = self.initial_position.split(" ")
-        self.position = (int(x), int(y))
-        self.direction = direction.upper()
+    def _step(self, command):
+        state, delta_x, delta_y = STEP_TABLE[DIRECTION_CODES[self.direction] << 2 | command]
+        # Only what the command changed is written back, so a fleet car records one change per step
+        if command == FORWARD:
+            x, y = self.position
+            self.position = (x + delta_x, y + delta_y)
+        else:
+            self.direction = DIRECTIONS[state >> 2]
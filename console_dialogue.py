@@ -1,7 +1,9 @@
 import re
+import sys
 
 from field import Field
-from utils import is_initial_pos_out_of_bound
+from results import write_results_text
+from utils import is_initial_pos_out_of_bound, is_initial_pos_valid, is_commands_valid
 
 
 class ConsoleDialogue:
@@ -73,7 +75,7 @@ class ConsoleDialogue:
         print(f"\nPlease enter initial position of {car_name} in x y Direction format:")
         while True:
             initial_pos = input("")
-            if not re.match(r"^\d+ \d+ [nsewNSEW]$", initial_pos):
+            if not is_initial_pos_valid(initial_pos):
                 print("Please enter a valid position in x y Direction format (i.e \"1 2 N\"):")
                 continue
             if is_initial_pos_out_of_bound(initial_pos, self.field.width, self.field.height):
@@ -84,9 +86,10 @@ class ConsoleDialogue:
         print(f"Please enter the commands for {car_name}:")
         while True:
             commands = input("")
-            if re.match(r"^[flrFLR]*$", commands):
+            if is_commands_valid(commands):
                 break
-            print("Please enter valid commands (valid commands are: F L R)")
+            print("Please enter valid commands (valid commands are: F L R, optionally with a count such as F1000 "
+                  "or as a repeat group such as (FFR)x500)")
 
         self.field.add_car(car_name, initial_pos, commands)
         self._list_cars()
@@ -95,9 +98,7 @@ class ConsoleDialogue:
     def _simulation_stage(self):
         self._list_cars()
         print("\nAfter simulation, the result is:")
-
-        for line in self.field.get_simulated_results():
-            print(line)
+        write_results_text(self.field.get_simulated_records(), sys.stdout)
 
         print("\nPlease choose from the following options:\n"
               "[1] Start over\n"
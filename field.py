@@ -1,22 +1,115 @@
-from car import Car
-from utils import get_max_steps, synchronise_paths, generate_collisions, generate_incident_reports, \
-    get_single_car_collision
+from itertools import islice
+
+from fleet import Fleet, FleetCars
+from incremental import CollisionCheckpoint
+from results import CarResult
+from instrumentation import instrumented
+from parallel import generate_fleet_collisions_parallel
+from sharded import generate_collisions_sharded
+from tapes import expand_tape
+from timeline import Timeline
+from trajectories import write_trajectory_file
+from utils import get_total_steps, generate_collisions, generate_incident_records, generate_streamed_collisions, \
+    get_crash_steps, is_grid_suitable, parse_initial_pos, is_commands_valid, is_position_out_of_bounds
+from vectorized import generate_fleet_collisions_vectorized
 
 
 class Field:
-    def __init__(self, width, height):
+    _COLLISION_ENGINES = {
+        "python": generate_collisions
+    }
+    _VECTORIZED_ENGINE = "numpy"
+    _STREAMING_ENGINE = "streaming"
+    _SHARDED_ENGINE = "sharded"
+    # Only the reference engine keeps what it needs to re-check a car added after a run
+    _CHECKPOINTED_ENGINE = "python"
+    ENGINES = (*_COLLISION_ENGINES, _VECTORIZED_ENGINE, _STREAMING_ENGINE, _SHARDED_ENGINE)
+
+    def __init__(self, width, height, engine="python", checkpoint_interval=64, path_workers=1):
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unknown collision engine \"{engine}\"")
         self.width = width
         self.height = height
-        self.cars = []
+        self.engine = engine
+        # Timeline queries replay up to this many steps; smaller intervals answer faster but hold more states
+        self.checkpoint_interval = checkpoint_interval
+        # The numpy engine splits path generation across this many processes; None uses every core
+        self.path_workers = path_workers
+        self.path_cache_hits = 0
+        self.path_cache_misses = 0
+        self.result_cache_hits = 0
+        self.result_cache_misses = 0
+        self.incremental_runs = 0
+        self._fleet = Fleet()
+        self._path_cache = {}
+        self._result_cache = None
+        self._checkpoint = None
+        self._timeline = None
+
+    @property
+    def cars(self):
+        return FleetCars(self._fleet, self._check_car_position)
+
+    @cars.setter
+    def cars(self, cars):
+        fleet = Fleet()
+        FleetCars(fleet, self._check_car_position).extend(cars)
+        self._fleet = fleet
+        self._path_cache = {}
 
     def add_car(self, car_name, initial_pos, commands):
-        self.cars.append(Car(car_name, initial_pos, commands))
+        [x, y, direction] = initial_pos.split(" ")
+        if is_position_out_of_bounds((int(x), int(y)), self.width, self.height):
+            raise ValueError(f"Position \"{initial_pos}\" of {car_name} is out of bounds")
+        self._fleet.append(car_name, int(x), int(y), direction, commands)
+
+    def add_cars(self, cars):
+        names, xs, ys, directions, car_commands = [], [], [], [], []
+        errors = []
+        used_names = self._fleet.indexes
+        batch_names = set()
+        # Rows are checked in the same order as one-at-a-time input, so each row reports the error it would have hit;
+        # rejected rows are skipped and do not claim their name
+        for row, (name, initial_pos, commands) in enumerate(cars):
+            if name in used_names or name in batch_names:
+                errors.append((row, f"\"{name}\" is already used"))
+                continue
+            position = parse_initial_pos(initial_pos)
+            if position is None:
+                errors.append((row, f"Invalid position \"{initial_pos}\" for {name}"))
+                continue
+            x, y, direction = position
+            if is_position_out_of_bounds((x, y), self.width, self.height):
+                errors.append((row, f"Position \"{initial_pos}\" of {name} is out of bounds"))
+                continue
+            if not is_commands_valid(commands):
+                errors.append((row, f"Invalid commands \"{commands}\" for {name}"))
+                continue
+            batch_names.add(name)
+            names.append(name)
+            xs.append(x)
+            ys.append(y)
+            directions.append(direction)
+            car_commands.append(commands)
+
+        self._fleet.extend(names, xs, ys, directions, car_commands)
+        return errors
+
+    def update_car(self, car_name, initial_pos=None, commands=None):
+        index = self._fleet.indexes.get(car_name)
+        if index is None:
+            raise ValueError(f"Unknown car \"{car_name}\"")
+
+        car = self._fleet.get_car(index)
+        if initial_pos is None:
+            initial_pos = car.initial_position
+        if commands is None:
+            commands = self._fleet.get_commands(index)
+        [x, y, direction] = initial_pos.split(" ")
+        self._fleet.update(index, int(x), int(y), direction, commands)
 
     def is_car_name_used(self, name):
-        names = []
-        for car in self.cars:
-            names.append(car.name)
-        return name in names
+        return name in self._fleet.indexes
 
     def get_car_details(self):
         details = []
@@ -25,37 +118,161 @@ class Field:
         return details
 
     def get_simulated_results(self):
-        if len(self.cars) == 1:
-            return self._simulate_single_car()
-        return self._simulate_multiple_cars()
+        return [result.render() for result in self.get_simulated_records()]
+
+    @instrumented("simulation", lambda results, field: {"cars": len(field.cars)})
+    def get_simulated_records(self):
+        cache_key = (self.width, self.height, self.engine, self._fleet, self._fleet.version)
+        if self._result_cache is not None and self._result_cache[0] == cache_key:
+            self.result_cache_hits += 1
+            return list(self._result_cache[1])
+
+        self.result_cache_misses += 1
+        if len(self._fleet) == 1:
+            results, collisions = self._simulate_single_car()
+        else:
+            results, collisions = self._simulate_multiple_cars()
+        self._result_cache = (cache_key, results, collisions)
+        return list(results)
+
+    def get_timeline(self):
+        self.get_simulated_records()
+        cache_key, _results, collisions = self._result_cache
+        timeline_key = (cache_key, self.checkpoint_interval)
+        if self._timeline is None or self._timeline[0] != timeline_key:
+            timeline = Timeline(self._fleet, get_crash_steps(collisions), self.width, self.height,
+                                self.checkpoint_interval)
+            self._timeline = (timeline_key, timeline)
+        return self._timeline[1]
+
+    def export_trajectories(self, file_path):
+        self.get_simulated_records()
+        _cache_key, _results, collisions = self._result_cache
+        write_trajectory_file(file_path, self._fleet, collisions, self.width, self.height)
+
+    def _check_car_position(self, car):
+        if is_position_out_of_bounds(car.position, self.width, self.height):
+            x, y = car.position
+            raise ValueError(f"Position \"{x} {y} {car.direction}\" of {car.name} is out of bounds")
+
+    def _get_path_and_destination(self, index):
+        # Paths stop where the car leaves the field, so they only hold for the field size they were made for
+        cache_key = (self._fleet.revisions[index], self.width, self.height)
+        cached = self._path_cache.get(index)
+        if cached is not None and cached[0] == cache_key and cached[1] is not None:
+            self.path_cache_hits += 1
+            return cached[1], cached[2]
+
+        self.path_cache_misses += 1
+        car = self._fleet.get_car(index)
+        # Only the steps up to the wall hit or the last move are expanded; the car stays put after them
+        path = list(islice(car.iter_positions(), car.get_last_active_step(self.width, self.height) + 1))
+        destination = car.get_final_state()
+        self._path_cache[index] = (cache_key, path, destination)
+        return path, destination
+
+    def _get_destination_result(self, index):
+        cache_key = (self._fleet.revisions[index], self.width, self.height)
+        cached = self._path_cache.get(index)
+        if cached is not None and cached[0] == cache_key:
+            self.path_cache_hits += 1
+            destination = cached[2]
+        else:
+            self.path_cache_misses += 1
+            destination = self._fleet.get_car(index).get_final_state()
+            self._path_cache[index] = (cache_key, None, destination)
+        return CarResult.destination(self._fleet.names[index], *destination)
 
     def _simulate_single_car(self):
-        car = self.cars[0]
-        path, destination = car.get_path_and_destination()
+        car = self._fleet.get_car(0)
 
-        collision_step = get_single_car_collision(path, self.width, self.height)
+        collision_step, collision_position = car.get_wall_collision(self.width, self.height)
         if collision_step != -1:
-            return [f"- {car.name}, hits the wall at {path[collision_step]} at step {collision_step}"]
+            collisions = {collision_position: [([car.name], collision_step)]}
+            return list(generate_incident_records(collisions).values()), collisions
 
-        return [f"- {car.name}, {destination}"]
+        return [self._get_destination_result(0)], {}
 
     def _simulate_multiple_cars(self):
-        cars_data = {}
-        for car in self.cars:
-            path, destination = car.get_path_and_destination()
-            cars_data[car.name] = path
-
-        max_steps = get_max_steps(cars_data)
-        synced_paths = synchronise_paths(cars_data, max_steps)
-        collisions = generate_collisions(synced_paths, max_steps, self.width, self.height)
-        reports = generate_incident_reports(collisions)
+        if self.engine == self._STREAMING_ENGINE:
+            collisions = self._generate_streamed_collisions()
+        elif self.engine == self._SHARDED_ENGINE:
+            collisions = self._generate_sharded_collisions()
+        elif self.engine == self._VECTORIZED_ENGINE and self.path_workers != 1:
+            collisions = generate_fleet_collisions_parallel(self._fleet, self.width, self.height, self.path_workers)
+        elif self.engine == self._VECTORIZED_ENGINE:
+            collisions = generate_fleet_collisions_vectorized(self._fleet, self.width, self.height)
+        else:
+            collisions = self._generate_path_collisions()
+        records = generate_incident_records(collisions)
 
         results = []
-        for car in self.cars:
-            _path, destination = car.get_path_and_destination()
-            if car.name in reports.keys():
-                results.append(reports[car.name])
+        for index, car_name in enumerate(self._fleet.names):
+            if car_name in records:
+                results.append(records[car_name])
             else:
-                results.append(f"- {car.name}, {destination}")
+                results.append(self._get_destination_result(index))
+
+        return results, collisions
+
+    def _generate_path_collisions(self):
+        if self._can_extend_checkpoint():
+            return self._extend_checkpoint()
+
+        cars_data = self._get_cars_paths()
+        # Paths end early and are not padded, since both engines treat a car whose path ran out as parked
+        max_steps = max(self._fleet.step_counts, default=0) + 1
+        # Crowded fields index cars through a flat occupancy grid instead of hashing their cells
+        collisions = self._COLLISION_ENGINES[self.engine](
+            cars_data, max_steps, self.width, self.height,
+            use_grid=is_grid_suitable(len(cars_data), self.width, self.height)
+        )
+        if self.engine == self._CHECKPOINTED_ENGINE:
+            checkpoint = CollisionCheckpoint(cars_data, max_steps, collisions, self.width, self.height)
+            self._checkpoint = (self._get_checkpoint_key(), checkpoint)
+        return collisions
+
+    def _get_checkpoint_key(self):
+        return self.width, self.height, self.engine, self._fleet, self._fleet.version, len(self._fleet)
+
+    def _can_extend_checkpoint(self):
+        if self._checkpoint is None:
+            return False
+        width, height, engine, fleet, version, car_count = self._checkpoint[0]
+        # Every fleet change bumps the version once, so a matching count means cars were only appended
+        return (width, height, engine, fleet) == (self.width, self.height, self.engine, self._fleet) \
+            and self._fleet.version - version == len(self._fleet) - car_count > 0
+
+    @instrumented("incremental", lambda _collisions, field: {"cars": len(field.cars)})
+    def _extend_checkpoint(self):
+        key, checkpoint = self._checkpoint
+        for index in range(key[-1], len(self._fleet)):
+            path, _destination = self._get_path_and_destination(index)
+            checkpoint.add_car(self._fleet.names[index], path, self._fleet.step_counts[index] + 1)
+        self.incremental_runs += 1
+        self._checkpoint = (self._get_checkpoint_key(), checkpoint)
+        return checkpoint.collisions
+
+    @instrumented("paths", lambda cars_data, _field: {"cars": len(cars_data), "steps": get_total_steps(cars_data)})
+    def _get_cars_paths(self):
+        cars_data = {}
+        for index, car_name in enumerate(self._fleet.names):
+            path, _destination = self._get_path_and_destination(index)
+            cars_data[car_name] = path
+        return cars_data
+
+    def _generate_streamed_collisions(self):
+        position_streams = {
+            car.name: islice(car.iter_positions(), car.get_last_active_step(self.width, self.height) + 1)
+            for car in self.cars
+        }
+        max_steps = max(self._fleet.step_counts, default=0) + 1
+        return generate_streamed_collisions(position_streams, max_steps, self.width, self.height)
 
-        return results
+    def _generate_sharded_collisions(self):
+        cars = [
+            (car_name, self._fleet.get_position(index), self._fleet.get_direction(index),
+             expand_tape(self._fleet.get_commands(index)))
+            for index, car_name in enumerate(self._fleet.names)
+        ]
+        return generate_collisions_sharded(cars, self.width, self.height)
@@ -0,0 +1,193 @@
+import sys
+from array import array
+from collections.abc import Sequence
+from itertools import accumulate
+
+from car import Car
+from kernel import DIRECTIONS, DIRECTION_CODES
+from tapes import compile_tape, get_tape_length
+
+
+class Fleet:
+    __slots__ = ("names", "indexes", "xs", "ys", "directions", "commands", "command_starts", "command_counts",
+                 "step_counts", "revisions", "version")
+
+    def __init__(self):
+        self.names = []
+        self.indexes = {}
+        self.xs = array("i")
+        self.ys = array("i")
+        self.directions = array("B")
+        self.commands = bytearray()
+        self.command_starts = array("q")
+        self.command_counts = array("q")
+        # Tapes may use counts and repeat groups, so the number of steps can be far larger than the tape text
+        self.step_counts = array("q")
+        self.revisions = array("I")
+        self.version = 0
+
+    def __len__(self):
+        return len(self.names)
+
+    def append(self, name, x, y, direction, commands):
+        self.indexes.setdefault(name, len(self.names))
+        self.names.append(sys.intern(name))
+        self.xs.append(x)
+        self.ys.append(y)
+        self.directions.append(DIRECTION_CODES[direction.upper()])
+        self.command_starts.append(len(self.commands))
+        self.command_counts.append(len(commands))
+        self.step_counts.append(get_tape_length(commands))
+        self.commands += commands.upper().encode("ascii")
+        self.revisions.append(0)
+        self.version += 1
+
+    def extend(self, names, xs, ys, directions, commands):
+        for index, name in enumerate(names, len(self.names)):
+            self.indexes.setdefault(name, index)
+        self.names.extend(map(sys.intern, names))
+        self.xs.extend(xs)
+        self.ys.extend(ys)
+        self.directions.extend(DIRECTION_CODES[direction.upper()] for direction in directions)
+        command_counts = list(map(len, commands))
+        self.command_starts.extend(accumulate(command_counts[:-1], initial=len(self.commands)))
+        self.command_counts.extend(command_counts)
+        self.step_counts.extend(map(get_tape_length, commands))
+        self.commands += "".join(commands).upper().encode("ascii")
+        self.revisions.extend(bytes(len(names)))
+        # Each car counts as one change, the same as appending them one at a time
+        self.version += len(names)
+
+    def update(self, index, x, y, direction, commands):
+        self.xs[index] = x
+        self.ys[index] = y
+        self.directions[index] = DIRECTION_CODES[direction.upper()]
+        if commands != self.get_commands(index):
+            # The old commands are left in the buffer; edits are rare compared to reads
+            self.command_starts[index] = len(self.commands)
+            self.command_counts[index] = len(commands)
+            self.step_counts[index] = get_tape_length(commands)
+            self.commands += commands.upper().encode("ascii")
+        self._touch(index)
+
+    def get_position(self, index):
+        return self.xs[index], self.ys[index]
+
+    def set_position(self, index, position):
+        self.xs[index], self.ys[index] = position
+        self._touch(index)
+
+    def get_direction(self, index):
+        return DIRECTIONS[self.directions[index]]
+
+    def set_direction(self, index, direction):
+        self.directions[index] = DIRECTION_CODES[direction]
+        self._touch(index)
+
+    def get_commands(self, index):
+        start = self.command_starts[index]
+        return self.commands[start:start + self.command_counts[index]].decode("ascii")
+
+    def get_car(self, index):
+        return FleetCar(self, index)
+
+    def _touch(self, index):
+        self.revisions[index] += 1
+        self.version += 1
+
+
+# Cars can only be added through the view: removing or reordering them would shift the indexes that car views and
+# the field's caches rely on, so Field.cars is assigned a new list for that
+class FleetCars(Sequence):
+    __slots__ = ("_fleet", "_check_car")
+
+    def __init__(self, fleet, check_car=None):
+        self._fleet = fleet
+        # Called with every car before it is added, so the owner can reject it
+        self._check_car = check_car
+
+    def __len__(self):
+        return len(self._fleet)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._fleet.get_car(car_index) for car_index in range(len(self._fleet))[index]]
+        if index < 0:
+            index += len(self._fleet)
+        if not 0 <= index < len(self._fleet):
+            raise IndexError("car index out of range")
+        return self._fleet.get_car(index)
+
+    def __eq__(self, other):
+        if isinstance(other, FleetCars):
+            return self._fleet is other._fleet
+        if isinstance(other, (list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def append(self, car):
+        self.extend([car])
+
+    def extend(self, cars):
+        cars = list(cars)
+        for car in cars:
+            self._check(car)
+        self._fleet.extend([car.name for car in cars], [car.position[0] for car in cars],
+                           [car.position[1] for car in cars], [car.direction for car in cars],
+                           ["".join(car.commands) for car in cars])
+
+    def _check(self, car):
+        if self._check_car is not None:
+            self._check_car(car)
+
+
+class FleetCar(Car):
+    __slots__ = ("_fleet", "_index")
+
+    def __init__(self, fleet, index):
+        self._fleet = fleet
+        self._index = index
+        self._runs = None
+
+    # Views are built on every access, so two views of the same car compare equal
+    def __eq__(self, other):
+        if not isinstance(other, FleetCar):
+            return NotImplemented
+        return self._fleet is other._fleet and self._index == other._index
+
+    def __hash__(self):
+        return hash((id(self._fleet), self._index))
+
+    @property
+    def name(self):
+        return self._fleet.names[self._index]
+
+    @property
+    def initial_position(self):
+        x, y = self._fleet.get_position(self._index)
+        return f"{x} {y} {self._fleet.get_direction(self._index)}"
+
+    @property
+    def position(self):
+        return self._fleet.get_position(self._index)
+
+    @position.setter
+    def position(self, position):
+        self._fleet.set_position(self._index, position)
+
+    @property
+    def direction(self):
+        return self._fleet.get_direction(self._index)
+
+    @direction.setter
+    def direction(self, direction):
+        self._fleet.set_direction(self._index, direction)
+
+    @property
+    def commands(self):
+        return list(self._fleet.get_commands(self._index))
+
+    def get_runs(self):
+        if self._runs is None:
+            self._runs = compile_tape(self._fleet.get_commands(self._index))
+        return self._runs
@@ -0,0 +1,144 @@
+from collections import defaultdict
+from itertools import islice
+
+from utils import generate_streamed_collisions, get_moving_length, is_position_out_of_bounds, boxes_overlap, \
+    BROAD_PHASE_TILE
+
+
+class CollisionCheckpoint:
+    def __init__(self, cars_data, max_steps, collisions, field_width, field_height):
+        self.field_width = field_width
+        self.field_height = field_height
+        self.cars_data = dict(cars_data)
+        self.max_steps = max_steps
+        self.collisions = collisions
+        self.boxes = {car_name: _get_path_box(path) for car_name, path in self.cars_data.items()}
+        self.crash_steps = {}
+        self.wreck_steps = {}
+        self._index_collisions()
+
+    def add_car(self, car_name, path, max_steps=0):
+        # A path may stop before the car's tape does, so the run can be longer than the path
+        self.max_steps = max(self.max_steps, len(path), max_steps)
+        resume_step = self.find_first_interaction_step(path)
+        self.cars_data[car_name] = path
+        self.boxes[car_name] = _get_path_box(path)
+        # A car that never meets anyone leaves every other outcome as it was
+        if resume_step is not None:
+            self.collisions = self._resume(resume_step, self._find_affected_cars(car_name, resume_step))
+            self._index_collisions()
+        return resume_step
+
+    def find_first_interaction_step(self, path):
+        first_step = self._find_first_hazard_step(path)
+        box = _get_path_box(path)
+        for car_name, other_box in self.boxes.items():
+            if not boxes_overlap(box, other_box):
+                continue
+            meeting_step = _find_meeting_step(
+                self.cars_data[car_name], path, self.crash_steps.get(car_name),
+                first_step or max(self.max_steps, len(path))
+            )
+            if meeting_step is not None:
+                first_step = meeting_step
+        return first_step
+
+    def _find_first_hazard_step(self, path):
+        for step_number in range(1, len(path)):
+            position = path[step_number]
+            if is_position_out_of_bounds(position, self.field_width, self.field_height) \
+                    or self.wreck_steps.get(position, step_number + 1) <= step_number:
+                return step_number
+        # A parked car is still in the way of a wreck appearing in its cell later on
+        wreck_step = self.wreck_steps.get(path[-1])
+        if wreck_step is not None:
+            return max(wreck_step, 1)
+        return None
+
+    def _index_collisions(self):
+        self.crash_steps = {}
+        self.wreck_steps = {}
+        for position, incidents in self.collisions.items():
+            for car_names, step_number in incidents:
+                for car_name in car_names:
+                    self.crash_steps.setdefault(car_name, step_number)
+                self.wreck_steps.setdefault(position, step_number)
+
+    def _find_affected_cars(self, car_name, resume_step):
+        # Cars can only meet if their boxes overlap, so cars outside the chain of overlaps starting from the new
+        # car keep every later outcome; wrecks from before resume_step stay where they are either way
+        buckets = defaultdict(list)
+        for other_car_name, box in self.boxes.items():
+            if self.crash_steps.get(other_car_name, resume_step) >= resume_step:
+                for tile in _get_box_tiles(box):
+                    buckets[tile].append(other_car_name)
+
+        affected_cars = {car_name}
+        unvisited_cars = [car_name]
+        while unvisited_cars:
+            box = self.boxes[unvisited_cars.pop()]
+            for tile in _get_box_tiles(box):
+                for other_car_name in buckets.get(tile, ()):
+                    if other_car_name not in affected_cars and boxes_overlap(box, self.boxes[other_car_name]):
+                        affected_cars.add(other_car_name)
+                        unvisited_cars.append(other_car_name)
+        return affected_cars
+
+    def _resume(self, resume_step, affected_cars):
+        # The state after the step before resume_step is rebuilt from the paths and the incidents recorded so far
+        previous_collisions = defaultdict(list)
+        later_collisions = []
+        crashed_cars = set()
+        pending_cells = set()
+        for position, incidents in self.collisions.items():
+            for car_names, step_number in incidents:
+                if step_number >= resume_step:
+                    if affected_cars.isdisjoint(car_names):
+                        later_collisions.append((position, car_names, step_number))
+                    continue
+                previous_collisions[position].append((car_names, step_number))
+                crashed_cars.update(car_names)
+                if step_number == resume_step - 1:
+                    # Cars that were already processed when this wreck appeared are caught on the next step
+                    pending_cells.add(position)
+
+        position_streams = {
+            car_name: islice(path, min(resume_step - 1, len(path) - 1), max(get_moving_length(path), resume_step))
+            for car_name, path in self.cars_data.items() if car_name in affected_cars and car_name not in crashed_cars
+        }
+        collisions = generate_streamed_collisions(
+            position_streams, self.max_steps, self.field_width, self.field_height, first_step=resume_step,
+            previous_collisions=previous_collisions, pending_cells=pending_cells
+        )
+        # Unaffected cars never share a cell with an affected one, so their incidents land on other positions
+        for position, car_names, step_number in later_collisions:
+            collisions[position].append((car_names, step_number))
+        return collisions
+
+
+def _get_path_box(path):
+    xs, ys = zip(*path)
+    return min(xs), max(xs), min(ys), max(ys)
+
+
+def _get_box_tiles(box):
+    for tile_x in range(box[0] // BROAD_PHASE_TILE, box[1] // BROAD_PHASE_TILE + 1):
+        for tile_y in range(box[2] // BROAD_PHASE_TILE, box[3] // BROAD_PHASE_TILE + 1):
+            yield tile_x, tile_y
+
+
+def _find_meeting_step(other_path, path, other_crash_step, stop_step):
+    # Both cars are parked after the longer path ends, so nothing new can happen after that
+    stop_step = min(stop_step, max(len(other_path), len(path)) + 1)
+    if other_crash_step is not None:
+        stop_step = min(stop_step, other_crash_step + 1)
+
+    other_last_step = len(other_path) - 1
+    last_step = len(path) - 1
+    for step_number in range(1, stop_step):
+        position = path[min(step_number, last_step)]
+        # A car leaving through the wall is wrecked in the cell it came from on the same step
+        if other_path[min(step_number, other_last_step)] == position \
+                or other_path[min(step_number - 1, other_last_step)] == position:
+            return step_number
+    return None
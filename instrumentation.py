@@ -0,0 +1,70 @@
+import functools
+import time
+
+_stages = None
+
+
+def enable_instrumentation():
+    global _stages
+    _stages = {}
+
+
+def disable_instrumentation():
+    global _stages
+    _stages = None
+
+
+def is_instrumentation_enabled():
+    return _stages is not None
+
+
+def get_stage_stats():
+    if _stages is None:
+        return {}
+    return {
+        name: {"calls": stage["calls"], "seconds": stage["seconds"], "items": dict(stage["items"])}
+        for name, stage in _stages.items()
+    }
+
+
+def record_stage(stage_name, seconds, items=None):
+    merge_stage_stats({stage_name: {"calls": 1, "seconds": seconds, "items": items or {}}})
+
+
+def merge_stage_stats(stats):
+    if _stages is None:
+        return
+
+    for stage_name, stats_of_stage in stats.items():
+        stage = _stages.setdefault(stage_name, {"calls": 0, "seconds": 0.0, "items": {}})
+        stage["calls"] += stats_of_stage["calls"]
+        stage["seconds"] += stats_of_stage["seconds"]
+        for item_name, count in stats_of_stage["items"].items():
+            stage["items"][item_name] = stage["items"].get(item_name, 0) + count
+
+
+def instrumented(stage_name, count_items=None):
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if _stages is None:
+                return function(*args, **kwargs)
+
+            started = time.perf_counter()
+            result = function(*args, **kwargs)
+            seconds = time.perf_counter() - started
+            record_stage(stage_name, seconds, count_items(result, *args, **kwargs) if count_items else None)
+            return result
+
+        return wrapper
+
+    return decorate
+
+
+def format_stage_stats(stats):
+    lines = []
+    for name, stage in stats.items():
+        items = ", ".join(f"{item_name} {count}" for item_name, count in stage["items"].items())
+        line = f"{name}: {stage['calls']} calls, {stage['seconds']:.4f}s"
+        lines.append(f"{line}, {items}" if items else line)
+    return lines
@@ -0,0 +1,36 @@
+DIRECTIONS = ("N", "E", "S", "W")
+DIRECTION_CODES = {direction: code for code, direction in enumerate(DIRECTIONS)}
+FORWARD, LEFT, RIGHT = 0, 1, 2
+MOVE_OFFSETS = [(0, 1), (1, 0), (0, -1), (-1, 0)]
+_COMMAND_CODES = bytes.maketrans(b"FLRflr", bytes([FORWARD, LEFT, RIGHT, FORWARD, LEFT, RIGHT]))
+
+
+def _build_step_table():
+    step_table = [None] * (len(DIRECTIONS) << 2)
+    for direction_index, (delta_x, delta_y) in enumerate(MOVE_OFFSETS):
+        state = direction_index << 2
+        step_table[state | FORWARD] = (state, delta_x, delta_y)
+        step_table[state | LEFT] = ((direction_index - 1) % len(DIRECTIONS) << 2, 0, 0)
+        step_table[state | RIGHT] = ((direction_index + 1) % len(DIRECTIONS) << 2, 0, 0)
+    return step_table
+
+
+# A state is a direction shifted left by two, so a step is one lookup of state | command and the row it returns
+# already holds the next state
+STEP_TABLE = _build_step_table()
+
+
+def encode_commands(commands):
+    if isinstance(commands, str):
+        commands = commands.encode("ascii")
+    return commands.translate(_COMMAND_CODES)
+
+
+def run_commands(command_codes, x, y, direction_index):
+    step_table = STEP_TABLE
+    state = direction_index << 2
+    for command in command_codes:
+        state, delta_x, delta_y = step_table[state | command]
+        x += delta_x
+        y += delta_y
+    return x, y, state >> 2
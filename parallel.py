@@ -0,0 +1,92 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from instrumentation import instrumented
+from vectorized import collide_position_arrays, count_fleet_collision_items, fill_path_arrays, get_fleet_columns, \
+    get_fleet_step_limits, require_numpy
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+@instrumented("generate_fleet_collisions_parallel", count_fleet_collision_items)
+def generate_fleet_collisions_parallel(fleet, field_width, field_height, workers=None, use_processes=True):
+    step_counts = get_fleet_step_limits(fleet, field_width, field_height)
+    with generate_fleet_paths_parallel(fleet, workers, use_processes, step_counts) as paths:
+        return collide_position_arrays(fleet.names, paths.xs, paths.ys, field_width, field_height)
+
+
+def generate_fleet_paths_parallel(fleet, workers=None, use_processes=True, step_counts=None):
+    require_numpy()
+
+    if step_counts is None:
+        step_counts = fleet.step_counts
+    workers = workers or os.cpu_count() or 1
+    paths = SharedPathArrays(max(step_counts, default=0) + 1, len(fleet))
+    try:
+        chunks = split_cars(len(fleet), workers)
+        if use_processes and len(chunks) > 1:
+            with ProcessPoolExecutor(max_workers=len(chunks)) as executor:
+                futures = [
+                    executor.submit(_fill_shared_paths, paths.names, paths.shape, start, stop,
+                                    get_fleet_columns(fleet, start, stop, step_counts))
+                    for start, stop in chunks
+                ]
+                for future in futures:
+                    future.result()
+        else:
+            for start, stop in chunks:
+                fill_path_arrays(paths.xs[:, start:stop], paths.ys[:, start:stop],
+                                 *get_fleet_columns(fleet, start, stop, step_counts))
+    except BaseException:
+        paths.close()
+        raise
+    return paths
+
+
+def split_cars(car_count, workers):
+    workers = max(1, min(workers, car_count))
+    bounds = [car_count * worker // workers for worker in range(workers + 1)]
+    return [(start, stop) for start, stop in zip(bounds, bounds[1:]) if start < stop]
+
+
+class SharedPathArrays:
+    def __init__(self, steps, car_count, names=None):
+        self.shape = (steps, car_count)
+        size = max(steps * car_count * np.dtype(np.int64).itemsize, 1)
+        if names is None:
+            self._buffers = [shared_memory.SharedMemory(create=True, size=size) for _ in range(2)]
+        else:
+            self._buffers = [shared_memory.SharedMemory(name=name) for name in names]
+        self._is_owner = names is None
+        self.names = tuple(buffer.name for buffer in self._buffers)
+        self.xs, self.ys = (np.ndarray(self.shape, dtype=np.int64, buffer=buffer.buf) for buffer in self._buffers)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_exc_info):
+        self.close()
+
+    def close(self):
+        if self._buffers is None:
+            return
+        self.xs = self.ys = None
+        for buffer in self._buffers:
+            try:
+                buffer.close()
+            except BufferError:
+                # A view still held elsewhere keeps the mapping alive until it is released
+                pass
+            if self._is_owner:
+                buffer.unlink()
+        self._buffers = None
+
+
+def _fill_shared_paths(buffer_names, shape, start, stop, columns):
+    # Workers write their cars' columns in place, so no path travels back through a pipe
+    with SharedPathArrays(*shape, names=buffer_names) as paths:
+        fill_path_arrays(paths.xs[:, start:stop], paths.ys[:, start:stop], *columns)
@@ -0,0 +1,106 @@
+import csv
+import json
+
+_DESTINATION, _WALL, _COLLISION = "destination", "wall", "collision"
+_WRITE_BATCH_SIZE = 1000
+_CSV_FIELDS = ["car", "outcome", "x", "y", "step", "direction", "other_cars"]
+
+
+class CarResult:
+    __slots__ = ("car", "outcome", "position", "step", "direction", "_incident_cars", "_wrecks", "_wreck_count")
+
+    def __init__(self, car, outcome, position, step=None, direction=None, incident_cars=(), wrecks=(), wreck_count=0):
+        self.car = car
+        self.outcome = outcome
+        self.position = position
+        self.step = step
+        self.direction = direction
+        # Cars in one pile-up share the incident and wreck lists; the other cars are only picked out when asked for
+        self._incident_cars = incident_cars
+        self._wrecks = wrecks
+        self._wreck_count = wreck_count
+
+    @classmethod
+    def destination(cls, car, position, direction):
+        return cls(car, _DESTINATION, position, direction=direction)
+
+    @classmethod
+    def incident(cls, car, position, step, incident_cars, wrecks):
+        outcome = _WALL if len(incident_cars) == 1 and not wrecks else _COLLISION
+        return cls(car, outcome, position, step, incident_cars=incident_cars, wrecks=wrecks, wreck_count=len(wrecks))
+
+    @property
+    def other_cars(self):
+        other_cars = [car for car in self._incident_cars if car != self.car]
+        other_cars.extend(self._wrecks[:self._wreck_count])
+        return other_cars
+
+    def __str__(self):
+        return self.render()
+
+    def __repr__(self):
+        return f"CarResult({self.car!r}, {self.outcome!r}, {self.position!r}, {self.step!r})"
+
+    def __eq__(self, other):
+        if not isinstance(other, CarResult):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def render(self):
+        if self.outcome == _DESTINATION:
+            return f"- {self.car}, {self.position} {self.direction}"
+        if self.outcome == _WALL:
+            return f"- {self.car}, hits the wall at {self.position} at step {self.step}"
+        return f"- {self.car}, collides with {', '.join(self.other_cars)} at {self.position} at step {self.step}"
+
+    def to_dict(self):
+        return {
+            "car": self.car,
+            "outcome": self.outcome,
+            "position": list(self.position),
+            "step": self.step,
+            "direction": self.direction,
+            "other_cars": self.other_cars
+        }
+
+
+def write_results_text(results, output):
+    return _write_lines((result.render() + "\n" for result in results), output)
+
+
+def write_results_jsonl(results, output):
+    return _write_lines((json.dumps(result.to_dict()) + "\n" for result in results), output)
+
+
+def write_results_csv(results, output):
+    writer = csv.writer(output, lineterminator="\n")
+    writer.writerow(_CSV_FIELDS)
+    result_count = 0
+    rows = []
+    for result in results:
+        x, y = result.position
+        rows.append([result.car, result.outcome, x, y, result.step, result.direction, ";".join(result.other_cars)])
+        result_count += 1
+        if len(rows) >= _WRITE_BATCH_SIZE:
+            writer.writerows(rows)
+            rows = []
+
+    writer.writerows(rows)
+    output.flush()
+    return result_count
+
+
+def _write_lines(lines, output):
+    line_count = 0
+    pending = []
+    for line in lines:
+        pending.append(line)
+        line_count += 1
+        if len(pending) >= _WRITE_BATCH_SIZE:
+            output.write("".join(pending))
+            pending = []
+
+    if pending:
+        output.write("".join(pending))
+    output.flush()
+    return line_count
@@ -0,0 +1,211 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from batch import parse_scenario_object, run_scenario_chunk, collect_chunk, PENDING_CHUNKS_PER_WORKER
+from instrumentation import is_instrumentation_enabled
+
+_DEFAULT_MAX_BATCH_SIZE = 64
+_DEFAULT_BATCH_DELAY = 0.002
+_DEFAULT_MAX_PENDING = 1024
+_PIPELINED_REQUESTS_PER_CONNECTION = 64
+_LATENCY_SAMPLES = 10000
+_MAX_REQUEST_SIZE = 1 << 24
+_STATS_COMMAND = "stats"
+
+
+class SimulationService:
+    def __init__(self, engine="python", workers=None, max_batch_size=_DEFAULT_MAX_BATCH_SIZE,
+                 batch_delay=_DEFAULT_BATCH_DELAY, max_pending=_DEFAULT_MAX_PENDING):
+        self.engine = engine
+        self.workers = workers or os.cpu_count() or 1
+        self.max_batch_size = max_batch_size
+        self.batch_delay = batch_delay
+        self.max_pending = max_pending
+        self.requests = 0
+        self.failed = 0
+        self.batches = 0
+        self._latencies = deque(maxlen=_LATENCY_SAMPLES)
+        self._queue = None
+        self._batch_slots = None
+        self._executor = None
+        self._dispatcher = None
+        self._connections = set()
+
+    async def start(self):
+        self._queue = asyncio.Queue(self.max_pending)
+        self._batch_slots = asyncio.Semaphore(self.workers * PENDING_CHUNKS_PER_WORKER)
+        # Workers start lazily, once connections are open; forked ones would inherit the client sockets and hold
+        # them open after the service closes them
+        self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                             mp_context=multiprocessing.get_context("forkserver"))
+        self._dispatcher = asyncio.create_task(self._dispatch_batches())
+
+    async def close(self):
+        for task in [*self._connections, self._dispatcher]:
+            task.cancel()
+        await asyncio.gather(*self._connections, self._dispatcher, return_exceptions=True)
+        await asyncio.to_thread(self._executor.shutdown)
+
+    async def simulate(self, scenario, received=None):
+        received = received or time.perf_counter()
+        future = asyncio.get_running_loop().create_future()
+        # A full queue holds the caller here, which stops its connection from being read
+        await self._queue.put((scenario, future))
+        record = await future
+
+        latency = time.perf_counter() - received
+        self._latencies.append(latency)
+        self.requests += 1
+        if "error" in record:
+            self.failed += 1
+        return {**record, "latency_ms": round(latency * 1000, 3)}
+
+    def get_stats(self):
+        latencies = sorted(self._latencies)
+        return {
+            "requests": self.requests,
+            "failed": self.failed,
+            "batches": self.batches,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "latency_ms": {
+                name: round(_get_percentile(latencies, percentile) * 1000, 3)
+                for name, percentile in [("p50", 0.5), ("p95", 0.95), ("p99", 0.99), ("max", 1.0)]
+            }
+        }
+
+    async def handle_connection(self, reader, writer):
+        connection = asyncio.current_task()
+        self._connections.add(connection)
+        responses = asyncio.Queue(_PIPELINED_REQUESTS_PER_CONNECTION)
+        response_writer = asyncio.create_task(_write_responses(responses, writer))
+        try:
+            await self._read_requests(reader, responses)
+            await responses.put(None)
+            await response_writer
+        except asyncio.CancelledError:
+            # The service is shutting down; the connection is dropped without waiting for its answers
+            response_writer.cancel()
+        finally:
+            self._connections.discard(connection)
+            writer.close()
+
+    async def _read_requests(self, reader, responses):
+        request_count = 0
+        while True:
+            try:
+                line = await reader.readline()
+            except ValueError:
+                await responses.put(_completed({"id": None, "error": "Request is too large"}))
+                return
+            if not line:
+                return
+            if not line.strip():
+                continue
+
+            request_count += 1
+            await responses.put(asyncio.ensure_future(self._answer(line, request_count, time.perf_counter())))
+
+    async def _answer(self, line, request_count, received):
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as exception:
+            return {"id": str(request_count), "error": f"Invalid JSON: {exception}"}
+
+        if isinstance(request, dict) and request.get("command") == _STATS_COMMAND:
+            return self.get_stats()
+        return await self.simulate(parse_scenario_object(request, request_count), received)
+
+    async def _dispatch_batches(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            # Requests arriving together are worth a short wait, unless there are already enough for a batch
+            if self._queue.qsize() < self.max_batch_size - 1:
+                await asyncio.sleep(self.batch_delay)
+            while len(batch) < self.max_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            await self._batch_slots.acquire()
+            self.batches += 1
+            scenarios = [scenario for scenario, _future in batch]
+            try:
+                future = loop.run_in_executor(
+                    self._executor, run_scenario_chunk, scenarios, self.engine, is_instrumentation_enabled()
+                )
+            except Exception as exception:
+                # A broken pool fails this batch; the dispatcher carries on so later requests still get an answer
+                self._complete_batch(batch, _get_failed_records(scenarios, exception))
+                continue
+            future.add_done_callback(lambda done, batch=batch, scenarios=scenarios: self._complete_batch(
+                batch, _collect_batch(scenarios, done)
+            ))
+
+    def _complete_batch(self, batch, records):
+        self._batch_slots.release()
+        for (_scenario, future), record in zip(batch, records):
+            if not future.done():
+                future.set_result(record)
+
+
+async def start_server(service, host="127.0.0.1", port=0, unix_socket=None):
+    await service.start()
+    if unix_socket:
+        return await asyncio.start_unix_server(service.handle_connection, unix_socket, limit=_MAX_REQUEST_SIZE)
+    return await asyncio.start_server(service.handle_connection, host, port, limit=_MAX_REQUEST_SIZE)
+
+
+async def run_server(service, host="127.0.0.1", port=0, unix_socket=None, on_ready=None):
+    server = await start_server(service, host, port, unix_socket)
+    try:
+        if on_ready:
+            on_ready(server)
+        await server.serve_forever()
+    finally:
+        server.close()
+        await server.wait_closed()
+        await service.close()
+
+
+async def _write_responses(responses, writer):
+    is_connected = True
+    while True:
+        response = await responses.get()
+        if response is None:
+            break
+        record = await response
+        if not is_connected:
+            continue
+        try:
+            writer.write((json.dumps(record) + "\n").encode("utf-8"))
+            # Waiting for the client to read keeps a slow reader from piling up responses
+            await writer.drain()
+        except ConnectionError:
+            is_connected = False
+
+
+def _collect_batch(scenarios, future):
+    if future.cancelled():
+        return _get_failed_records(scenarios, asyncio.CancelledError("Batch was cancelled"))
+    return collect_chunk(scenarios, future)
+
+
+def _get_failed_records(scenarios, exception):
+    error = f"Worker failed: {type(exception).__name__}: {exception}"
+    return [{"id": scenario["id"], "error": error} for scenario in scenarios]
+
+
+def _completed(record):
+    future = asyncio.get_running_loop().create_future()
+    future.set_result(record)
+    return future
+
+
+def _get_percentile(sorted_values, percentile):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(percentile * len(sorted_values)))]
@@ -0,0 +1,276 @@
+import math
+import multiprocessing
+import os
+from bisect import bisect_right
+from collections import defaultdict
+
+from instrumentation import instrumented
+from kernel import DIRECTION_CODES, FORWARD, STEP_TABLE, encode_commands
+from utils import resolve_incidents, is_position_out_of_bounds
+
+
+def _count_sharded_items(collisions, cars, *_args, **_kwargs):
+    incidents = sum(len(incidents_at_pos) for incidents_at_pos in collisions.values())
+    return {"cars": len(cars), "collisions": incidents}
+
+
+@instrumented("generate_collisions_sharded", _count_sharded_items)
+def generate_collisions_sharded(cars, field_width, field_height, shards=None, use_processes=True):
+    column_starts, row_starts = split_field(field_width, field_height, shards or os.cpu_count() or 1)
+    region_count = len(column_starts) * len(row_starts)
+
+    car_order = {}
+    tapes = []
+    cars_by_region = [[] for _ in range(region_count)]
+    for order, (car_name, (x, y), direction, commands) in enumerate(cars):
+        car_order[car_name] = order
+        tapes.append(encode_commands(commands))
+        region = find_region(x, y, column_starts, row_starts, field_width, field_height)
+        # Cars carry their heading as a step table state; their order doubles as the id of their encoded tape
+        cars_by_region[region].append((order, car_name, x, y, DIRECTION_CODES[direction] << 2, 0, None))
+    # A tape is shipped to a shard the first time one of its cars arrives there, never with every handoff
+    shipped_tapes = [{car_state[0] for car_state in region_cars} for region_cars in cars_by_region]
+
+    shard_arguments = [(field_width, field_height, column_starts, row_starts, region) for region in range(region_count)]
+    if use_processes and region_count > 1:
+        context = multiprocessing.get_context()
+        shards = [_ShardProcess(arguments, context) for arguments in shard_arguments]
+    else:
+        shards = [_LocalShard(arguments) for arguments in shard_arguments]
+
+    incidents = []
+    try:
+        for shard, region_cars in zip(shards, cars_by_region):
+            shard.send("start", region_cars, {car_state[0]: tapes[car_state[0]] for car_state in region_cars})
+        replies = [shard.receive() for shard in shards]
+
+        # Like the other engines, the run ends with the longest tape, even with a wreck check still pending
+        max_steps = max(map(len, tapes), default=0) + 1
+        step_number = 1
+        while step_number < max_steps:
+            arrivals = [[] for _ in range(region_count)]
+            for _incidents, departures, _is_busy in replies:
+                for region, car_state in departures:
+                    arrivals[region].append(car_state)
+            if not any(arrivals) and not any(is_busy for _incidents, _departures, is_busy in replies):
+                break
+
+            for shard, region_arrivals, region_tapes in zip(shards, arrivals, shipped_tapes):
+                new_tapes = {}
+                for car_state in region_arrivals:
+                    if car_state[0] not in region_tapes:
+                        region_tapes.add(car_state[0])
+                        new_tapes[car_state[0]] = tapes[car_state[0]]
+                shard.send("advance", step_number, region_arrivals, new_tapes)
+            replies = [shard.receive() for shard in shards]
+            for region_incidents, _departures, _is_busy in replies:
+                incidents.extend(region_incidents)
+            step_number += 1
+    finally:
+        for shard in shards:
+            shard.close()
+
+    # Shards report independently, so incidents are put back in the order a single process records them
+    incidents.sort(key=lambda incident: (
+        incident[2], car_order[incident[1][0]], is_position_out_of_bounds(incident[0], field_width, field_height)
+    ))
+    collisions = defaultdict(list)
+    for position, car_names, step_number in incidents:
+        collisions[position].append((car_names, step_number))
+    return collisions
+
+
+def split_field(field_width, field_height, shards):
+    shards = max(1, min(shards, field_width * field_height))
+    for region_count in range(shards, 0, -1):
+        grids = [
+            (columns, region_count // columns) for columns in range(1, region_count + 1)
+            if region_count % columns == 0 and columns <= field_width and region_count // columns <= field_height
+        ]
+        if grids:
+            # Regions as close to square as possible keep the borders, and the cars crossing them, short
+            columns, rows = min(grids, key=lambda grid: abs(
+                math.log(field_width / grid[0]) - math.log(field_height / grid[1])
+            ))
+            return (
+                [field_width * column // columns for column in range(columns)],
+                [field_height * row // rows for row in range(rows)]
+            )
+
+
+def find_region(x, y, column_starts, row_starts, field_width, field_height):
+    # A cell outside the field belongs with the border cell a car leaves it from
+    x = min(max(x, 0), field_width - 1)
+    y = min(max(y, 0), field_height - 1)
+    return (bisect_right(row_starts, y) - 1) * len(column_starts) + bisect_right(column_starts, x) - 1
+
+
+def _get_region_bounds(field_width, field_height, column_starts, row_starts, region):
+    row, column = divmod(region, len(column_starts))
+    column_ends = column_starts[1:] + [field_width]
+    row_ends = row_starts[1:] + [field_height]
+    # Regions on the edge of the field also own the cells just outside it
+    return (
+        column_starts[column] if column else -1,
+        column_ends[column] if column < len(column_starts) - 1 else field_width + 1,
+        row_starts[row] if row else -1,
+        row_ends[row] if row < len(row_starts) - 1 else field_height + 1
+    )
+
+
+class _Shard:
+    def __init__(self, field_width, field_height, column_starts, row_starts, region):
+        self.field_width = field_width
+        self.field_height = field_height
+        self.column_starts = column_starts
+        self.row_starts = row_starts
+        self.region = region
+        self.bounds = _get_region_bounds(field_width, field_height, column_starts, row_starts, region)
+        self.car_order = {}
+        self.positions = {}
+        self.moving_cars = {}
+        self.cars_at_cell = defaultdict(list)
+        self.wreck_cells = set()
+        self.touched_cells = set()
+        self.cells_left = {}
+        self.tapes = {}
+
+    def start(self, cars, tapes):
+        self.tapes.update(tapes)
+        self._add_cars(cars)
+        # Cars sharing a starting cell are only checked once the first step is taken
+        self.touched_cells = {position for position, car_names in self.cars_at_cell.items() if len(car_names) > 1}
+        return [], self._move_cars(), self._is_busy()
+
+    def advance(self, step_number, arrivals, tapes):
+        self.tapes.update(tapes)
+        self._add_cars(arrivals)
+        for _order, car_name, x, y, _heading, _offset, previous_pos in arrivals:
+            self.touched_cells.add((x, y))
+            # An arrival may have left the field, which is resolved from the cell it came from
+            self.cells_left[car_name] = previous_pos
+
+        incidents, self.touched_cells = resolve_incidents(
+            self.touched_cells, self.cells_left, self.cars_at_cell, self.wreck_cells, self.car_order,
+            self.field_width, self.field_height
+        )
+        for _position, car_names in incidents:
+            self._remove_cars(car_names)
+
+        incidents = [(position, car_names, step_number) for position, car_names in incidents]
+        return incidents, self._move_cars(), self._is_busy()
+
+    def _is_busy(self):
+        return bool(self.moving_cars or self.touched_cells)
+
+    def _add_cars(self, cars):
+        for order, car_name, x, y, heading, offset, _previous_pos in cars:
+            commands = self.tapes[order]
+            self.car_order[car_name] = order
+            self.positions[car_name] = (x, y)
+            self.cars_at_cell[(x, y)].append(car_name)
+            if offset < len(commands):
+                self.moving_cars[car_name] = [x, y, heading, commands, offset, len(commands)]
+
+    def _move_cars(self):
+        departures = []
+        self.cells_left = {}
+        min_x, max_x, min_y, max_y = self.bounds
+        step_table = STEP_TABLE
+        for car_name, state in list(self.moving_cars.items()):
+            x, y, heading, commands, offset, commands_count = state
+            command = commands[offset]
+            heading, delta_x, delta_y = step_table[heading | command]
+            offset += 1
+            if offset == commands_count:
+                del self.moving_cars[car_name]
+            else:
+                state[4] = offset
+
+            if command != FORWARD:
+                state[2] = heading
+                continue
+            x += delta_x
+            y += delta_y
+            state[0], state[1] = x, y
+
+            previous_pos = self.positions[car_name]
+            cars_at_previous_cell = self.cars_at_cell[previous_pos]
+            cars_at_previous_cell.remove(car_name)
+            if not cars_at_previous_cell:
+                del self.cars_at_cell[previous_pos]
+
+            if not (min_x <= x < max_x and min_y <= y < max_y):
+                region = find_region(x, y, self.column_starts, self.row_starts, self.field_width, self.field_height)
+                departures.append((region, (self.car_order.pop(car_name), car_name, x, y, heading, offset,
+                                            previous_pos)))
+                del self.positions[car_name]
+                self.moving_cars.pop(car_name, None)
+                continue
+
+            self.cars_at_cell[(x, y)].append(car_name)
+            self.positions[car_name] = (x, y)
+            self.cells_left[car_name] = previous_pos
+            self.touched_cells.add((x, y))
+
+        return departures
+
+    def _remove_cars(self, car_names):
+        for car_name in car_names:
+            position = self.positions.pop(car_name, None)
+            if position is None:
+                continue
+            del self.car_order[car_name]
+            self.moving_cars.pop(car_name, None)
+            cars_at_position = self.cars_at_cell[position]
+            cars_at_position.remove(car_name)
+            if not cars_at_position:
+                del self.cars_at_cell[position]
+
+
+class _LocalShard:
+    def __init__(self, shard_arguments):
+        self._shard = _Shard(*shard_arguments)
+        self._reply = None
+
+    def send(self, command, *arguments):
+        self._reply = getattr(self._shard, command)(*arguments)
+
+    def receive(self):
+        return self._reply
+
+    def close(self):
+        self._shard = None
+
+
+class _ShardProcess:
+    def __init__(self, shard_arguments, context):
+        self._connection, worker_connection = context.Pipe()
+        self._process = context.Process(target=_run_shard, args=(worker_connection, shard_arguments), daemon=True)
+        self._process.start()
+        worker_connection.close()
+
+    def send(self, command, *arguments):
+        self._connection.send((command, arguments))
+
+    def receive(self):
+        return self._connection.recv()
+
+    def close(self):
+        try:
+            self._connection.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self._process.join()
+        self._connection.close()
+
+
+def _run_shard(connection, shard_arguments):
+    shard = _Shard(*shard_arguments)
+    while True:
+        message = connection.recv()
+        if message is None:
+            break
+        command, arguments = message
+        connection.send(getattr(shard, command)(*arguments))
+    connection.close()
@@ -0,0 +1,372 @@
+import re
+from itertools import repeat
+
+from kernel import MOVE_OFFSETS
+
+_PLAIN_TAPE_PATTERN = re.compile(r"[flrFLR]*")
+_TOKEN_PATTERN = re.compile(r"([FLR])([0-9]*)|(\()|\)X([0-9]+)")
+_RUN_PATTERN = re.compile(r"(F*)([LR]*)")
+_DIRECTION_COUNT = len(MOVE_OFFSETS)
+
+
+class Repeat:
+    __slots__ = ("count", "body", "length", "rotation", "displacement", "box", "body_length", "body_rotation",
+                 "body_displacement", "body_box")
+
+    def __init__(self, count, body):
+        self.count = count
+        self.body = body
+        # Effects are measured from the origin facing north and turned to the actual heading when used
+        self.body_length, self.body_rotation, self.body_displacement, self.body_box = _get_runs_effect(body)
+        self.length = count * self.body_length
+        self.rotation = count * self.body_rotation
+
+        starts = _get_iteration_starts(self.body_displacement, self.body_rotation, min(count, _DIRECTION_COUNT) + 1)
+        if _get_period(self.body_rotation) == 1:
+            # Every iteration moves the same way, so the first and the last one hold the extremes
+            body_x, body_y = self.body_displacement
+            self.displacement = (count * body_x, count * body_y)
+            self.box = _union_boxes(self.body_box, _shift_box(self.body_box, (count - 1) * body_x,
+                                                              (count - 1) * body_y))
+        else:
+            # A turning body comes back to where it started after a full period
+            self.displacement = starts[count % _get_period(self.body_rotation)]
+            self.box = self.body_box
+            for iteration in range(1, min(count, _DIRECTION_COUNT)):
+                iteration_box = _rotate_box(self.body_box, iteration * self.body_rotation)
+                self.box = _union_boxes(self.box, _shift_box(iteration_box, *starts[iteration]))
+
+    def __eq__(self, other):
+        if not isinstance(other, Repeat):
+            return NotImplemented
+        return (self.count, self.body) == (other.count, other.body)
+
+    def __repr__(self):
+        return f"Repeat({self.count!r}, {self.body!r})"
+
+
+def is_plain_tape(commands):
+    return _PLAIN_TAPE_PATTERN.fullmatch(commands) is not None
+
+
+def is_tape_valid(commands):
+    if is_plain_tape(commands):
+        return True
+    try:
+        parse_tape(commands)
+    except ValueError:
+        return False
+    return True
+
+
+# Tokens are (command, count) pairs and (count, body, body length) repeat groups
+def parse_tape(commands):
+    groups = [[]]
+    text = commands.upper()
+    position = 0
+    while position < len(text):
+        match = _TOKEN_PATTERN.match(text, position)
+        if match is None:
+            raise ValueError(f"Invalid commands \"{commands}\"")
+        command, count, group_start, repeat_count = match.groups()
+        if command:
+            groups[-1].append((command, int(count) if count else 1))
+        elif group_start:
+            groups.append([])
+        elif len(groups) > 1:
+            body = groups.pop()
+            groups[-1].append((int(repeat_count), body, _get_tokens_length(body)))
+        else:
+            raise ValueError(f"Invalid commands \"{commands}\"")
+        position = match.end()
+
+    if len(groups) > 1:
+        raise ValueError(f"Invalid commands \"{commands}\"")
+    return groups[0]
+
+
+def compile_tape(commands):
+    if is_plain_tape(commands):
+        return _compile_plain_runs(commands.upper())
+    return _compile_tokens(parse_tape(commands))
+
+
+def get_tape_length(commands):
+    if is_plain_tape(commands):
+        return len(commands)
+    return _get_tokens_length(parse_tape(commands))
+
+
+def expand_tape(commands):
+    if is_plain_tape(commands):
+        return commands.upper()
+    return "".join(iter_tape_commands(parse_tape(commands)))
+
+
+def iter_tape_commands(tokens, start=0):
+    for token in tokens:
+        if len(token) == 2:
+            command, count = token
+            if start < count:
+                yield from repeat(command, count - start)
+            start = max(start - count, 0)
+            continue
+
+        count, body, body_length = token
+        if start >= count * body_length:
+            start -= count * body_length
+            continue
+        first_iteration, start = divmod(start, body_length)
+        for _ in range(first_iteration, count):
+            yield from iter_tape_commands(body, start)
+            start = 0
+
+
+def iter_run_positions(runs, x, y, direction_index):
+    for run in runs:
+        if isinstance(run, Repeat):
+            for _ in range(run.count):
+                x, y, direction_index = yield from iter_run_positions(run.body, x, y, direction_index)
+            continue
+
+        forward_moves, turns, rotation = run
+        delta_x, delta_y = MOVE_OFFSETS[direction_index]
+        for _ in range(forward_moves):
+            x += delta_x
+            y += delta_y
+            yield x, y
+        for _ in range(turns):
+            yield x, y
+        direction_index = (direction_index + rotation) % _DIRECTION_COUNT
+    return x, y, direction_index
+
+
+def get_runs_final_state(runs, x, y, direction_index):
+    for run in runs:
+        if isinstance(run, Repeat):
+            delta_x, delta_y = _rotate(*run.displacement, direction_index)
+            x += delta_x
+            y += delta_y
+            direction_index = (direction_index + run.rotation) % _DIRECTION_COUNT
+            continue
+
+        forward_moves, _turns, rotation = run
+        delta_x, delta_y = MOVE_OFFSETS[direction_index]
+        x += delta_x * forward_moves
+        y += delta_y * forward_moves
+        direction_index = (direction_index + rotation) % _DIRECTION_COUNT
+    return x, y, direction_index
+
+
+def get_runs_wall_collision(runs, x, y, direction_index, width, height):
+    step = 0
+    for run in runs:
+        if isinstance(run, Repeat):
+            if _is_box_out_of_bounds(run.box, x, y, direction_index, width, height):
+                repeat_step, position = _get_repeat_wall_collision(run, x, y, direction_index, width, height)
+                return step + repeat_step, position
+            delta_x, delta_y = _rotate(*run.displacement, direction_index)
+            x += delta_x
+            y += delta_y
+            direction_index = (direction_index + run.rotation) % _DIRECTION_COUNT
+            step += run.length
+            continue
+
+        forward_moves, turns, rotation = run
+        delta_x, delta_y = MOVE_OFFSETS[direction_index]
+        if forward_moves:
+            moves_to_wall = _get_moves_to_wall(x, y, delta_x, delta_y, width, height)
+            if moves_to_wall <= forward_moves:
+                return step + moves_to_wall, (x + delta_x * moves_to_wall, y + delta_y * moves_to_wall)
+            x += delta_x * forward_moves
+            y += delta_y * forward_moves
+        step += forward_moves + turns
+        direction_index = (direction_index + rotation) % _DIRECTION_COUNT
+
+    return -1, None
+
+
+def get_runs_last_move_step(runs):
+    step = last_move_step = 0
+    for run in runs:
+        if isinstance(run, Repeat):
+            # A body that moves at all stretches its box, and its last move is in the last iteration
+            if run.box != (0, 0, 0, 0):
+                last_move_step = step + (run.count - 1) * run.body_length + get_runs_last_move_step(run.body)
+            step += run.length
+            continue
+
+        forward_moves, turns, _rotation = run
+        if forward_moves:
+            last_move_step = step + forward_moves
+        step += forward_moves + turns
+    return last_move_step
+
+
+def _get_repeat_wall_collision(run, x, y, direction_index, width, height):
+    # Only the first iteration that leaves the field has to be walked; the ones before it are skipped whole
+    if _get_period(run.body_rotation) == 1:
+        delta_x, delta_y = _rotate(*run.body_displacement, direction_index)
+        # Once the first iteration is inside, later ones can only leave on the side they move towards
+        if _is_box_out_of_bounds(run.body_box, x, y, direction_index, width, height):
+            low = high = 0
+        else:
+            low, high = 1, run.count - 1
+        while low < high:
+            middle = (low + high) // 2
+            if _is_box_out_of_bounds(run.body_box, x + middle * delta_x, y + middle * delta_y, direction_index,
+                                     width, height):
+                high = middle
+            else:
+                low = middle + 1
+        iteration, start_x, start_y = low, low * delta_x, low * delta_y
+    else:
+        starts = _get_iteration_starts(_rotate(*run.body_displacement, direction_index), run.body_rotation,
+                                       min(run.count, _DIRECTION_COUNT))
+        for iteration, (start_x, start_y) in enumerate(starts):
+            if _is_box_out_of_bounds(run.body_box, x + start_x, y + start_y,
+                                     direction_index + iteration * run.body_rotation, width, height):
+                break
+
+    step, position = get_runs_wall_collision(run.body, x + start_x, y + start_y,
+                                             (direction_index + iteration * run.body_rotation) % _DIRECTION_COUNT,
+                                             width, height)
+    return iteration * run.body_length + step, position
+
+
+def _get_moves_to_wall(x, y, delta_x, delta_y, width, height):
+    if delta_x > 0:
+        return width - x
+    if delta_x < 0:
+        return x + 1
+    if delta_y > 0:
+        return height - y
+    return y + 1
+
+
+def _compile_plain_runs(commands):
+    runs = []
+    for match in _RUN_PATTERN.finditer(commands):
+        forward_moves = match.end(1) - match.start(1)
+        turn_commands = match.group(2)
+        if not forward_moves and not turn_commands:
+            continue
+        rotation = turn_commands.count('R') - turn_commands.count('L')
+        runs.append((forward_moves, len(turn_commands), rotation))
+    return runs
+
+
+def _compile_tokens(tokens):
+    runs = []
+    forward_moves = turns = rotation = 0
+    for token in tokens:
+        if len(token) == 2:
+            command, count = token
+            if command == "F":
+                if turns:
+                    runs.append((forward_moves, turns, rotation))
+                    forward_moves = turns = rotation = 0
+                forward_moves += count
+            else:
+                turns += count
+                rotation += count if command == "R" else -count
+            continue
+
+        if forward_moves or turns:
+            runs.append((forward_moves, turns, rotation))
+            forward_moves = turns = rotation = 0
+        count, body, body_length = token
+        if not count or not body_length:
+            continue
+        body_runs = _compile_tokens(body)
+        if count == 1:
+            runs.extend(body_runs)
+        else:
+            runs.append(Repeat(count, body_runs))
+
+    if forward_moves or turns:
+        runs.append((forward_moves, turns, rotation))
+    return runs
+
+
+def _get_tokens_length(tokens):
+    length = 0
+    for token in tokens:
+        if len(token) == 2:
+            length += token[1]
+        else:
+            length += token[0] * token[2]
+    return length
+
+
+def _get_run_effect(run):
+    if isinstance(run, Repeat):
+        return run.length, run.rotation, run.displacement, run.box
+    forward_moves, turns, rotation = run
+    return forward_moves + turns, rotation, (0, forward_moves), (0, 0, 0, forward_moves)
+
+
+def _get_runs_effect(runs):
+    length = rotation = x = y = 0
+    box = (0, 0, 0, 0)
+    for run in runs:
+        run_length, run_rotation, (delta_x, delta_y), run_box = _get_run_effect(run)
+        box = _union_boxes(box, _shift_box(_rotate_box(run_box, rotation), x, y))
+        delta_x, delta_y = _rotate(delta_x, delta_y, rotation)
+        x += delta_x
+        y += delta_y
+        rotation += run_rotation
+        length += run_length
+    return length, rotation, (x, y), box
+
+
+def _get_iteration_starts(displacement, rotation, count):
+    starts = [(0, 0)]
+    x, y = 0, 0
+    for iteration in range(count - 1):
+        delta_x, delta_y = _rotate(*displacement, iteration * rotation)
+        x += delta_x
+        y += delta_y
+        starts.append((x, y))
+    return starts
+
+
+def _get_period(rotation):
+    rotation %= _DIRECTION_COUNT
+    if not rotation:
+        return 1
+    return 2 if rotation == 2 else _DIRECTION_COUNT
+
+
+def _rotate(x, y, rotation):
+    # Quarter turns clockwise, so north turns into east
+    rotation %= _DIRECTION_COUNT
+    if rotation == 0:
+        return x, y
+    if rotation == 1:
+        return y, -x
+    if rotation == 2:
+        return -x, -y
+    return -y, x
+
+
+def _rotate_box(box, rotation):
+    min_x, min_y, max_x, max_y = box
+    first_x, first_y = _rotate(min_x, min_y, rotation)
+    second_x, second_y = _rotate(max_x, max_y, rotation)
+    return min(first_x, second_x), min(first_y, second_y), max(first_x, second_x), max(first_y, second_y)
+
+
+def _shift_box(box, x, y):
+    min_x, min_y, max_x, max_y = box
+    return min_x + x, min_y + y, max_x + x, max_y + y
+
+
+def _union_boxes(box, other_box):
+    return (min(box[0], other_box[0]), min(box[1], other_box[1]), max(box[2], other_box[2]),
+            max(box[3], other_box[3]))
+
+
+def _is_box_out_of_bounds(box, x, y, direction_index, width, height):
+    min_x, min_y, max_x, max_y = _shift_box(_rotate_box(box, direction_index), x, y)
+    return min_x < 0 or min_y < 0 or max_x >= width or max_y >= height
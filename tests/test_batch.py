@@ -0,0 +1,174 @@
+import io
+import json
+
+import pytest
+
+from batch import read_scenarios, build_field, run_scenario, write_records, run_batch, run_scenarios_in_pool
+
+text_scenarios = """10 10
+A 1 2 N FFRFFFFRRL
+B 7 8 W FFLFFFFFFF
+
+10 10
+Test Car A 1 2 N FFFFFFFFFFF
+
+5 5
+Parked 1 1 E
+"""
+
+json_scenario = {
+    "id": "json-1",
+    "width": 10,
+    "height": 10,
+    "cars": [
+        {"name": "A", "position": "1 2 N", "commands": "FFRFFFFRRL"},
+        {"name": "B", "position": "7 8 W", "commands": "FFLFFFFFFF"}
+    ]
+}
+
+
+class TestReadScenarios:
+    def test_should_read_text_scenarios_separated_by_blank_lines(self):
+        result = list(read_scenarios(io.StringIO(text_scenarios)))
+
+        assert len(result) == 3
+        assert result[0]["width"] == 10
+        assert result[0]["cars"][1] == {"name": "B", "position": "7 8 W", "commands": "FFLFFFFFFF"}
+        assert result[1]["cars"][0]["name"] == "Test Car A"
+        assert result[2]["cars"][0] == {"name": "Parked", "position": "1 1 E", "commands": ""}
+
+    def test_should_read_text_scenario_given_compressed_commands(self):
+        result = list(read_scenarios(io.StringIO("10 10\nA 1 2 N F3(FFR)x4\n")))
+
+        assert result[0]["cars"][0] == {"name": "A", "position": "1 2 N", "commands": "F3(FFR)x4"}
+
+    def test_should_read_json_scenarios(self):
+        lines = [json.dumps(json_scenario) + "\n", json.dumps(json_scenario) + "\n"]
+
+        result = list(read_scenarios(lines))
+
+        assert len(result) == 2
+        assert result[0]["id"] == "json-1"
+        assert result[0]["cars"] == json_scenario["cars"]
+
+    @pytest.mark.parametrize(
+        "lines", [
+            ["{not json\n"],
+            ["10\n", "A 1 2 N F\n"],
+            ["10 10\n", "A 1 2 Q F\n"],
+        ])
+    def test_should_return_error_given_invalid_scenario(self, lines):
+        result = list(read_scenarios(lines))
+
+        assert len(result) == 1
+        assert "error" in result[0]
+
+
+class TestBuildField:
+    def test_should_build_field_with_cars(self):
+        field = build_field(json_scenario)
+
+        assert field.width == 10
+        assert [car.name for car in field.cars] == ["A", "B"]
+
+    @pytest.mark.parametrize(
+        "cars", [
+            [],
+            [{"name": "A", "position": "1 2 N", "commands": "F"}, {"name": "A", "position": "3 4 N", "commands": ""}],
+            [{"name": "A", "position": "10 2 N", "commands": "F"}],
+            [{"name": "A", "position": "1 2 N", "commands": "FX"}],
+        ])
+    def test_should_raise_error_given_invalid_cars(self, cars):
+        with pytest.raises(ValueError):
+            build_field({"id": "1", "width": 10, "height": 10, "cars": cars})
+
+
+class TestRunScenario:
+    def test_should_return_results_record(self):
+        result = run_scenario(json_scenario)
+
+        assert result == {
+            "id": "json-1",
+            "results": ["- A, collides with B at (5, 4) at step 7", "- B, collides with A at (5, 4) at step 7"]
+        }
+
+    def test_should_return_error_record_given_invalid_scenario(self):
+        result = run_scenario({"id": "2", "width": 10, "height": 10, "cars": [{"position": "1 2 N"}]})
+
+        assert result["id"] == "2"
+        assert "error" in result
+
+
+class TestWriteRecords:
+    def test_should_write_jsonl_records(self):
+        output = io.StringIO()
+
+        count = write_records([{"id": "1", "results": ["- A, (1, 2) N"]}, {"id": "2", "error": "oops"}], output)
+
+        assert count == 2
+        assert [json.loads(line) for line in output.getvalue().splitlines()] == [
+            {"id": "1", "results": ["- A, (1, 2) N"]},
+            {"id": "2", "error": "oops"}
+        ]
+
+    def test_should_write_text_records(self):
+        output = io.StringIO()
+
+        write_records([{"id": "1", "results": ["- A, (1, 2) N"]}], output, "text")
+
+        assert output.getvalue() == "Scenario 1:\n- A, (1, 2) N\n\n"
+
+
+class TestRunBatch:
+    def test_should_stream_one_record_per_scenario(self):
+        output = io.StringIO()
+
+        summary = run_batch(io.StringIO(text_scenarios), output)
+
+        records = [json.loads(line) for line in output.getvalue().splitlines()]
+        assert summary["scenarios"] == 3
+        assert records[0]["results"] == [
+            "- A, collides with B at (5, 4) at step 7", "- B, collides with A at (5, 4) at step 7"
+        ]
+        assert records[1]["results"] == ["- Test Car A, hits the wall at (1, 10) at step 8"]
+        assert records[2]["results"] == ["- Parked, (1, 1) E"]
+
+
+class TestRunScenariosInPool:
+    def test_should_return_records_in_input_order(self):
+        scenarios = [
+            {"id": str(index), "width": 10, "height": 10,
+             "cars": [{"name": "A", "position": f"{index} 0 N", "commands": "F" * index}]}
+            for index in range(10)
+        ]
+
+        result = list(run_scenarios_in_pool(scenarios, workers=2, chunk_size=3))
+
+        assert [record["id"] for record in result] == [str(index) for index in range(10)]
+        assert result[9]["results"] == ["- A, (9, 9) N"]
+
+    def test_should_isolate_failing_scenario(self):
+        scenarios = [
+            json_scenario,
+            {"id": "broken", "width": 10, "height": 10, "cars": [{"position": "1 2 N"}]},
+            {"id": "3", "width": 10, "height": 10, "cars": [{"name": "C", "position": "1 2 N", "commands": ""}]},
+        ]
+
+        result = list(run_scenarios_in_pool(scenarios, workers=2, chunk_size=1))
+
+        assert result[0]["id"] == "json-1"
+        assert result[1]["id"] == "broken"
+        assert result[1]["error"].startswith("KeyError")
+        assert result[2]["results"] == ["- C, (1, 2) N"]
+
+
+class TestRunBatchSummary:
+    def test_should_report_throughput_given_worker_pool(self):
+        output = io.StringIO()
+
+        summary = run_batch(io.StringIO(text_scenarios + "\n10\n"), output, workers=2, chunk_size=1)
+
+        assert summary["scenarios"] == 4
+        assert summary["failed"] == 1
+        assert summary["scenarios_per_second"] > 0
+        assert len(output.getvalue().splitlines()) == 4
@@ -0,0 +1,54 @@
+import json
+
+from benchmark import generate_cars, run_workload, run_benchmarks, main
+
+
+class TestGenerateCars:
+    def test_should_generate_cars_on_distinct_cells(self):
+        cars = generate_cars(10, 10, 50, 20, seed=1)
+
+        assert len(cars) == 50
+        assert len({car.position for car in cars}) == 50
+        assert all(len(car.commands) == 20 for car in cars)
+
+    def test_should_generate_same_cars_given_same_seed(self):
+        first = generate_cars(10, 10, 5, 20, seed=3)
+        second = generate_cars(10, 10, 5, 20, seed=3)
+
+        assert [car.get_path_and_destination() for car in first] == \
+            [car.get_path_and_destination() for car in second]
+
+    def test_should_generate_cars_converging_on_center(self):
+        cars = generate_cars(11, 11, 8, 0, layout="converging")
+
+        assert {car.get_destination()[:6] for car in cars} == {"(5, 5)"}
+
+
+class TestRunWorkload:
+    def test_should_time_each_stage(self):
+        cars = generate_cars(11, 11, 8, 0, layout="converging")
+
+        result = run_workload(cars, 11, 11, repeat=2)
+
+        assert result["incidents"] == 8
+        for stage in ["get_path_and_destination", "synchronise_paths", "generate_collisions",
+                      "generate_incident_reports"]:
+            assert result["stages"][stage]["runs"] == 2
+
+
+class TestMain:
+    def test_should_write_machine_readable_results(self, tmp_path):
+        output = tmp_path / "results.json"
+
+        main(["--workload", "converging", "--repeat", "1", "--scale", "0.01", "--output", str(output)])
+
+        report = json.loads(output.read_text())
+        assert report["results"][0]["workload"] == "converging"
+        assert report["results"][0]["parameters"]["cars"] == 8
+
+
+class TestRunBenchmarks:
+    def test_should_scale_number_of_cars(self):
+        report = run_benchmarks(["dense"], repeat=1, scale=0.01)
+
+        assert report["results"][0]["parameters"]["cars"] == 18
@@ -43,6 +43,22 @@ class TestGetPathAndDestination:
         assert result_destination == expected_destination
 
 
+class TestIterPositions:
+    def test_should_yield_positions_step_by_step(self):
+        test_car = Car("test car", "1 2 N", "FFRFFFFRRL")
+
+        result = test_car.iter_positions()
+
+        assert next(result) == (1, 2)
+        assert next(result) == (1, 3)
+        assert list(result) == [(1, 4), (1, 4), (2, 4), (3, 4), (4, 4), (5, 4), (5, 4), (5, 4), (5, 4)]
+
+    def test_should_yield_initial_position_given_no_commands(self):
+        test_car = Car("test car", "1 2 N", "")
+
+        assert list(test_car.iter_positions()) == [(1, 2)]
+
+
 class TestMoveForward:
     @pytest.mark.parametrize(
         "direction, expected_x, expected_y", [
@@ -87,3 +103,79 @@ class TestTurnRight:
         test_car = Car("test", f"0 0 {initial_direction}", "")
         test_car._turn_right()
         assert test_car.direction is final_direction
+
+
+class TestGetRuns:
+    def test_should_compile_commands_into_runs(self):
+        test_car = Car("test", "1 2 N", "FFRFFFFRRL")
+
+        result = test_car.get_runs()
+
+        assert result == [(2, 1, 1), (4, 3, 1)]
+
+    def test_should_return_empty_runs_given_no_commands(self):
+        test_car = Car("test", "1 2 N", "")
+
+        assert test_car.get_runs() == []
+
+
+class TestGetDestination:
+    @pytest.mark.parametrize(
+        "car, expected_destination", [
+            (Car("test car", "1 2 N", "FFRFFFFRRL"), "(5, 4) S"),
+            (Car("Drumstick", "3 2 S", "LFFRRFFFLF"), "(2, 1) S"),
+            (Car("Chicken", "4 4 N", "RFFLFFLFFR"), "(4, 6) N"),
+            (Car("Idle", "4 4 W", ""), "(4, 4) W"),
+        ])
+    def test_should_return_destination(self, car, expected_destination):
+        assert car.get_destination() == expected_destination
+
+    def test_should_return_destination_given_long_tape(self):
+        test_car = Car("test", "0 0 E", "F" * 1000000 + "L")
+
+        assert test_car.get_destination() == "(1000000, 0) N"
+
+
+class TestGetWallCollision:
+    @pytest.mark.parametrize(
+        "car, expected_step, expected_position", [
+            (Car("test car", "1 2 N", "FFFFFFFFFFF"), 8, (1, 10)),
+            (Car("Drumstick", "3 4 W", "FFFFF"), 4, (-1, 4)),
+            (Car("Chicken", "4 2 S", "LLRRFFFF"), 7, (4, -1)),
+        ])
+    def test_should_return_step_and_position_given_car_leaves_field(self, car, expected_step, expected_position):
+        result = car.get_wall_collision(10, 10)
+
+        assert result == (expected_step, expected_position)
+
+    def test_should_return_minus_one_given_car_stays_in_field(self):
+        test_car = Car("test car", "1 2 N", "FFRFFFFRRL")
+
+        result = test_car.get_wall_collision(10, 10)
+
+        assert result == (-1, None)
+
+    def test_should_return_step_given_long_tape(self):
+        test_car = Car("test", "0 0 E", "FLFR" * 250000 + "F" * 1000000)
+
+        result = test_car.get_wall_collision(1000, 1000000)
+
+        assert result == (3997, (1000, 999))
+
+
+class TestGetLastActiveStep:
+    @pytest.mark.parametrize(
+        "car, expected_step", [
+            (Car("test car", "1 2 N", "FFFFFFFFFFF"), 8),
+            (Car("test car", "1 2 N", "FFRFFFFRRL"), 7),
+            (Car("test car", "1 2 N", "LLRR"), 0),
+            (Car("test car", "1 2 N", "(FRFL)x3L7"), 11),
+        ])
+    def test_should_return_step_of_wall_hit_or_last_move(self, car, expected_step):
+        assert car.get_last_active_step(10, 10) == expected_step
+
+    def test_should_return_step_given_huge_counts(self):
+        test_car = Car("test", "0 0 N", "(F2L4)x1000000000F1000000000")
+
+        assert test_car.get_last_active_step(10, 100) == 296
+        assert test_car.get_last_active_step(10, 4000000000) == 7000000000
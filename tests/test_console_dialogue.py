@@ -225,7 +225,8 @@ class TestBuildCarStage:
             dialogue_instance._build_car_stage()
         captured = capsys.readouterr().out
 
-        assert "Please enter valid commands (valid commands are: F L R)" in captured
+        assert "Please enter valid commands (valid commands are: F L R, optionally with a count such as F1000 " \
+               "or as a repeat group such as (FFR)x500)" in captured
 
     def test_should_list_all_cars_added(
             self, dialogue_instance, mock_input, capsys
@@ -1,5 +1,14 @@
+import pytest
+
 from field import Field
 from car import Car
+from vectorized import is_numpy_available
+
+_AVAILABLE_ENGINES = [
+    pytest.param(engine, marks=pytest.mark.skipif(not is_numpy_available(), reason="numpy is not installed"))
+    if engine == "numpy" else engine
+    for engine in Field.ENGINES
+]
 
 
 class TestAddCar:
@@ -14,6 +23,48 @@ class TestAddCar:
         assert len(test_field.cars) is 1
         assert isinstance(test_field.cars[0], Car)
 
+    def test_should_raise_error_given_position_out_of_bounds(self):
+        test_field = Field(4, 5)
+
+        with pytest.raises(ValueError, match="out of bounds"):
+            test_field.add_car("A", "5 3 E", "L")
+        assert len(test_field.cars) == 0
+
+
+class TestAddCars:
+    def test_should_add_valid_cars_and_report_errors_per_row(self):
+        test_field = Field(10, 10)
+        test_field.add_car("A", "1 2 N", "FFRFFFFRRL")
+
+        errors = test_field.add_cars([
+            ("B", "7 8 w", "fflfffffff"), ("A", "0 0 N", ""), ("C", "1 2", "F"), ("D", "10 2 N", "F"),
+            ("E", "0 0 S", "FX"), ("B", "3 3 N", ""), ("F", "9 9 N", "")
+        ])
+
+        assert errors == [
+            (1, "\"A\" is already used"), (2, "Invalid position \"1 2\" for C"),
+            (3, "Position \"10 2 N\" of D is out of bounds"), (4, "Invalid commands \"FX\" for E"),
+            (5, "\"B\" is already used")
+        ]
+        assert test_field.get_car_details() == [
+            "- A, (1, 2) N, FFRFFFFRRL", "- B, (7, 8) W, FFLFFFFFFF", "- F, (9, 9) N, "
+        ]
+        assert test_field.is_car_name_used("F") is True
+        assert test_field.is_car_name_used("C") is False
+
+    def test_should_resimulate_incrementally_given_cars_added_in_bulk(self):
+        test_field = Field(10, 10)
+        test_field.add_car("A", "1 2 N", "FFRFFFFRRL")
+        test_field.add_car("B", "7 8 W", "FFLFFFFFFF")
+        test_field.get_simulated_results()
+
+        test_field.add_cars([("C", "3 4 S", ""), ("D", "0 9 E", "FFF")])
+        result = test_field.get_simulated_results()
+
+        assert test_field.incremental_runs == 1
+        assert "- C, collides with A at (3, 4) at step 5" in result
+        assert "- D, (3, 9) E" in result
+
 
 class TestIsCarNameUsed:
     def test_should_return_true_given_car_name_in_already_exists(self):
@@ -92,3 +143,196 @@ class TestGetSimulatedResults:
         assert "- B, collides with A at (5, 4) at step 7" in result
         assert "- C, (9, 9) N" in result
         assert "- D, hits the wall at (0, 0) at step 1" in result
+
+    def test_should_return_structured_records_for_multiple_cars(self):
+        test_field = Field(10, 10)
+        test_field.add_car("A", "1 2 N", "FFRFFFFRRL")
+        test_field.add_car("B", "7 8 W", "FFLFFFFFFF")
+        test_field.add_car("C", "9 9 N", "")
+
+        result = test_field.get_simulated_records()
+
+        assert [(record.car, record.outcome, record.position, record.step) for record in result] == [
+            ("A", "collision", (5, 4), 7), ("B", "collision", (5, 4), 7), ("C", "destination", (9, 9), None)
+        ]
+        assert result[0].other_cars == ["B"]
+        assert result[2].direction == "N"
+
+
+class TestStreamingEngine:
+    def test_should_return_same_results_as_python_engine_given_uneven_tapes(self):
+        results = []
+        for engine in ["python", "streaming"]:
+            test_field = Field(10, 10, engine=engine)
+            test_field.add_car("A", "1 2 N", "FFRFFFFRRL")
+            test_field.add_car("B", "7 8 W", "FFLFFFFFFF" + "L" * 50)
+            test_field.add_car("C", "9 9 N", "")
+            test_field.add_car("D", "0 0 S", "F")
+            test_field.add_car("E", "5 0 N", "RRLL" * 20 + "FFFF")
+            results.append(test_field.get_simulated_results())
+
+        assert results[0] == results[1]
+        assert "- E, collides with A, B at (5, 4) at step 84" in results[1]
+
+    def test_should_return_no_results_given_no_cars(self):
+        test_field = Field(10, 10, engine="streaming")
+
+        assert test_field.get_simulated_results() == []
+        assert test_field.get_timeline().max_steps == 1
+
+
+class TestCompressedTapes:
+    @pytest.mark.parametrize("engine", _AVAILABLE_ENGINES)
+    def test_should_return_same_results_as_expanded_tapes(self, engine):
+        test_field = Field(10, 10, engine=engine)
+        test_field.add_car("A", "1 2 N", "F2RF4R2L")
+        test_field.add_car("B", "7 8 W", "(F)x2LF7")
+        test_field.add_car("C", "0 5 E", "(FFR2)x3")
+
+        result = test_field.get_simulated_results()
+
+        assert result == [
+            "- A, collides with B at (5, 4) at step 7", "- B, collides with A at (5, 4) at step 7", "- C, (2, 5) W"
+        ]
+        assert test_field.get_timeline().get_state_at_step(2) == {
+            "A": ((1, 4), "N", "moving"), "B": ((5, 8), "W", "moving"), "C": ((2, 5), "E", "moving")
+        }
+
+    @pytest.mark.parametrize("engine", [engine for engine in _AVAILABLE_ENGINES if engine != "sharded"])
+    def test_should_not_expand_tape_past_wall_hit_given_huge_count(self, engine):
+        test_field = Field(10, 10, engine=engine)
+        test_field.add_car("A", "0 0 N", "F1000000000")
+        test_field.add_car("B", "5 5 N", "")
+        test_field.add_car("C", "2 9 E", "FL1000000000")
+        test_field.get_simulated_results()
+
+        test_field.add_car("D", "9 0 W", "(FL4)x1000000000")
+        result = test_field.get_simulated_results()
+
+        assert result == [
+            "- A, hits the wall at (0, 9) at step 10", "- B, (5, 5) N", "- C, (3, 9) E",
+            "- D, hits the wall at (0, 0) at step 46"
+        ]
+
+
+class TestUpdateCar:
+    def test_should_replace_car_given_new_commands(self):
+        test_field = Field(10, 10)
+        test_field.add_car("A", "1 2 N", "FFRFFFFRRL")
+
+        test_field.update_car("A", commands="FF")
+
+        assert test_field.get_car_details() == ["- A, (1, 2) N, FF"]
+        assert test_field.get_simulated_results() == ["- A, (1, 4) N"]
+
+    def test_should_raise_error_given_unknown_car(self):
+        test_field = Field(10, 10)
+
+        with pytest.raises(ValueError):
+            test_field.update_car("A", commands="FF")
+
+
+class TestSimulationCache:
+    def test_should_reuse_paths_of_unchanged_cars_given_car_added(self):
+        test_field = Field(10, 10)
+        test_field.add_car("A", "1 2 N", "FFRFFFFRRL")
+        test_field.add_car("B", "7 8 W", "FFLFFFFFFF")
+        test_field.get_simulated_results()
+        misses = test_field.path_cache_misses
+
+        test_field.add_car("C", "9 9 N", "")
+        result = test_field.get_simulated_results()
+
+        assert "- C, (9, 9) N" in result
+        assert test_field.path_cache_misses == misses + 1
+        assert test_field.incremental_runs == 1
+
+    def test_should_resimulate_incrementally_given_car_added_after_run(self):
+        test_field = Field(10, 10)
+        test_field.add_car("A", "1 2 N", "FFRFFFFRRL")
+        test_field.add_car("B", "7 8 W", "FFLFFFFFFF")
+        test_field.get_simulated_results()
+
+        test_field.add_car("C", "3 4 S", "")
+        test_field.add_car("D", "0 9 E", "FFF")
+        result = test_field.get_simulated_results()
+
+        assert test_field.incremental_runs == 1
+        assert result == [
+            "- A, collides with C at (3, 4) at step 5", "- B, (5, 1) S", "- C, collides with A at (3, 4) at step 5",
+            "- D, (3, 9) E"
+        ]
+
+    def test_should_resimulate_fully_given_car_updated_after_run(self):
+        test_field = Field(10, 10)
+        test_field.add_car("A", "1 2 N", "FFRFFFFRRL")
+        test_field.add_car("B", "7 8 W", "FFLFFFFFFF")
+        test_field.get_simulated_results()
+
+        test_field.update_car("A", commands="FF")
+        test_field.add_car("C", "3 4 S", "")
+        result = test_field.get_simulated_results()
+
+        assert test_field.incremental_runs == 0
+        assert "- A, (1, 4) N" in result
+
+    def test_should_invalidate_only_updated_car(self):
+        test_field = Field(10, 10)
+        test_field.add_car("A", "1 2 N", "FFRFFFFRRL")
+        test_field.add_car("B", "7 8 W", "FFLFFFFFFF")
+        test_field.get_simulated_results()
+        misses = test_field.path_cache_misses
+
+        test_field.update_car("B", commands="FFLFF")
+        result = test_field.get_simulated_results()
+
+        assert "- B, (5, 6) S" in result
+        assert test_field.path_cache_misses == misses + 1
+
+    def test_should_return_cached_results_given_unchanged_field(self):
+        test_field = Field(10, 10)
+        test_field.add_car("A", "1 2 N", "FFRFFFFRRL")
+        test_field.add_car("B", "7 8 W", "FFLFFFFFFF")
+
+        first_result = test_field.get_simulated_results()
+        second_result = test_field.get_simulated_results()
+
+        assert first_result == second_result
+        assert test_field.result_cache_hits == 1
+        assert test_field.result_cache_misses == 1
+
+
+class TestCars:
+    def test_should_store_assigned_cars_in_fleet(self):
+        test_field = Field(10, 10)
+
+        test_field.cars = [Car("A", "1 2 N", "FFRFFFFRRL"), Car("B", "7 8 W", "FFLFFFFFFF")]
+        test_field.add_car("C", "9 9 N", "")
+
+        assert [car.name for car in test_field.cars] == ["A", "B", "C"]
+        assert test_field.is_car_name_used("B") is True
+        assert test_field.get_car_details()[1] == "- B, (7, 8) W, FFLFFFFFFF"
+
+    @pytest.mark.parametrize("add_car", [
+        lambda test_field, car: test_field.cars.append(car),
+        lambda test_field, car: setattr(test_field, "cars", [Car("A", "1 2 N", ""), car]),
+    ])
+    def test_should_raise_error_given_car_out_of_bounds(self, add_car):
+        test_field = Field(4, 5)
+        test_field.add_car("B", "0 0 N", "F")
+
+        with pytest.raises(ValueError, match="Position \"5 3 E\" of C is out of bounds"):
+            add_car(test_field, Car("C", "5 3 E", "L"))
+        assert [car.name for car in test_field.cars] == ["B"]
+
+    def test_should_treat_cars_like_a_list(self):
+        test_field = Field(10, 10)
+        assert test_field.cars == []
+
+        test_field.cars.append(Car("A", "1 2 N", "FFRFFFFRRL"))
+        test_field.cars.append(Car("B", "7 8 W", "FFLFFFFFFF"))
+
+        assert test_field.cars[0] in test_field.cars
+        assert test_field.get_simulated_results() == [
+            "- A, collides with B at (5, 4) at step 7", "- B, collides with A at (5, 4) at step 7"
+        ]
@@ -0,0 +1,134 @@
+import pytest
+
+from car import Car
+from fleet import Fleet, FleetCars, FleetCar
+
+
+@pytest.fixture
+def fleet():
+    fleet = Fleet()
+    fleet.append("A", 1, 2, "N", "FFRFFFFRRL")
+    fleet.append("B", 7, 8, "w", "fflfffffff")
+    fleet.append("C", 9, 9, "N", "")
+    return fleet
+
+
+class TestFleet:
+    def test_should_store_cars_in_columns(self, fleet):
+        assert len(fleet) == 3
+        assert fleet.names == ["A", "B", "C"]
+        assert list(fleet.xs) == [1, 7, 9]
+        assert list(fleet.directions) == [0, 3, 0]
+        assert fleet.commands == bytearray(b"FFRFFFFRRLFFLFFFFFFF")
+        assert list(fleet.command_counts) == [10, 10, 0]
+
+    def test_should_return_car_state(self, fleet):
+        assert fleet.get_position(1) == (7, 8)
+        assert fleet.get_direction(1) == "W"
+        assert fleet.get_commands(1) == "FFLFFFFFFF"
+        assert fleet.get_commands(2) == ""
+
+    def test_should_update_car_and_bump_revision(self, fleet):
+        version = fleet.version
+
+        fleet.update(0, 3, 4, "S", "LF")
+
+        assert fleet.get_position(0) == (3, 4)
+        assert fleet.get_direction(0) == "S"
+        assert fleet.get_commands(0) == "LF"
+        assert fleet.get_commands(1) == "FFLFFFFFFF"
+        assert list(fleet.revisions) == [1, 0, 0]
+        assert fleet.version == version + 1
+
+    def test_should_extend_cars_in_bulk(self, fleet):
+        version = fleet.version
+
+        fleet.extend(["D", "E"], [3, 4], [5, 6], ["e", "S"], ["lf", ""])
+
+        assert fleet.names == ["A", "B", "C", "D", "E"]
+        assert fleet.get_position(3) == (3, 5)
+        assert fleet.get_direction(3) == "E"
+        assert fleet.get_commands(3) == "LF"
+        assert fleet.get_commands(4) == ""
+        assert fleet.indexes == {"A": 0, "B": 1, "C": 2, "D": 3, "E": 4}
+        assert list(fleet.revisions) == [0, 0, 0, 0, 0]
+        assert fleet.version == version + 2
+
+    def test_should_count_steps_of_compressed_tapes(self, fleet):
+        fleet.append("D", 0, 0, "N", "F1000(FFR)x500")
+
+        assert fleet.get_commands(3) == "F1000(FFR)X500"
+        assert list(fleet.step_counts) == [10, 10, 0, 2500]
+
+
+class TestFleetCars:
+    def test_should_return_car_views(self, fleet):
+        cars = FleetCars(fleet)
+
+        assert len(cars) == 3
+        assert isinstance(cars[0], Car)
+        assert cars[-1].name == "C"
+        assert [car.name for car in cars[1:]] == ["B", "C"]
+        assert [car.name for car in cars] == ["A", "B", "C"]
+
+    def test_should_compare_like_a_list(self, fleet):
+        cars = FleetCars(fleet)
+
+        assert FleetCars(Fleet()) == []
+        assert cars == [FleetCar(fleet, 0), FleetCar(fleet, 1), FleetCar(fleet, 2)]
+        assert cars[0] in cars
+        assert cars != []
+
+    def test_should_append_car_to_fleet(self, fleet):
+        cars = FleetCars(fleet)
+
+        cars.append(Car("D", "3 4 E", "F2L"))
+
+        assert len(cars) == 4
+        assert cars[3].initial_position == "3 4 E"
+        assert fleet.get_commands(3) == "F2L"
+        assert fleet.indexes["D"] == 3
+
+    def test_should_extend_fleet_given_cars_passing_check(self, fleet):
+        checked_cars = []
+        cars = FleetCars(fleet, lambda car: checked_cars.append(car.name))
+
+        cars.extend([Car("D", "3 4 E", "F2L"), Car("E", "0 0 S", "")])
+
+        assert checked_cars == ["D", "E"]
+        assert [car.name for car in cars] == ["A", "B", "C", "D", "E"]
+
+    def test_should_add_no_car_given_car_failing_check(self, fleet):
+        def check_car(car):
+            if car.name == "E":
+                raise ValueError("Rejected")
+
+        with pytest.raises(ValueError):
+            FleetCars(fleet, check_car).extend([Car("D", "3 4 E", "F2L"), Car("E", "0 0 S", "")])
+        assert len(fleet) == 3
+
+    def test_should_raise_index_error_given_index_out_of_range(self, fleet):
+        with pytest.raises(IndexError):
+            FleetCars(fleet)[3]
+
+
+class TestFleetCar:
+    def test_should_expose_car_api(self, fleet):
+        car = FleetCar(fleet, 0)
+
+        assert car.name == "A"
+        assert car.initial_position == "1 2 N"
+        assert car.position == (1, 2)
+        assert car.direction == "N"
+        assert car.commands == ['F', 'F', 'R', 'F', 'F', 'F', 'F', 'R', 'R', 'L']
+        assert car.get_path_and_destination() == Car("A", "1 2 N", "FFRFFFFRRL").get_path_and_destination()
+
+    def test_should_write_through_to_fleet(self, fleet):
+        car = FleetCar(fleet, 1)
+
+        car._move_forward()
+        car._turn_left()
+
+        assert fleet.get_position(1) == (6, 8)
+        assert fleet.get_direction(1) == "S"
+        assert fleet.revisions[1] == 2
@@ -0,0 +1,69 @@
+import random
+
+import pytest
+
+from car import Car
+from incremental import CollisionCheckpoint
+from utils import get_max_steps, synchronise_paths, generate_collisions
+
+
+def _random_cars(seed, car_count, width, height, max_commands):
+    rng = random.Random(seed)
+    cars = []
+    for index in range(car_count):
+        initial_pos = f"{rng.randrange(width)} {rng.randrange(height)} {rng.choice('NESW')}"
+        commands = "".join(rng.choice("FFFLR") for _ in range(rng.randrange(max_commands)))
+        cars.append(Car(f"car {index}", initial_pos, commands))
+    return cars
+
+
+def _generate_expected_collisions(cars_data, width, height):
+    max_steps = get_max_steps(cars_data)
+    return generate_collisions(synchronise_paths(cars_data, max_steps), max_steps, width, height)
+
+
+def _create_checkpoint(cars, width, height):
+    cars_data = {car.name: car.get_path_and_destination()[0] for car in cars}
+    collisions = _generate_expected_collisions(cars_data, width, height)
+    return CollisionCheckpoint(cars_data, get_max_steps(cars_data), collisions, width, height)
+
+
+class TestCollisionCheckpoint:
+    def test_should_keep_collisions_given_car_meeting_nobody(self):
+        checkpoint = _create_checkpoint([Car("A", "1 2 N", "FFRFFFFRRL"), Car("B", "7 8 W", "FFLFFFFFFF")], 10, 10)
+        collisions = checkpoint.collisions
+
+        resume_step = checkpoint.add_car("C", Car("C", "0 9 E", "FFF").get_path_and_destination()[0])
+
+        assert resume_step is None
+        assert checkpoint.collisions is collisions
+
+    def test_should_resume_from_step_where_car_meets_new_car(self):
+        checkpoint = _create_checkpoint([Car("A", "1 2 N", "FFRFFFFRRL"), Car("B", "7 8 W", "FFLFFFFFFF")], 10, 10)
+
+        resume_step = checkpoint.add_car("C", Car("C", "3 4 S", "").get_path_and_destination()[0])
+
+        assert resume_step == 5
+        assert dict(checkpoint.collisions) == {(3, 4): [(["A", "C"], 5)]}
+
+    def test_should_resume_from_step_where_new_car_hits_wreck(self):
+        checkpoint = _create_checkpoint([Car("A", "1 2 N", "FFRFFFFRRL"), Car("B", "7 8 W", "FFLFFFFFFF")], 10, 10)
+
+        resume_step = checkpoint.add_car("C", Car("C", "6 4 W", "LRLRLRLRF").get_path_and_destination()[0])
+
+        assert resume_step == 9
+        assert dict(checkpoint.collisions) == {(5, 4): [(["A", "B"], 7), (["C"], 9)]}
+
+    @pytest.mark.parametrize("width, height, car_count", [(6, 6, 8), (40, 40, 60)])
+    def test_should_match_full_simulation_given_cars_added_one_by_one(self, width, height, car_count):
+        for seed in range(30):
+            cars = _random_cars(seed, car_count, width, height, 30)
+            checkpoint = _create_checkpoint(cars[:car_count // 2], width, height)
+            cars_data = dict(checkpoint.cars_data)
+
+            for car in cars[car_count // 2:]:
+                path = car.get_path_and_destination()[0]
+                cars_data[car.name] = path
+                checkpoint.add_car(car.name, path)
+
+                assert checkpoint.collisions == _generate_expected_collisions(cars_data, width, height)
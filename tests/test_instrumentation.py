@@ -0,0 +1,74 @@
+import pytest
+
+from field import Field
+from instrumentation import enable_instrumentation, disable_instrumentation, is_instrumentation_enabled, \
+    get_stage_stats, record_stage, merge_stage_stats, instrumented, format_stage_stats
+
+
+@pytest.fixture
+def instrumentation():
+    enable_instrumentation()
+    yield
+    disable_instrumentation()
+
+
+def _build_field():
+    test_field = Field(10, 10)
+    test_field.add_car("A", "1 2 N", "FFRFFFFRRL")
+    test_field.add_car("B", "7 8 W", "FFLFFFFFFF")
+    test_field.add_car("C", "9 9 N", "")
+    return test_field
+
+
+class TestInstrumentedSimulation:
+    def test_should_record_each_stage_given_instrumentation_enabled(self, instrumentation):
+        _build_field().get_simulated_results()
+
+        stats = get_stage_stats()
+
+        assert set(stats) == {"simulation", "paths", "generate_collisions", "generate_incident_reports"}
+        assert stats["simulation"]["calls"] == 1
+        assert stats["paths"]["items"] == {"cars": 3, "steps": 20}
+        assert stats["generate_collisions"]["items"] == {"cars": 3, "steps": 11, "collisions": 1}
+        assert stats["generate_incident_reports"]["items"] == {"reports": 2}
+
+    def test_should_record_nothing_given_instrumentation_disabled(self):
+        _build_field().get_simulated_results()
+
+        assert not is_instrumentation_enabled()
+        assert get_stage_stats() == {}
+
+
+class TestRecordStage:
+    def test_should_accumulate_calls_time_and_items(self, instrumentation):
+        record_stage("stage", 0.5, {"cars": 2})
+        record_stage("stage", 0.25, {"cars": 3})
+
+        assert get_stage_stats() == {"stage": {"calls": 2, "seconds": 0.75, "items": {"cars": 5}}}
+
+    def test_should_merge_stats_from_other_process(self, instrumentation):
+        record_stage("stage", 0.5, {"cars": 2})
+
+        merge_stage_stats({"stage": {"calls": 3, "seconds": 1.0, "items": {"cars": 1, "steps": 4}}})
+
+        assert get_stage_stats() == {"stage": {"calls": 4, "seconds": 1.5, "items": {"cars": 3, "steps": 4}}}
+
+
+class TestInstrumented:
+    def test_should_count_items_from_result(self, instrumentation):
+        @instrumented("double", lambda result, value: {"values": len(result)})
+        def double(value):
+            return [value, value]
+
+        assert double(1) == [1, 1]
+        assert get_stage_stats()["double"]["items"] == {"values": 2}
+
+
+class TestFormatStageStats:
+    def test_should_format_one_line_per_stage(self):
+        stats = {
+            "stage": {"calls": 2, "seconds": 0.5, "items": {"cars": 5}},
+            "other": {"calls": 1, "seconds": 1.0, "items": {}}
+        }
+
+        assert format_stage_stats(stats) == ["stage: 2 calls, 0.5000s, cars 5", "other: 1 calls, 1.0000s"]
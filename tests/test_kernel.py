@@ -0,0 +1,35 @@
+import pytest
+
+from kernel import DIRECTIONS, FORWARD, LEFT, RIGHT, STEP_TABLE, encode_commands, run_commands
+
+
+class TestEncodeCommands:
+    def test_should_encode_commands_as_codes(self):
+        assert encode_commands("FLRflr") == bytes([FORWARD, LEFT, RIGHT, FORWARD, LEFT, RIGHT])
+        assert encode_commands(b"FFR") == bytes([FORWARD, FORWARD, RIGHT])
+
+
+class TestStepTable:
+    @pytest.mark.parametrize(
+        "direction, command, expected_direction, expected_delta", [
+            ("N", FORWARD, "N", (0, 1)),
+            ("E", FORWARD, "E", (1, 0)),
+            ("S", LEFT, "E", (0, 0)),
+            ("W", RIGHT, "N", (0, 0)),
+            ("N", LEFT, "W", (0, 0)),
+        ])
+    def test_should_return_next_state(self, direction, command, expected_direction, expected_delta):
+        state, delta_x, delta_y = STEP_TABLE[DIRECTIONS.index(direction) << 2 | command]
+
+        assert DIRECTIONS[state >> 2] == expected_direction
+        assert (delta_x, delta_y) == expected_delta
+
+
+class TestRunCommands:
+    def test_should_return_final_state(self):
+        result = run_commands(encode_commands("FFRFFFFRRL"), 1, 2, DIRECTIONS.index("N"))
+
+        assert result == (5, 4, DIRECTIONS.index("S"))
+
+    def test_should_return_start_given_no_commands(self):
+        assert run_commands(b"", 3, 4, 2) == (3, 4, 2)
@@ -0,0 +1,81 @@
+import random
+from multiprocessing import shared_memory
+
+import pytest
+
+from field import Field
+from fleet import Fleet
+
+pytest.importorskip("numpy")
+
+from parallel import SharedPathArrays, generate_fleet_paths_parallel, split_cars  # noqa: E402
+from vectorized import fleet_paths_to_arrays  # noqa: E402
+
+
+def _random_fleet(seed, car_count):
+    rng = random.Random(seed)
+    fleet = Fleet()
+    for index in range(car_count):
+        commands = "".join(rng.choice(["F", "F", "L", "R", "F3", "(FR)x3"]) for _ in range(rng.randrange(15)))
+        fleet.append(f"car {index}", rng.randrange(10), rng.randrange(10), rng.choice("NESW"), commands)
+    return fleet
+
+
+class TestSplitCars:
+    @pytest.mark.parametrize(
+        "car_count, workers, expected", [
+            (10, 3, [(0, 3), (3, 6), (6, 10)]),
+            (2, 4, [(0, 1), (1, 2)]),
+            (5, 1, [(0, 5)]),
+            (0, 2, []),
+        ])
+    def test_should_split_cars_into_contiguous_chunks(self, car_count, workers, expected):
+        assert split_cars(car_count, workers) == expected
+
+
+class TestGenerateFleetPathsParallel:
+    @pytest.mark.parametrize("use_processes", [True, False])
+    def test_should_return_same_arrays_as_single_process(self, use_processes):
+        fleet = _random_fleet(0, 40)
+        fleet.update(5, 0, 0, "E", "LFF")
+        expected_xs, expected_ys = fleet_paths_to_arrays(fleet)
+
+        with generate_fleet_paths_parallel(fleet, 3, use_processes) as paths:
+            assert paths.xs.tolist() == expected_xs.tolist()
+            assert paths.ys.tolist() == expected_ys.tolist()
+
+    def test_should_release_shared_memory_when_closed(self):
+        paths = generate_fleet_paths_parallel(_random_fleet(1, 4), 2)
+        buffer_names = paths.names
+        paths.close()
+
+        for buffer_name in buffer_names:
+            with pytest.raises(FileNotFoundError):
+                shared_memory.SharedMemory(name=buffer_name)
+
+    def test_should_return_empty_arrays_given_no_cars(self):
+        with generate_fleet_paths_parallel(Fleet(), 2) as paths:
+            assert paths.xs.shape == (1, 0)
+
+
+class TestSharedPathArrays:
+    def test_should_share_arrays_by_name(self):
+        with SharedPathArrays(3, 2) as paths, SharedPathArrays(3, 2, names=paths.names) as attached_paths:
+            attached_paths.xs[2, 1] = 7
+
+            assert paths.xs[2, 1] == 7
+
+
+class TestParallelNumpyEngine:
+    @pytest.mark.parametrize("seed", range(3))
+    def test_should_return_same_results_as_python_engine(self, seed):
+        results = []
+        for engine, path_workers in [("python", 1), ("numpy", 2)]:
+            test_field = Field(10, 10, engine=engine, path_workers=path_workers)
+            fleet = _random_fleet(seed, 30)
+            for index, car_name in enumerate(fleet.names):
+                x, y = fleet.get_position(index)
+                test_field.add_car(car_name, f"{x} {y} {fleet.get_direction(index)}", fleet.get_commands(index))
+            results.append(test_field.get_simulated_results())
+
+        assert results[0] == results[1]
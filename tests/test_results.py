@@ -0,0 +1,64 @@
+import io
+import json
+
+from results import CarResult, write_results_text, write_results_jsonl, write_results_csv
+from utils import generate_incident_records
+
+
+def _build_results():
+    collisions = {(5, 4): [(["A", "B"], 7), (["C"], 9)], (0, 0): [(["D"], 1)]}
+    records = generate_incident_records(collisions)
+    return [records["A"], records["C"], records["D"], CarResult.destination("E", (9, 9), "N")]
+
+
+class TestCarResult:
+    def test_should_describe_outcome_of_each_car(self):
+        results = _build_results()
+
+        assert [(result.outcome, result.position, result.step) for result in results] == [
+            ("collision", (5, 4), 7), ("collision", (5, 4), 9), ("wall", (0, 0), 1), ("destination", (9, 9), None)
+        ]
+        assert [result.other_cars for result in results] == [["B"], ["A", "B"], [], []]
+
+    def test_should_render_text_on_demand(self):
+        assert [result.render() for result in _build_results()] == [
+            "- A, collides with B at (5, 4) at step 7",
+            "- C, collides with A, B at (5, 4) at step 9",
+            "- D, hits the wall at (0, 0) at step 1",
+            "- E, (9, 9) N"
+        ]
+
+
+class TestWriteResults:
+    def test_should_write_text_lines(self):
+        output = io.StringIO()
+
+        count = write_results_text(_build_results(), output)
+
+        assert count == 4
+        assert output.getvalue().splitlines()[1] == "- C, collides with A, B at (5, 4) at step 9"
+
+    def test_should_write_json_lines(self):
+        output = io.StringIO()
+
+        write_results_jsonl(_build_results(), output)
+
+        records = [json.loads(line) for line in output.getvalue().splitlines()]
+        assert records[1] == {
+            "car": "C", "outcome": "collision", "position": [5, 4], "step": 9, "direction": None,
+            "other_cars": ["A", "B"]
+        }
+        assert records[3]["direction"] == "N"
+
+    def test_should_write_csv_rows(self):
+        output = io.StringIO()
+
+        write_results_csv(_build_results(), output)
+
+        assert output.getvalue().splitlines() == [
+            "car,outcome,x,y,step,direction,other_cars",
+            "A,collision,5,4,7,,B",
+            "C,collision,5,4,9,,A;B",
+            "D,wall,0,0,1,,",
+            "E,destination,9,9,,N,"
+        ]
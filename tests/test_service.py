@@ -0,0 +1,138 @@
+import asyncio
+import json
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from service import SimulationService, start_server
+
+scenario = {
+    "id": "json-1",
+    "width": 10,
+    "height": 10,
+    "cars": [
+        {"name": "A", "position": "1 2 N", "commands": "FFRFFFFRRL"},
+        {"name": "B", "position": "7 8 W", "commands": "FFLFFFFFFF"}
+    ]
+}
+
+
+async def _send_requests(service, lines, unix_socket=None):
+    server = await start_server(service, unix_socket=unix_socket)
+    try:
+        if unix_socket:
+            reader, writer = await asyncio.open_unix_connection(unix_socket)
+        else:
+            reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+        writer.write("".join(line + "\n" for line in lines).encode("utf-8"))
+        await writer.drain()
+        responses = [json.loads(await reader.readline()) for _ in lines]
+        writer.close()
+        await writer.wait_closed()
+        return responses
+    finally:
+        server.close()
+        await server.wait_closed()
+        await service.close()
+
+
+class TestSimulationService:
+    def test_should_answer_each_request_in_order(self):
+        lines = [json.dumps(dict(scenario, id=str(index))) for index in range(3)]
+
+        responses = asyncio.run(_send_requests(SimulationService(workers=1), lines))
+
+        assert [response["id"] for response in responses] == ["0", "1", "2"]
+        assert responses[0]["results"] == [
+            "- A, collides with B at (5, 4) at step 7", "- B, collides with A at (5, 4) at step 7"
+        ]
+        assert responses[0]["latency_ms"] >= 0
+
+    def test_should_batch_requests_arriving_together(self):
+        service = SimulationService(workers=1, max_batch_size=8, batch_delay=0.05)
+        lines = [json.dumps(dict(scenario, id=str(index))) for index in range(8)]
+
+        asyncio.run(_send_requests(service, lines))
+
+        assert service.requests == 8
+        assert service.batches < 8
+
+    def test_should_return_error_given_invalid_request(self):
+        responses = asyncio.run(_send_requests(
+            SimulationService(workers=1), ["{not json", json.dumps({"id": "2", "width": 10})]
+        ))
+
+        assert responses[0]["error"].startswith("Invalid JSON")
+        assert responses[1]["id"] == "2"
+        assert responses[1]["error"] == "Scenario is missing the field width or height"
+
+    def test_should_report_latency_stats(self):
+        responses = asyncio.run(_send_requests(
+            SimulationService(workers=1), [json.dumps(scenario), json.dumps({"command": "stats"})]
+        ))
+
+        assert "batches" in responses[1]
+        assert set(responses[1]["latency_ms"]) == {"p50", "p95", "p99", "max"}
+
+    def test_should_listen_on_unix_socket(self, tmp_path):
+        responses = asyncio.run(_send_requests(
+            SimulationService(workers=1), [json.dumps(scenario)], str(tmp_path / "simulation.sock")
+        ))
+
+        assert responses[0]["id"] == "json-1"
+
+    def test_should_close_connection_once_answers_are_sent(self):
+        async def read_until_closed():
+            service = SimulationService(workers=1)
+            server = await start_server(service)
+            try:
+                reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+                writer.write((json.dumps(scenario) + "\n").encode("utf-8"))
+                writer.write_eof()
+                data = await asyncio.wait_for(reader.read(), 10)
+                writer.close()
+                await writer.wait_closed()
+                return data
+            finally:
+                server.close()
+                await server.wait_closed()
+                await service.close()
+
+        data = asyncio.run(read_until_closed())
+
+        assert json.loads(data)["id"] == "json-1"
+
+
+class TestFailedBatches:
+    @staticmethod
+    async def _simulate_with_executor(executor):
+        service = SimulationService(workers=1, batch_delay=0)
+        await service.start()
+        service._executor.shutdown()
+        service._executor = executor
+        try:
+            return [await asyncio.wait_for(service.simulate(dict(scenario, id=str(index))), 10)
+                    for index in range(2)]
+        finally:
+            await service.close()
+
+    def test_should_fail_requests_given_executor_refusing_work(self):
+        executor = ProcessPoolExecutor(max_workers=1)
+        executor.shutdown()
+
+        records = asyncio.run(self._simulate_with_executor(executor))
+
+        assert [record["id"] for record in records] == ["0", "1"]
+        assert all(record["error"].startswith("Worker failed: RuntimeError") for record in records)
+
+    def test_should_fail_requests_given_cancelled_batch(self):
+        class CancellingExecutor:
+            def submit(self, *_args):
+                future = Future()
+                future.cancel()
+                return future
+
+            def shutdown(self, *_args, **_kwargs):
+                pass
+
+        records = asyncio.run(self._simulate_with_executor(CancellingExecutor()))
+
+        assert all(record["error"].startswith("Worker failed: CancelledError") for record in records)
@@ -0,0 +1,131 @@
+import random
+
+import pytest
+
+from car import Car
+from field import Field
+import sharded
+from sharded import generate_collisions_sharded, split_field, find_region
+from utils import get_max_steps, synchronise_paths, generate_collisions
+
+
+def _random_cars(seed, car_count, width, height, max_commands):
+    rng = random.Random(seed)
+    cars = []
+    for index in range(car_count):
+        initial_pos = f"{rng.randrange(width)} {rng.randrange(height)} {rng.choice('NESW')}"
+        commands = "".join(rng.choice("FFFLR") for _ in range(rng.randrange(max_commands)))
+        cars.append(Car(f"car {index}", initial_pos, commands))
+    return cars
+
+
+def _generate_expected_collisions(cars, width, height):
+    cars_data = {car.name: car.get_path_and_destination()[0] for car in cars}
+    max_steps = get_max_steps(cars_data)
+    return generate_collisions(synchronise_paths(cars_data, max_steps), max_steps, width, height)
+
+
+def _to_sharded_cars(cars):
+    return [(car.name, car.position, car.direction, ''.join(car.commands)) for car in cars]
+
+
+class TestSplitField:
+    @pytest.mark.parametrize(
+        "width, height, shards, expected_columns, expected_rows", [
+            (10, 10, 4, [0, 5], [0, 5]),
+            (100, 10, 4, [0, 25, 50, 75], [0]),
+            (10, 10, 1, [0], [0]),
+            (2, 1, 5, [0, 1], [0]),
+        ])
+    def test_should_split_field_into_regions(self, width, height, shards, expected_columns, expected_rows):
+        assert split_field(width, height, shards) == (expected_columns, expected_rows)
+
+
+class TestFindRegion:
+    @pytest.mark.parametrize(
+        "x, y, expected_region", [
+            (0, 0, 0),
+            (5, 0, 1),
+            (4, 5, 2),
+            (9, 9, 3),
+            (10, 9, 3),
+            (-1, 7, 2),
+        ])
+    def test_should_return_region_of_cell(self, x, y, expected_region):
+        assert find_region(x, y, [0, 5], [0, 5], 10, 10) == expected_region
+
+
+class TestGenerateCollisionsSharded:
+    def test_should_generate_collision_given_cars_meeting_after_crossing_border(self):
+        cars = [Car("A", "3 5 E", "FFFF"), Car("B", "7 5 W", "FFFF"), Car("C", "9 0 N", "FFFFFFFFFFF")]
+
+        result = generate_collisions_sharded(_to_sharded_cars(cars), 10, 10, 4, use_processes=False)
+
+        assert result == {(5, 5): [(['A', 'B'], 2)], (9, 9): [(['C'], 10)]}
+
+    @pytest.mark.parametrize("seed", range(20))
+    def test_should_match_python_engine_given_random_fleets(self, seed):
+        cars = _random_cars(seed, 40, 8, 6, 60)
+
+        expected = _generate_expected_collisions(cars, 8, 6)
+        result = generate_collisions_sharded(_to_sharded_cars(cars), 8, 6, seed % 6 + 1, use_processes=False)
+
+        assert list(result.items()) == list(expected.items())
+
+    def test_should_match_python_engine_given_worker_processes(self):
+        cars = _random_cars(0, 60, 12, 12, 80)
+
+        expected = _generate_expected_collisions(cars, 12, 12)
+        result = generate_collisions_sharded(_to_sharded_cars(cars), 12, 12, 4)
+
+        assert list(result.items()) == list(expected.items())
+
+    @pytest.mark.parametrize("shards", [1, 4])
+    def test_should_generate_wall_collision_given_car_starting_far_outside_field(self, shards):
+        cars = [("A", (5, 5), "N", "FF"), ("B", (1, 1), "N", "")]
+
+        result = generate_collisions_sharded(cars, 3, 3, shards, use_processes=False)
+
+        assert result == {(5, 5): [(['A'], 1)]}
+
+    def test_should_stop_after_last_step_given_car_left_in_cell_of_car_hitting_wall(self):
+        cars = [("A", (1, 0), "W", "F"), ("B", (0, 0), "W", "F")]
+
+        result = generate_collisions_sharded(cars, 3, 1, 1, use_processes=False)
+
+        assert result == {(0, 0): [(['B'], 1)]}
+
+    def test_should_ship_each_tape_to_a_shard_once(self, monkeypatch):
+        shipped_tapes = []
+        send = sharded._LocalShard.send
+
+        def record_send(shard, command, *arguments):
+            shipped_tapes.extend((id(shard), order) for order in arguments[-1])
+            send(shard, command, *arguments)
+
+        monkeypatch.setattr(sharded._LocalShard, "send", record_send)
+        cars = [Car("A", "0 5 E", "F" * 9 + "L" * 40), Car("B", "9 0 N", "F" * 9 + "R" * 40)]
+
+        result = generate_collisions_sharded(_to_sharded_cars(cars), 10, 10, 4, use_processes=False)
+
+        assert result == {}
+        assert len(shipped_tapes) == len(set(shipped_tapes)) == 4
+
+    def test_should_return_empty_dictionary_given_no_cars(self):
+        result = generate_collisions_sharded([], 10, 10, 4, use_processes=False)
+
+        assert not result.keys()
+
+
+class TestShardedEngine:
+    def test_should_return_same_results_as_python_engine(self):
+        results = []
+        for engine in ["python", "sharded"]:
+            test_field = Field(10, 10, engine=engine)
+            test_field.add_car("A", "1 2 N", "FFRFFFFRRL")
+            test_field.add_car("B", "7 8 W", "FFLFFFFFFF")
+            test_field.add_car("C", "9 9 N", "")
+            test_field.add_car("D", "0 0 S", "F")
+            results.append(test_field.get_simulated_results())
+
+        assert results[0] == results[1]
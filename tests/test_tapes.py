@@ -0,0 +1,71 @@
+import pytest
+
+from car import Car
+from tapes import Repeat, is_tape_valid, parse_tape, compile_tape, get_tape_length, expand_tape, iter_tape_commands
+
+
+class TestIsTapeValid:
+    @pytest.mark.parametrize("commands", ["", "FFRFFFFRRL", "flr", "F1000", "(FFR)x500", "((FL2)X3R)x2F"])
+    def test_should_return_true_given_valid_tape(self, commands):
+        assert is_tape_valid(commands) is True
+
+    @pytest.mark.parametrize("commands", ["FX", "(FF", "FF)x2", "(FF)", "(FF)x", "Fx2", "F-1", "F 2"])
+    def test_should_return_false_given_invalid_tape(self, commands):
+        assert is_tape_valid(commands) is False
+
+
+class TestParseTape:
+    def test_should_parse_counts_and_repeat_groups(self):
+        assert parse_tape("F3(fr)x2L") == [("F", 3), (2, [("F", 1), ("R", 1)], 2), ("L", 1)]
+
+    def test_should_raise_error_given_unbalanced_group(self):
+        with pytest.raises(ValueError):
+            parse_tape("(F(R)x2")
+
+
+class TestCompileTape:
+    def test_should_compile_plain_tape_into_runs(self):
+        assert compile_tape("FFRFFFFRRL") == [(2, 1, 1), (4, 3, 1)]
+
+    def test_should_keep_repeat_groups_compressed(self):
+        assert compile_tape("F1000(FFR)x500L2") == [(1000, 0, 0), Repeat(500, [(2, 1, 1)]), (0, 2, -2)]
+
+    def test_should_drop_empty_groups_and_unwrap_single_repeats(self):
+        assert compile_tape("(F)x0(FR)x1") == [(1, 1, 1)]
+
+
+class TestExpandTape:
+    def test_should_return_length_without_expanding(self):
+        assert get_tape_length("((F1000R)x1000000)x1000") == 1001 * 10 ** 9
+
+    def test_should_expand_tape(self):
+        assert expand_tape("f2(LR2)x2") == "FFLRRLRR"
+
+    def test_should_iterate_commands_from_step(self):
+        tokens = parse_tape("F2(LR2)x2")
+
+        assert "".join(iter_tape_commands(tokens, 3)) == "RRLRR"
+        assert "".join(iter_tape_commands(tokens, 8)) == ""
+
+
+class TestCompressedCar:
+    @pytest.mark.parametrize(
+        "commands", ["F3(FFR)x7L", "((F2L)x3R)x5F", "(RF(FL3)x2)x6", "(F4R2)x3F", "(L)x9(F)x20"])
+    def test_should_match_expanded_tape(self, commands):
+        car = Car("test", "2 3 E", commands)
+        expanded_car = Car("test", "2 3 E", expand_tape(commands))
+
+        assert list(car.iter_positions()) == list(expanded_car.iter_positions())
+        assert car.get_destination() == expanded_car.get_destination()
+        for width, height in [(5, 5), (8, 6), (30, 30)]:
+            assert car.get_wall_collision(width, height) == expanded_car.get_wall_collision(width, height)
+
+    def test_should_return_destination_given_huge_repeat_count(self):
+        test_car = Car("test", "0 0 N", "(F1000R)x1000000001")
+
+        assert test_car.get_destination() == "(0, 1000) E"
+
+    def test_should_return_wall_collision_given_huge_repeat_count(self):
+        test_car = Car("test", "0 0 E", "(FFL2R2)x1000000000")
+
+        assert test_car.get_wall_collision(2000000, 10) == (5999996, (2000000, 0))
@@ -0,0 +1,71 @@
+import pytest
+
+from field import Field
+from fleet import Fleet
+from timeline import Timeline
+
+
+def _build_field(checkpoint_interval):
+    test_field = Field(10, 10, checkpoint_interval=checkpoint_interval)
+    test_field.add_car("A", "1 2 N", "FFRFFFFRRL")
+    test_field.add_car("B", "7 8 W", "FFLFFFFFFF")
+    test_field.add_car("C", "9 9 N", "")
+    test_field.add_car("D", "0 0 S", "F")
+    return test_field
+
+
+class TestTimeline:
+    @pytest.mark.parametrize("checkpoint_interval", [1, 3, 64])
+    def test_should_return_positions_at_step(self, checkpoint_interval):
+        timeline = _build_field(checkpoint_interval).get_timeline()
+
+        assert timeline.get_positions_at_step(0) == {"A": (1, 2), "B": (7, 8), "C": (9, 9), "D": (0, 0)}
+        assert timeline.get_positions_at_step(5) == {"A": (3, 4), "B": (5, 6), "C": (9, 9), "D": (0, 0)}
+        assert timeline.get_positions_at_step(9) == {"A": (5, 4), "B": (5, 4), "C": (9, 9), "D": (0, 0)}
+
+    @pytest.mark.parametrize("checkpoint_interval", [1, 4])
+    def test_should_return_state_just_before_first_crash(self, checkpoint_interval):
+        test_field = Field(10, 10, checkpoint_interval=checkpoint_interval)
+        test_field.add_car("A", "1 2 N", "FFRFFFFRRL")
+        test_field.add_car("B", "7 8 W", "FFLFFFFFFF")
+        timeline = test_field.get_timeline()
+
+        first_crash_step = timeline.get_first_crash_step()
+
+        assert first_crash_step == 7
+        assert timeline.get_state_at_step(first_crash_step - 1) == {
+            "A": ((4, 4), "E", "moving"), "B": ((5, 5), "S", "moving")
+        }
+        assert timeline.get_state_at_step(first_crash_step) == {
+            "A": ((5, 4), "E", "crashed"), "B": ((5, 4), "S", "crashed")
+        }
+
+    def test_should_keep_car_hitting_wall_in_cell_it_left(self):
+        timeline = _build_field(2).get_timeline()
+
+        assert timeline.get_state_at_step(1, ["C", "D"]) == {
+            "C": ((9, 9), "N", "stopped"), "D": ((0, 0), "S", "crashed")
+        }
+
+    def test_should_return_final_state_given_step_after_last_command(self):
+        timeline = _build_field(4).get_timeline()
+
+        assert timeline.get_positions_at_step(100) == timeline.get_positions_at_step(timeline.max_steps - 1)
+
+    def test_should_rebuild_timeline_given_car_added(self):
+        test_field = _build_field(4)
+        test_field.get_timeline()
+
+        test_field.add_car("E", "2 2 E", "FF")
+
+        assert test_field.get_timeline().get_positions_at_step(2)["E"] == (4, 2)
+
+    def test_should_raise_error_given_negative_step(self):
+        timeline = _build_field(4).get_timeline()
+
+        with pytest.raises(ValueError):
+            timeline.get_positions_at_step(-1)
+
+    def test_should_raise_error_given_invalid_checkpoint_interval(self):
+        with pytest.raises(ValueError):
+            Timeline(Fleet(), {}, 10, 10, 0)
@@ -0,0 +1,60 @@
+import pytest
+
+from field import Field
+from trajectories import TrajectoryFile
+
+
+def _export_field(tmp_path):
+    test_field = Field(10, 10)
+    test_field.add_car("A", "1 2 N", "FFRFFFFRRL")
+    test_field.add_car("B", "7 8 W", "FFLFFFFFFF")
+    test_field.add_car("C", "9 9 N", "")
+    test_field.add_car("D", "0 0 S", "F")
+    file_path = tmp_path / "trajectories.bin"
+    test_field.export_trajectories(file_path)
+    return file_path
+
+
+class TestTrajectoryFile:
+    def test_should_read_header_and_car_metadata(self, tmp_path):
+        with TrajectoryFile(_export_field(tmp_path)) as trajectory_file:
+            assert (len(trajectory_file), trajectory_file.step_count) == (4, 11)
+            assert (trajectory_file.field_width, trajectory_file.field_height) == (10, 10)
+            assert trajectory_file.get_car(1) == {
+                "name": "B", "position": (7, 8), "direction": "W", "commands": 10, "crash_step": 7
+            }
+            assert trajectory_file.get_car(2)["crash_step"] is None
+
+    def test_should_read_path_of_car_without_copying(self, tmp_path):
+        with TrajectoryFile(_export_field(tmp_path)) as trajectory_file:
+            path = trajectory_file.get_path(trajectory_file.get_index("A"))
+
+            assert isinstance(path, memoryview)
+            assert path.tolist() == [1, 2, 1, 3, 1, 4, 1, 4, 2, 4, 3, 4, 4, 4, 5, 4, 5, 4, 5, 4, 5, 4]
+            path.release()
+
+    def test_should_read_positions_at_step(self, tmp_path):
+        with TrajectoryFile(_export_field(tmp_path)) as trajectory_file:
+            assert trajectory_file.get_positions_at_step(1) == [(1, 3), (6, 8), (9, 9), (0, 0)]
+            assert trajectory_file.get_positions_at_step(50) == [(5, 4), (5, 4), (9, 9), (0, 0)]
+
+    def test_should_read_incidents(self, tmp_path):
+        with TrajectoryFile(_export_field(tmp_path)) as trajectory_file:
+            assert sorted(trajectory_file.iter_incidents()) == [((0, 0), ["D"], 1), ((5, 4), ["A", "B"], 7)]
+
+    def test_should_export_single_car_hitting_wall(self, tmp_path):
+        test_field = Field(10, 10)
+        test_field.add_car("A", "1 8 N", "FFF")
+        file_path = tmp_path / "trajectories.bin"
+        test_field.export_trajectories(file_path)
+
+        with TrajectoryFile(file_path) as trajectory_file:
+            assert list(trajectory_file.iter_incidents()) == [((1, 10), ["A"], 2)]
+            assert trajectory_file.get_positions_at_step(3) == [(1, 9)]
+
+    def test_should_raise_error_given_other_file(self, tmp_path):
+        file_path = tmp_path / "other.bin"
+        file_path.write_bytes(b"not a trajectory file" * 10)
+
+        with pytest.raises(ValueError):
+            TrajectoryFile(file_path)
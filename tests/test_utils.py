@@ -1,10 +1,12 @@
+import random
 from collections import defaultdict
 
 import pytest
 
 from utils import get_max_steps, synchronise_paths, generate_collisions, update_path_after_collision, \
-    generate_incident_reports, is_initial_pos_out_of_bound, _find_name_in_positions, _is_position_out_of_bounds, \
-    get_single_car_collision
+    generate_incident_reports, is_initial_pos_out_of_bound, _find_name_in_positions, is_position_out_of_bounds, \
+    get_single_car_collision, generate_streamed_collisions, _find_interacting_cars, get_moving_length, \
+    is_grid_suitable
 
 mock_car_paths_A = {
     'A': [(1, 2), (1, 3), (1, 4), (1, 4), (2, 4), (3, 4), (4, 4), (5, 4), (5, 4), (5, 4), (5, 4)],
@@ -178,6 +180,34 @@ class TestGenerateCollision:
         assert (['Drumstick'], 1) in collisions[(9, 9)]
         assert (['Chicken'], 2) in collisions[(9, 9)]
 
+    def test_should_generate_collisions_data_given_cars_sharing_initial_position(self):
+        car_paths = {
+            'Drumstick': [(2, 2), (2, 2), (2, 2)],
+            'Chicken': [(2, 2), (2, 2), (2, 3)],
+        }
+        collisions = generate_collisions(car_paths, 3, 10, 10)
+
+        assert collisions[(2, 2)] == [(['Drumstick', 'Chicken'], 1)]
+
+    def test_should_generate_collisions_data_given_car_left_in_cell_of_car_hitting_wall(self):
+        car_paths = {
+            'Drumstick': [(0, 0), (0, 0), (0, 0)],
+            'Chicken': [(0, 0), (-1, 0), (-1, 0)],
+        }
+        collisions = generate_collisions(car_paths, 3, 10, 10)
+
+        assert collisions[(0, 0)] == [(['Chicken'], 1), (['Drumstick'], 2)]
+
+    @pytest.mark.parametrize("use_grid", [False, True])
+    def test_should_generate_collisions_data_given_car_parked_outside_field_with_another(self, use_grid):
+        car_paths = {
+            'Drumstick': [(5, 3), (5, 3)],
+            'Chicken': [(5, 3), (5, 4)],
+        }
+        collisions = generate_collisions(car_paths, 2, 4, 5, use_grid=use_grid)
+
+        assert collisions == {(5, 3): [(['Chicken'], 1)]}
+
     def test_should_empty_dictionary_given_no_collisions(self):
         max_steps = get_max_steps(mock_car_paths_B)
         cars_data = synchronise_paths(mock_car_paths_B, max_steps)
@@ -186,6 +216,184 @@ class TestGenerateCollision:
         assert not collisions.keys()
 
 
+class TestGenerateCollisionWindows:
+    @pytest.mark.parametrize("max_window", [1, 2, 3, 64])
+    def test_should_not_depend_on_window_size(self, max_window):
+        max_steps = get_max_steps(mock_car_paths_A)
+        cars_data = synchronise_paths(mock_car_paths_A, max_steps)
+
+        collisions = generate_collisions(cars_data, max_steps, 10, 10, max_window)
+
+        assert collisions == {(5, 4): [(['A', 'C'], 7), (['B'], 9)]}
+
+    def test_should_generate_collision_given_cars_apart_in_earlier_windows(self):
+        car_paths = {
+            'Drumstick': [(x, 0) for x in range(100)],
+            'Chicken': [(90, 0)] * 100,
+            'Coconut': [(x, 50) for x in range(100)],
+        }
+        collisions = generate_collisions(car_paths, 100, 100, 100, 4)
+
+        assert collisions == {(90, 0): [(['Drumstick', 'Chicken'], 90)]}
+
+    def test_should_generate_collision_given_car_skipped_in_earlier_windows_hits_wall(self):
+        car_paths = {
+            'Drumstick': [(0, y) for y in range(50, -2, -1)],
+            'Chicken': [(60, 60)] * 52,
+        }
+        collisions = generate_collisions(car_paths, 52, 100, 100, 8)
+
+        assert collisions == {(0, 0): [(['Drumstick'], 51)]}
+
+
+class TestGridCollisions:
+    @pytest.mark.parametrize(
+        "car_paths, max_steps", [
+            (mock_car_paths_A, 11),
+            (mock_car_paths_B, 11),
+            (mock_car_paths_C, 3),
+            ({'Drumstick': [(2, 2), (2, 2), (2, 2)], 'Chicken': [(2, 2), (2, 2), (2, 3)]}, 3),
+            ({'Drumstick': [(0, 0), (0, 0), (0, 0)], 'Chicken': [(0, 0), (-1, 0), (-1, 0)]}, 3),
+            ({'Drumstick': [(1, 0), (0, 0), (-1, 0)], 'Chicken': [(0, 1), (0, 0), (0, 0)]}, 3),
+        ])
+    def test_should_return_same_collisions_as_cell_index(self, car_paths, max_steps):
+        cars_data = synchronise_paths(car_paths, max_steps)
+
+        collisions = generate_collisions(cars_data, max_steps, 10, 10, use_grid=True)
+
+        assert list(collisions.items()) == list(generate_collisions(cars_data, max_steps, 10, 10).items())
+
+    @pytest.mark.parametrize("seed", range(20))
+    def test_should_return_same_collisions_as_cell_index_given_crowded_field(self, seed):
+        rng = random.Random(seed)
+        car_paths = {}
+        for index in range(12):
+            path = [(rng.randrange(5), rng.randrange(5))]
+            for _ in range(rng.randrange(15)):
+                delta_x, delta_y = rng.choice([(0, 0), (0, 1), (1, 0), (0, -1), (-1, 0)])
+                path.append((path[-1][0] + delta_x, path[-1][1] + delta_y))
+            car_paths[f"car {index}"] = path
+        max_steps = get_max_steps(car_paths)
+        cars_data = synchronise_paths(car_paths, max_steps)
+
+        collisions = generate_collisions(cars_data, max_steps, 5, 5, use_grid=True)
+
+        assert list(collisions.items()) == list(generate_collisions(cars_data, max_steps, 5, 5).items())
+
+    @pytest.mark.parametrize(
+        "car_count, width, height, expected", [
+            (100, 10, 10, True),
+            (2, 10, 10, True),
+            (1, 10, 10, False),
+            (1000, 1000, 1000, False),
+            (10 ** 6, 10 ** 4, 10 ** 4, False),
+            (2, 0, 0, False),
+        ])
+    def test_should_pick_grid_for_crowded_fields(self, car_count, width, height, expected):
+        assert is_grid_suitable(car_count, width, height) is expected
+
+
+class TestFindInteractingCars:
+    def test_should_skip_cars_whose_boxes_are_apart(self):
+        window_paths = {
+            'Drumstick': [(1, 0), (2, 0)],
+            'Chicken': [(50, 1), (50, 2)],
+        }
+        previous_cells = {'Drumstick': (0, 0), 'Chicken': (50, 0)}
+
+        result = _find_interacting_cars(window_paths, 2, previous_cells, set(), 100, 100)
+
+        assert result == set()
+
+    def test_should_return_cars_whose_boxes_overlap(self):
+        window_paths = {
+            'Drumstick': [(1, 1), (2, 1)],
+            'Chicken': [(1, 2), (1, 1)],
+            'Coconut': [(80, 80), (81, 80)],
+        }
+        previous_cells = {'Drumstick': (0, 1), 'Chicken': (1, 3), 'Coconut': (79, 80)}
+
+        result = _find_interacting_cars(window_paths, 2, previous_cells, set(), 100, 100)
+
+        assert result == {'Drumstick', 'Chicken'}
+
+    def test_should_return_car_leaving_field_or_driving_through_obstacle(self):
+        window_paths = {
+            'Drumstick': [(0, 0), (0, -1)],
+            'Chicken': [(41, 40), (42, 40)],
+            'Coconut': [(80, 80), (81, 80)],
+        }
+        previous_cells = {'Drumstick': (0, 1), 'Chicken': (40, 40), 'Coconut': (79, 80)}
+
+        result = _find_interacting_cars(window_paths, 2, previous_cells, {(42, 40)}, 100, 100)
+
+        assert result == {'Drumstick', 'Chicken'}
+
+
+class TestGenerateStreamedCollisions:
+    @pytest.mark.parametrize(
+        "car_paths", [
+            mock_car_paths_A,
+            mock_car_paths_B,
+            mock_car_paths_C,
+        ])
+    def test_should_match_synchronised_paths_given_streams_of_varying_lengths(self, car_paths):
+        max_steps = get_max_steps(car_paths)
+        position_streams = {car: iter(path) for car, path in car_paths.items()}
+
+        collisions = generate_streamed_collisions(position_streams, max_steps, 10, 10)
+
+        expected = generate_collisions(synchronise_paths(car_paths, max_steps), max_steps, 10, 10)
+        assert list(collisions.items()) == list(expected.items())
+
+    def test_should_keep_car_with_finished_stream_in_place(self):
+        position_streams = {
+            'Drumstick': iter([(5, 5)]),
+            'Chicken': iter([(5, 7), (5, 6), (5, 5)]),
+        }
+
+        collisions = generate_streamed_collisions(position_streams, 3, 10, 10)
+
+        assert collisions[(5, 5)] == [(['Drumstick', 'Chicken'], 2)]
+
+
+class TestEarlyTermination:
+    def test_should_stop_once_all_streams_have_run_out(self):
+        position_streams = {
+            'Drumstick': iter([(5, 5), (5, 6)]),
+            'Chicken': iter([(5, 8), (5, 7), (5, 6)]),
+        }
+
+        collisions = generate_streamed_collisions(position_streams, 10 ** 9, 10, 10)
+
+        assert collisions == {(5, 6): [(['Drumstick', 'Chicken'], 2)]}
+
+    def test_should_check_pending_wreck_after_last_stream_runs_out(self):
+        position_streams = {
+            'Drumstick': iter([(0, 0)]),
+            'Chicken': iter([(0, 0), (-1, 0)]),
+        }
+
+        collisions = generate_streamed_collisions(position_streams, 10 ** 9, 10, 10)
+
+        assert collisions == {(0, 0): [(['Chicken'], 1), (['Drumstick'], 2)]}
+
+
+class TestGetMovingLength:
+    @pytest.mark.parametrize(
+        "path, expected_length", [
+            ([], 0),
+            ([(1, 1)], 1),
+            ([(1, 1), (1, 1), (1, 1)], 1),
+            ([(1, 1), (1, 2), (1, 2), (1, 2)], 2),
+            ([(1, 2), (1, 3), (1, 2), (1, 2)], 3),
+            ([(0, 0)] + [(0, 1)] * 100, 2),
+            ([(0, 1), (0, 0)] * 20 + [(0, 1)] * 70, 41),
+        ])
+    def test_should_return_length_without_parked_tail(self, path, expected_length):
+        assert get_moving_length(path) == expected_length
+
+
 class TestIsCarTouchingWall:
     @pytest.mark.parametrize(
         "position, width, height", [
@@ -198,11 +406,11 @@ class TestIsCarTouchingWall:
     def test_should_return_true_given_car_out_of_bounds(
             self, position, width, height
     ):
-        result = _is_position_out_of_bounds(position, width, height)
+        result = is_position_out_of_bounds(position, width, height)
         assert result is True
 
     def test_should_return_false_given_car_within_bounds(self):
-        result = _is_position_out_of_bounds((5, 5), 10, 10)
+        result = is_position_out_of_bounds((5, 5), 10, 10)
         assert result is False
 
 
@@ -0,0 +1,145 @@
+import random
+
+import pytest
+
+from car import Car
+from field import Field
+from fleet import Fleet
+from utils import get_max_steps, synchronise_paths, generate_collisions, generate_incident_reports
+
+pytest.importorskip("numpy")
+
+from vectorized import generate_collisions_vectorized, paths_to_arrays, fleet_paths_to_arrays  # noqa: E402
+
+mock_car_paths_A = {
+    'A': [(1, 2), (1, 3), (1, 4), (1, 4), (2, 4), (3, 4), (4, 4), (5, 4), (5, 4), (5, 4), (5, 4)],
+    'B': [(0, 0), (1, 0), (2, 0), (3, 0), (4, 0), (5, 0), (5, 1), (5, 2), (5, 3), (5, 4)],
+    'C': [(10, 10), (9, 9), (8, 8), (7, 7), (6, 6), (5, 5), (5, 4)]
+}
+
+mock_car_paths_B = {
+    'Drumstick': [(3, 2), (3, 2), (4, 2), (5, 2), (5, 2), (5, 2), (4, 2), (3, 2), (2, 2), (2, 2), (2, 1)],
+    'Chicken': [(4, 4), (4, 4), (5, 4), (6, 4), (6, 4), (6, 5), (6, 6), (6, 6), (5, 6), (4, 6), (4, 6)],
+}
+
+mock_car_paths_C = {
+    'Drumstick': [(9, 9), (9, 10), (9, 11)],
+    'Chicken': [(7, 9), (8, 9), (9, 9)],
+}
+
+
+def _random_cars_data(seed, car_count, width, height, max_commands):
+    rng = random.Random(seed)
+    cars_data = {}
+    for index in range(car_count):
+        initial_pos = f"{rng.randrange(width)} {rng.randrange(height)} {rng.choice('NESW')}"
+        commands = "".join(rng.choice("FFFLR") for _ in range(rng.randrange(max_commands)))
+        path, _destination = Car(f"car {index}", initial_pos, commands).get_path_and_destination()
+        cars_data[f"car {index}"] = path
+    max_steps = get_max_steps(cars_data)
+    return synchronise_paths(cars_data, max_steps), max_steps
+
+
+class TestPathsToArrays:
+    def test_should_return_step_by_car_arrays_given_synchronised_paths(self):
+        cars_data = synchronise_paths(mock_car_paths_C, 3)
+
+        xs, ys = paths_to_arrays(cars_data, 3)
+
+        assert xs.shape == (3, 2)
+        assert xs[:, 0].tolist() == [9, 9, 9]
+        assert ys[:, 0].tolist() == [9, 10, 11]
+        assert xs[:, 1].tolist() == [7, 8, 9]
+
+
+class TestFleetPathsToArrays:
+    def test_should_return_step_by_car_arrays_given_ragged_tapes(self):
+        fleet = Fleet()
+        fleet.append("A", 1, 2, "N", "FFRFFFFRRL")
+        fleet.append("B", 7, 8, "w", "ff")
+        fleet.append("C", 9, 9, "N", "")
+
+        xs, ys = fleet_paths_to_arrays(fleet)
+
+        assert xs.shape == (11, 3)
+        assert list(zip(xs[:, 0].tolist(), ys[:, 0].tolist())) == \
+            Car("A", "1 2 N", "FFRFFFFRRL").get_path_and_destination()[0]
+        assert xs[:, 1].tolist() == [7, 6, 5] + [5] * 8
+        assert ys[:, 2].tolist() == [9] * 11
+
+    @pytest.mark.parametrize("seed", range(5))
+    def test_should_match_car_paths_given_compressed_and_updated_tapes(self, seed):
+        rng = random.Random(seed)
+        fleet = Fleet()
+        for index in range(30):
+            commands = "".join(rng.choice(["F", "L", "R", "F3", "(FR)x3"]) for _ in range(rng.randrange(12)))
+            fleet.append(f"car {index}", rng.randrange(10), rng.randrange(10), rng.choice("NESW"), commands)
+        fleet.update(3, 0, 0, "E", "LFF")
+
+        xs, ys = fleet_paths_to_arrays(fleet)
+
+        paths = {car_name: list(fleet.get_car(index).iter_positions()) for index, car_name in enumerate(fleet.names)}
+        synced_paths = synchronise_paths(paths, xs.shape[0])
+        for index, car_name in enumerate(fleet.names):
+            assert list(zip(xs[:, index].tolist(), ys[:, index].tolist())) == synced_paths[car_name]
+
+
+class TestGenerateCollisionsVectorized:
+    @pytest.mark.parametrize(
+        "car_paths", [
+            mock_car_paths_A,
+            mock_car_paths_B,
+            mock_car_paths_C,
+        ])
+    def test_should_match_python_engine_given_mock_paths(self, car_paths):
+        max_steps = get_max_steps(car_paths)
+        cars_data = synchronise_paths(car_paths, max_steps)
+
+        expected = generate_collisions(cars_data, max_steps, 10, 10)
+        result = generate_collisions_vectorized(cars_data, max_steps, 10, 10)
+
+        assert dict(result) == dict(expected)
+
+    @pytest.mark.parametrize("seed", range(20))
+    def test_should_match_python_engine_given_random_fleets(self, seed):
+        cars_data, max_steps = _random_cars_data(seed, 40, 6, 6, 60)
+
+        expected = generate_collisions(cars_data, max_steps, 6, 6)
+        result = generate_collisions_vectorized(cars_data, max_steps, 6, 6)
+
+        assert list(result.items()) == list(expected.items())
+        assert generate_incident_reports(result) == generate_incident_reports(expected)
+
+    def test_should_return_empty_dictionary_given_no_cars(self):
+        result = generate_collisions_vectorized({}, 0, 10, 10)
+
+        assert not result.keys()
+
+
+class TestNumpyEngine:
+    def test_should_return_same_results_as_python_engine(self):
+        results = []
+        for engine in ["python", "numpy"]:
+            test_field = Field(10, 10, engine=engine)
+            test_field.add_car("A", "1 2 N", "FFRFFFFRRL")
+            test_field.add_car("B", "7 8 W", "FFLFFFFFFF")
+            test_field.add_car("C", "9 9 N", "")
+            test_field.add_car("D", "0 0 S", "F")
+            results.append(test_field.get_simulated_results())
+
+        assert results[0] == results[1]
+
+    def test_should_return_same_results_as_python_engine_given_compressed_tapes(self):
+        results = []
+        for engine in ["python", "numpy"]:
+            test_field = Field(10, 10, engine=engine)
+            test_field.add_car("A", "1 2 N", "F2RF4R2L")
+            test_field.add_car("B", "7 8 W", "(F)x2LF7")
+            test_field.add_car("C", "0 5 E", "(FFR2)x3")
+            results.append(test_field.get_simulated_results())
+
+        assert results[0] == results[1]
+
+    def test_should_raise_error_given_unknown_engine(self):
+        with pytest.raises(ValueError):
+            Field(10, 10, engine="unknown")
@@ -0,0 +1,84 @@
+import io
+
+import pytest
+
+from batch import read_scenarios, build_field
+from workloads import generate_scenarios, write_text_scenarios, write_jsonl_scenarios
+
+
+def _get_cars(scenario):
+    return list(scenario["cars"])
+
+
+class TestGenerateScenarios:
+    def test_should_generate_cars_on_distinct_cells_inside_field(self):
+        [scenario] = generate_scenarios(1, 30, 20, 500, tape_length=5, seed=1)
+
+        positions = [tuple(map(int, car["position"].split()[:2])) for car in _get_cars(scenario)]
+        assert len(set(positions)) == 500
+        assert all(0 <= x < 30 and 0 <= y < 20 for x, y in positions)
+
+    def test_should_generate_same_scenarios_given_same_seed(self):
+        first = [_get_cars(scenario) for scenario in generate_scenarios(2, 10, 10, 20, seed=4)]
+        second = [_get_cars(scenario) for scenario in generate_scenarios(2, 10, 10, 20, seed=4)]
+        other = [_get_cars(scenario) for scenario in generate_scenarios(2, 10, 10, 20, seed=5)]
+
+        assert first == second
+        assert first != other
+        assert first[0] != first[1]
+
+    def test_should_keep_cars_in_block_given_start_density(self):
+        [scenario] = generate_scenarios(1, 100, 100, 50, start_density=0.5, seed=2)
+
+        xs, ys = zip(*(map(int, car["position"].split()[:2]) for car in _get_cars(scenario)))
+        assert (max(xs) - min(xs) + 1) * (max(ys) - min(ys) + 1) <= 100
+
+    @pytest.mark.parametrize("tape_distribution", ["fixed", "uniform", "exponential", "uneven"])
+    def test_should_follow_tape_length_and_forward_ratio(self, tape_distribution):
+        [scenario] = generate_scenarios(1, 100, 100, 400, tape_length=50, tape_distribution=tape_distribution,
+                                        forward_ratio=0.75, seed=3)
+
+        commands = "".join(car["commands"] for car in _get_cars(scenario))
+        assert 0.5 * 400 * 50 < len(commands) < 1.5 * 400 * 50
+        assert commands.count("F") / len(commands) == pytest.approx(0.75, abs=0.02)
+
+    def test_should_crash_share_of_cars_given_collision_rate(self):
+        [scenario] = generate_scenarios(1, 200, 200, 100, tape_length=3, forward_ratio=0, collision_rate=0.4,
+                                        seed=6)
+        test_field = build_field({"width": 200, "height": 200, "cars": _get_cars(scenario)})
+
+        results = test_field.get_simulated_results()
+
+        assert sum("collides" in result for result in results) == 40
+
+    @pytest.mark.parametrize("start_density", [None, 0.05, 0.5])
+    @pytest.mark.parametrize("collision_rate", [0, 0.3])
+    def test_should_crash_share_of_moving_cars_given_collision_rate(self, start_density, collision_rate):
+        [scenario] = generate_scenarios(1, 100, 80, 200, start_density=start_density, tape_distribution="uneven",
+                                        collision_rate=collision_rate, seed=8)
+        cars = _get_cars(scenario)
+        test_field = build_field({"width": 100, "height": 80, "cars": cars})
+
+        results = test_field.get_simulated_results()
+
+        assert sum("collides" in result for result in results) == 200 * collision_rate
+        assert sum(car["commands"].count("F") for car in cars) > 200 * 20
+
+    def test_should_raise_error_given_too_many_cars(self):
+        with pytest.raises(ValueError):
+            generate_scenarios(1, 3, 3, 10)
+
+
+class TestWriteScenarios:
+    @pytest.mark.parametrize("write_scenarios", [write_text_scenarios, write_jsonl_scenarios])
+    def test_should_write_scenarios_batch_mode_reads_back(self, write_scenarios):
+        output = io.StringIO()
+
+        scenario_count = write_scenarios(generate_scenarios(3, 8, 8, 6, tape_length=4, collision_rate=0.5), output)
+
+        scenarios = list(read_scenarios(io.StringIO(output.getvalue())))
+        expected = [_get_cars(scenario) for scenario in generate_scenarios(3, 8, 8, 6, tape_length=4,
+                                                                            collision_rate=0.5)]
+        assert scenario_count == 3
+        assert [scenario["cars"] for scenario in scenarios] == expected
+        assert [scenario["width"] for scenario in scenarios] == [8, 8, 8]
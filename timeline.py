@@ -0,0 +1,103 @@
+from array import array
+from itertools import islice
+
+from kernel import DIRECTIONS, MOVE_OFFSETS, encode_commands, run_commands
+from tapes import is_plain_tape, parse_tape, iter_tape_commands
+from utils import is_position_out_of_bounds
+
+_MOVING, _STOPPED, _CRASHED = "moving", "stopped", "crashed"
+_NOT_CRASHED = float("inf")
+
+
+class Timeline:
+    def __init__(self, fleet, crash_steps, field_width, field_height, checkpoint_interval):
+        if checkpoint_interval < 1:
+            raise ValueError("Checkpoint interval must be at least 1")
+        self.field_width = field_width
+        self.field_height = field_height
+        self.checkpoint_interval = checkpoint_interval
+        self.names = list(fleet.names)
+        self.max_steps = max(fleet.step_counts, default=0) + 1
+        self._step_counts = array("q", fleet.step_counts)
+        self._indexes = {car_name: index for index, car_name in enumerate(self.names)}
+        # Plain tapes are kept as command codes; tapes with counts or repeat groups are expanded only for the steps
+        # replayed
+        self._commands = [encode_commands(commands) if is_plain_tape(commands) else parse_tape(commands)
+                          for commands in map(fleet.get_commands, range(len(fleet)))]
+        self._crash_steps = [crash_steps.get(car_name, _NOT_CRASHED) for car_name in self.names]
+        self._checkpoints = self._record_checkpoints(fleet)
+
+    def get_first_crash_step(self):
+        first_step = min(self._crash_steps, default=_NOT_CRASHED)
+        return None if first_step == _NOT_CRASHED else first_step
+
+    def get_positions_at_step(self, step_number, car_names=None):
+        return {car_name: position for car_name, (position, _direction, _status) in
+                self.get_state_at_step(step_number, car_names).items()}
+
+    def get_state_at_step(self, step_number, car_names=None):
+        if step_number < 0:
+            raise ValueError("Step must not be negative")
+        step_number = min(step_number, self.max_steps - 1)
+        checkpoint_step = step_number - step_number % self.checkpoint_interval
+        xs, ys, directions = self._checkpoints[checkpoint_step // self.checkpoint_interval]
+        indexes = range(len(self.names)) if car_names is None else [self._indexes[name] for name in car_names]
+
+        states = {}
+        for index in indexes:
+            x, y, direction_index = self._advance(
+                index, xs[index], ys[index], directions[index], checkpoint_step, step_number
+            )
+            if self._crash_steps[index] <= step_number:
+                status = _CRASHED
+            elif step_number >= self._step_counts[index]:
+                status = _STOPPED
+            else:
+                status = _MOVING
+            states[self.names[index]] = ((x, y), DIRECTIONS[direction_index], status)
+        return states
+
+    def _record_checkpoints(self, fleet):
+        car_count = len(self.names)
+        checkpoint_count = (self.max_steps - 1) // self.checkpoint_interval + 1
+        checkpoints = [
+            (array("i", bytes(4 * car_count)), array("i", bytes(4 * car_count)), array("B", bytes(car_count)))
+            for _ in range(checkpoint_count)
+        ]
+        for index in range(car_count):
+            x, y, direction_index = fleet.xs[index], fleet.ys[index], fleet.directions[index]
+            stop_step = min(self._step_counts[index], self._crash_steps[index])
+            step_number = 0
+            for checkpoint_index, (xs, ys, directions) in enumerate(checkpoints):
+                checkpoint_step = checkpoint_index * self.checkpoint_interval
+                if step_number < stop_step:
+                    x, y, direction_index = self._advance(index, x, y, direction_index, step_number, checkpoint_step)
+                    step_number = checkpoint_step
+                    xs[index], ys[index], directions[index] = x, y, direction_index
+                    continue
+                # A car that has stopped keeps the same state in every later checkpoint
+                for xs, ys, directions in checkpoints[checkpoint_index:]:
+                    xs[index], ys[index], directions[index] = x, y, direction_index
+                break
+        return checkpoints
+
+    def _advance(self, index, x, y, direction_index, step_number, target_step):
+        # A crashed car stays where it was wrecked, which is the cell it left when it went through the wall
+        crash_step = self._crash_steps[index]
+        stop_step = min(target_step, crash_step)
+        if step_number < stop_step:
+            x, y, direction_index = run_commands(self._get_command_codes(index, step_number, stop_step), x, y,
+                                                 direction_index)
+
+        if step_number < crash_step <= target_step and is_position_out_of_bounds((x, y), self.field_width,
+                                                                                 self.field_height):
+            delta_x, delta_y = MOVE_OFFSETS[direction_index]
+            x -= delta_x
+            y -= delta_y
+        return x, y, direction_index
+
+    def _get_command_codes(self, index, start_step, stop_step):
+        commands = self._commands[index]
+        if isinstance(commands, bytes):
+            return commands[start_step:stop_step]
+        return encode_commands("".join(islice(iter_tape_commands(commands, start_step), stop_step - start_step)))
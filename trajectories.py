@@ -0,0 +1,175 @@
+import mmap
+import struct
+from array import array
+from itertools import chain, islice
+
+from kernel import DIRECTIONS
+from utils import get_crash_steps, is_position_out_of_bounds
+
+_MAGIC = b"AUTOCARS"
+_FORMAT_VERSION = 1
+# Every count and offset a reader needs is in the header, so no section has to be scanned to find another
+_HEADER = struct.Struct("<8sIIIiiIQQQQQ")
+_CAR_RECORD = struct.Struct("<iiiii")
+_INCIDENT_RECORD = struct.Struct("<iiIII")
+_NAME_OFFSET = struct.Struct("<Q")
+_SECTION_ALIGNMENT = 8
+_NOT_CRASHED = -1
+
+
+def write_trajectory_file(file_path, fleet, collisions, field_width, field_height):
+    car_count = len(fleet)
+    step_count = max(fleet.step_counts, default=0) + 1
+    car_indexes = {car_name: index for index, car_name in enumerate(fleet.names)}
+    crash_steps = get_crash_steps(collisions)
+
+    with open(file_path, "wb") as trajectory_file:
+        trajectory_file.write(bytes(_HEADER.size))
+
+        names_offset = _align(trajectory_file)
+        encoded_names = [car_name.encode("utf-8") for car_name in fleet.names]
+        name_offset = 0
+        for encoded_name in encoded_names:
+            trajectory_file.write(_NAME_OFFSET.pack(name_offset))
+            name_offset += len(encoded_name)
+        trajectory_file.write(_NAME_OFFSET.pack(name_offset))
+        trajectory_file.writelines(encoded_names)
+
+        cars_offset = _align(trajectory_file)
+        for index, car_name in enumerate(fleet.names):
+            trajectory_file.write(_CAR_RECORD.pack(
+                fleet.xs[index], fleet.ys[index], fleet.directions[index], fleet.step_counts[index],
+                crash_steps.get(car_name, _NOT_CRASHED)
+            ))
+
+        # Paths are written one car at a time, so a run does not have to fit in memory to be exported
+        paths_offset = _align(trajectory_file)
+        for index, car_name in enumerate(fleet.names):
+            trajectory = _get_trajectory(
+                fleet.get_car(index), crash_steps.get(car_name), step_count, field_width, field_height
+            )
+            trajectory.tofile(trajectory_file)
+
+        incidents_offset = _align(trajectory_file)
+        incident_cars = array("I")
+        incident_count = 0
+        for (x, y), incidents in collisions.items():
+            for car_names, step_number in incidents:
+                trajectory_file.write(_INCIDENT_RECORD.pack(x, y, step_number, len(incident_cars), len(car_names)))
+                incident_cars.extend(car_indexes[car_name] for car_name in car_names)
+                incident_count += 1
+
+        incident_cars_offset = _align(trajectory_file)
+        incident_cars.tofile(trajectory_file)
+
+        trajectory_file.seek(0)
+        trajectory_file.write(_HEADER.pack(
+            _MAGIC, _FORMAT_VERSION, car_count, step_count, field_width, field_height, incident_count,
+            names_offset, cars_offset, paths_offset, incidents_offset, incident_cars_offset
+        ))
+
+
+class TrajectoryFile:
+    def __init__(self, file_path):
+        with open(file_path, "rb") as trajectory_file:
+            self._buffer = mmap.mmap(trajectory_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._buffer) < _HEADER.size:
+            self._buffer.close()
+            raise ValueError("Not a trajectory file")
+        (magic, version, self.car_count, self.step_count, self.field_width, self.field_height, self.incident_count,
+         self._names_offset, self._cars_offset, paths_offset, self._incidents_offset,
+         incident_cars_offset) = _HEADER.unpack_from(self._buffer)
+        if magic != _MAGIC or version != _FORMAT_VERSION:
+            self._buffer.close()
+            raise ValueError("Not a trajectory file or unsupported version")
+
+        view = memoryview(self._buffer)
+        self._paths = view[paths_offset:paths_offset + self.car_count * self.step_count * 8].cast("i")
+        self._incident_cars = view[incident_cars_offset:incident_cars_offset + self._get_incident_cars_size()].cast("I")
+        view.release()
+        self._car_indexes = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_exception):
+        self.close()
+
+    def __len__(self):
+        return self.car_count
+
+    def close(self):
+        self._paths.release()
+        self._incident_cars.release()
+        self._buffer.close()
+
+    def get_name(self, index):
+        start, end = struct.unpack_from("<QQ", self._buffer, self._names_offset + index * _NAME_OFFSET.size)
+        names_start = self._names_offset + (self.car_count + 1) * _NAME_OFFSET.size
+        return self._buffer[names_start + start:names_start + end].decode("utf-8")
+
+    def get_index(self, car_name):
+        if self._car_indexes is None:
+            self._car_indexes = {self.get_name(index): index for index in range(self.car_count)}
+        return self._car_indexes[car_name]
+
+    def get_car(self, index):
+        x, y, direction_index, command_count, crash_step = _CAR_RECORD.unpack_from(
+            self._buffer, self._cars_offset + index * _CAR_RECORD.size
+        )
+        return {
+            "name": self.get_name(index),
+            "position": (x, y),
+            "direction": DIRECTIONS[direction_index],
+            "commands": command_count,
+            "crash_step": None if crash_step == _NOT_CRASHED else crash_step
+        }
+
+    def get_path(self, index):
+        # x and y alternate, one pair per step; the slice is a view into the mapped file and has to be released
+        # before the file is closed
+        start = index * self.step_count * 2
+        return self._paths[start:start + self.step_count * 2]
+
+    def get_position(self, index, step_number):
+        offset = (index * self.step_count + min(step_number, self.step_count - 1)) * 2
+        return self._paths[offset], self._paths[offset + 1]
+
+    def get_positions_at_step(self, step_number):
+        return [self.get_position(index, step_number) for index in range(self.car_count)]
+
+    def iter_incidents(self):
+        for incident_index in range(self.incident_count):
+            x, y, step_number, cars_start, car_count = _INCIDENT_RECORD.unpack_from(
+                self._buffer, self._incidents_offset + incident_index * _INCIDENT_RECORD.size
+            )
+            car_names = [self.get_name(index) for index in self._incident_cars[cars_start:cars_start + car_count]]
+            yield (x, y), car_names, step_number
+
+    def _get_incident_cars_size(self):
+        if not self.incident_count:
+            return 0
+        _x, _y, _step_number, cars_start, car_count = _INCIDENT_RECORD.unpack_from(
+            self._buffer, self._incidents_offset + (self.incident_count - 1) * _INCIDENT_RECORD.size
+        )
+        return (cars_start + car_count) * 4
+
+
+def _get_trajectory(car, crash_step, step_count, field_width, field_height):
+    path = list(islice(car.iter_positions(), None if crash_step is None else crash_step + 1))
+    # A car going through the wall is wrecked in the cell it left
+    if crash_step is not None and len(path) > crash_step and \
+            is_position_out_of_bounds(path[crash_step], field_width, field_height):
+        path[crash_step] = path[crash_step - 1]
+
+    trajectory = array("i", chain.from_iterable(path))
+    trajectory.extend(path[-1] * (step_count - len(path)))
+    return trajectory
+
+
+def _align(trajectory_file):
+    offset = trajectory_file.tell()
+    padding = -offset % _SECTION_ALIGNMENT
+    trajectory_file.write(bytes(padding))
+    return offset + padding
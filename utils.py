@@ -1,15 +1,46 @@
-import copy
+import re
+from array import array
 from collections import defaultdict
+from itertools import islice
+
+from instrumentation import instrumented
+from results import CarResult
+from tapes import is_tape_valid
+
+_INITIAL_POS_PATTERN = re.compile(r"^(\d+) (\d+) ([nsewNSEW])$")
+_MIN_BROAD_PHASE_WINDOW = 4
+_MAX_BROAD_PHASE_WINDOW = 64
+BROAD_PHASE_TILE = 32
+_MAX_PAIRWISE_BUCKET = 16
+_PARKED_TAIL_CHUNK = 32
+# Grids cost a few bytes a cell, so past this size a dict of occupied cells is the smaller index
+_MAX_GRID_CELLS = 1 << 22
+_MIN_GRID_OCCUPANCY = 1 / 64
+
+
+def is_initial_pos_valid(initial_pos):
+    return _INITIAL_POS_PATTERN.match(initial_pos) is not None
+
+
+def parse_initial_pos(initial_pos):
+    match = _INITIAL_POS_PATTERN.match(initial_pos)
+    if match is None:
+        return None
+    return int(match[1]), int(match[2]), match[3]
+
+
+def is_commands_valid(commands):
+    return is_tape_valid(commands)
 
 
 def is_initial_pos_out_of_bound(initial_pos, width, height):
     [x, y, _] = initial_pos.split(" ")
-    return _is_position_out_of_bounds((int(x), int(y)), width, height)
+    return is_position_out_of_bounds((int(x), int(y)), width, height)
 
 
 def get_single_car_collision(path, width, height):
     for index, position in enumerate(path):
-        if _is_position_out_of_bounds(position, width, height):
+        if is_position_out_of_bounds(position, width, height):
             return index
     return -1
 
@@ -21,6 +52,20 @@ def get_max_steps(cars_data):
     return max_steps
 
 
+def get_total_steps(cars_data):
+    return sum(len(path) for path in cars_data.values())
+
+
+def _count_path_items(_result, cars_data, max_steps, *_args):
+    return {"cars": len(cars_data), "steps": max_steps}
+
+
+def count_collision_items(collisions, cars_data, max_steps, *_args):
+    incidents = sum(len(incidents_at_pos) for incidents_at_pos in collisions.values())
+    return {"cars": len(cars_data), "steps": max_steps, "collisions": incidents}
+
+
+@instrumented("synchronise_paths", _count_path_items)
 def synchronise_paths(cars_data, max_steps):
     synchronized_paths = {}
 
@@ -42,61 +87,429 @@ def update_path_after_collision(path, collision_step):
 
 
 def generate_incident_reports(collisions):
-    reports = {}
+    return {car: result.render() for car, result in generate_incident_records(collisions).items()}
+
+
+@instrumented("generate_incident_reports", lambda records, _collisions: {"reports": len(records)})
+def generate_incident_records(collisions):
+    records = {}
     for position, incidents in collisions.items():
         wrecks = []
 
         for cars, step in incidents:
-            cars_and_wrecks = cars + wrecks[:]
+            for car in cars:
+                records[car] = CarResult.incident(car, position, step, cars, wrecks)
+            wrecks.extend(cars)
 
-            for index, car in enumerate(cars):
-                cars_before = cars_and_wrecks[:index]
-                cars_after = cars_and_wrecks[index + 1:]
-                other_cars = cars_before + cars_after
+    return records
+
+
+def get_crash_steps(collisions):
+    crash_steps = {}
+    for incidents in collisions.values():
+        for car_names, step_number in incidents:
+            for car_name in car_names:
+                crash_steps.setdefault(car_name, step_number)
+    return crash_steps
+
+
+def is_grid_suitable(car_count, field_width, field_height):
+    cell_count = field_width * field_height
+    return 0 < cell_count <= _MAX_GRID_CELLS and car_count >= cell_count * _MIN_GRID_OCCUPANCY
 
-                if not other_cars:
-                    reports[car] = f"- {car}, hits the wall at {position} at step {step}"
-                else:
-                    reports[car] = f"- {car}, collides with {', '.join(other_cars)} at {position} at step {step}"
-                wrecks.append(car)
 
-    return reports
+def generate_collisions(cars_data, max_steps, field_width, field_height, max_window=_MAX_BROAD_PHASE_WINDOW,
+                        use_grid=False):
+    if use_grid:
+        return generate_grid_collisions(cars_data, max_steps, field_width, field_height)
+    # Synchronised paths are padded with the final position, which is the same as the stream running out
+    position_streams = {car_name: islice(path, get_moving_length(path)) for car_name, path in cars_data.items()}
+    return generate_streamed_collisions(position_streams, max_steps, field_width, field_height, max_window)
 
 
-def generate_collisions(cars_data, max_steps, field_width, field_height):
-    mutable_cars_data = copy.deepcopy(cars_data)
+@instrumented("generate_collisions", count_collision_items)
+def generate_streamed_collisions(position_streams, max_steps, field_width, field_height,
+                                 max_window=_MAX_BROAD_PHASE_WINDOW, first_step=1, previous_collisions=None,
+                                 pending_cells=()):
+    # A resumed run starts from the incidents recorded before first_step, every one of which left a wreck
     collisions = defaultdict(list)
+    for position, incidents in (previous_collisions or {}).items():
+        collisions[position] = list(incidents)
+    wreck_cells = set(collisions)
+    # Wrecks and parked cars never move, so a car only meets one by driving through its cell
+    obstacle_cells = set(wreck_cells)
 
-    positions_at_previous_step = defaultdict(list)
-    for step_number in range(max_steps):
-        positions_at_this_step = defaultdict(list)
-        for car_name, path in mutable_cars_data.items():
-            current_pos = path[step_number]
-            positions_at_this_step[current_pos].append(car_name)
+    car_order = {car_name: index for index, car_name in enumerate(position_streams)}
+    active_cars = dict.fromkeys(position_streams)
+    previous_cells = {}
+    cars_at_cell = defaultdict(list)
+    if not max_steps:
+        return collisions
+    for car_name, positions in position_streams.items():
+        initial_pos = next(positions)
+        previous_cells[car_name] = initial_pos
+        cars_at_cell[initial_pos].append(car_name)
 
-        if not positions_at_previous_step:
-            positions_at_previous_step = copy.copy(positions_at_this_step)
-            continue
+    # Cars whose stream has run out stay where they are and are no longer advanced
+    moving_cars = dict(position_streams)
+
+    # Cars sharing a starting cell are only checked once the first step is taken
+    touched_cells = {position for position, car_names in cars_at_cell.items() if len(car_names) > 1}
+    touched_cells.update(pending_cells)
+    # Most crashes in crowded fields happen early, so windows start short and grow while cars survive
+    window_size = min(_MIN_BROAD_PHASE_WINDOW, max_window)
+    window_start = first_step
+    # Once every tape has run out only pending wreck checks can still produce an incident
+    while window_start < max_steps and active_cars and (moving_cars or touched_cells):
+        window_length = min(window_size, max_steps - window_start)
+        window_paths, parked_cars = _read_window_paths(moving_cars, window_length)
+        for car_name in parked_cars:
+            if car_name not in window_paths:
+                obstacle_cells.add(previous_cells[car_name])
+        interacting_cars = _find_interacting_cars(
+            window_paths, window_length, previous_cells, obstacle_cells, field_width, field_height
+        )
+        interacting_streams = {
+            car_name: iter(window_path) for car_name, window_path in window_paths.items()
+            if car_name in interacting_cars
+        }
+
+        for offset in range(window_length):
+            if not interacting_streams and not touched_cells:
+                break
+            step_number = window_start + offset
 
-        for position, car_names_at_pos in positions_at_this_step.items():
-            if _is_position_out_of_bounds(position, field_width, field_height):
-                previous_position = _find_name_in_positions(car_names_at_pos[0], positions_at_previous_step)
-                collisions[previous_position].append((car_names_at_pos, step_number))
-                mutable_cars_data = {
-                    key: value for key, value in mutable_cars_data.items() if key not in car_names_at_pos
-                }
+            cells_left = {}
+            for car_name, positions in list(interacting_streams.items()):
+                current_pos = next(positions, None)
+                if current_pos is None:
+                    del interacting_streams[car_name]
+                    continue
+                previous_pos = previous_cells[car_name]
+                if current_pos == previous_pos:
+                    continue
 
-            if position in collisions.keys() or len(car_names_at_pos) > 1:
+                cars_at_previous_cell = cars_at_cell[previous_pos]
+                cars_at_previous_cell.remove(car_name)
+                if not cars_at_previous_cell:
+                    del cars_at_cell[previous_pos]
+                cars_at_cell[current_pos].append(car_name)
+                previous_cells[car_name] = current_pos
+                cells_left[car_name] = previous_pos
+                touched_cells.add(current_pos)
+
+            incidents, touched_cells = resolve_incidents(
+                touched_cells, cells_left, cars_at_cell, wreck_cells, car_order, field_width, field_height
+            )
+            for position, car_names_at_pos in incidents:
                 collisions[position].append((car_names_at_pos, step_number))
-                mutable_cars_data = {
-                    key: value for key, value in mutable_cars_data.items() if key not in car_names_at_pos
-                }
-        positions_at_previous_step = copy.copy(positions_at_this_step)
+                obstacle_cells.add(position)
+                _remove_cars(car_names_at_pos, active_cars, moving_cars, interacting_streams, previous_cells,
+                             cars_at_cell)
+
+        # Cars that met nobody during the window jump straight to where the window left them
+        for car_name, window_path in window_paths.items():
+            if car_name in active_cars and window_path[-1] != previous_cells[car_name]:
+                _move_car(car_name, window_path[-1], previous_cells, cars_at_cell)
+        for car_name in parked_cars:
+            if car_name in window_paths and car_name in active_cars:
+                obstacle_cells.add(previous_cells[car_name])
+
+        window_start += window_length
+        window_size = min(window_size * 2, max_window)
 
     return collisions
 
 
-def _is_position_out_of_bounds(position, width, height):
+@instrumented("generate_collisions", count_collision_items)
+def generate_grid_collisions(cars_data, max_steps, field_width, field_height):
+    collisions = defaultdict(list)
+    if not max_steps:
+        return collisions
+    names = list(cars_data)
+    paths = list(cars_data.values())
+    car_order = {car_name: index for index, car_name in enumerate(names)}
+
+    # Cells are indexed by y * width + x; a cell holding more than one car keeps the list of them on the side
+    cell_count = field_width * field_height
+    car_counts = array("I", bytes(4 * cell_count))
+    occupants = array("i", [-1]) * cell_count
+    wreck_grid = bytearray(cell_count)
+    crowded_cells = {}
+    outside_cars = defaultdict(list)
+    wreck_cells = set()
+    positions = [path[0] for path in paths]
+    for car, (x, y) in enumerate(positions):
+        if 0 <= x < field_width and 0 <= y < field_height:
+            _add_grid_car(car, y * field_width + x, car_counts, occupants, crowded_cells)
+        else:
+            outside_cars[(x, y)].append(car)
+
+    # Cars sharing a starting cell are only checked once the first step is taken
+    touched_cells = {(cell % field_width, cell // field_width) for cell in crowded_cells}
+    touched_cells.update(position for position, cars in outside_cars.items() if len(cars) > 1)
+    moving_lengths = [get_moving_length(path) for path in paths]
+    moving_cars = [car for car, moving_length in enumerate(moving_lengths) if moving_length > 1]
+    active_cars = bytearray(b"\x01") * len(paths)
+
+    for step_number in range(1, max_steps):
+        if not moving_cars and not touched_cells:
+            break
+
+        cells_left = {}
+        still_moving_cars = []
+        for car in moving_cars:
+            if step_number + 1 < moving_lengths[car]:
+                still_moving_cars.append(car)
+            position = paths[car][step_number]
+            previous_pos = positions[car]
+            if position == previous_pos:
+                continue
+            positions[car] = position
+
+            x, y = previous_pos
+            if 0 <= x < field_width and 0 <= y < field_height:
+                _remove_grid_car(car, y * field_width + x, car_counts, occupants, crowded_cells)
+            else:
+                outside_cars[previous_pos].remove(car)
+
+            x, y = position
+            if 0 <= x < field_width and 0 <= y < field_height:
+                cell = y * field_width + x
+                # Only a shared cell or a wreck can produce an incident, so every other move is a few array writes
+                if _add_grid_car(car, cell, car_counts, occupants, crowded_cells) > 1 or wreck_grid[cell]:
+                    touched_cells.add(position)
+            else:
+                outside_cars[position].append(car)
+                cells_left[names[car]] = previous_pos
+                touched_cells.add(position)
+        moving_cars = still_moving_cars
+
+        if not touched_cells:
+            continue
+        cars_at_cell = {}
+        for position in touched_cells:
+            _collect_grid_cars(position, names, field_width, field_height, car_counts, occupants, crowded_cells,
+                               outside_cars, cars_at_cell)
+            if position in outside_cars:
+                for car in outside_cars[position]:
+                    previous_pos = cells_left.get(names[car])
+                    if previous_pos is not None:
+                        _collect_grid_cars(previous_pos, names, field_width, field_height, car_counts, occupants,
+                                           crowded_cells, outside_cars, cars_at_cell)
+
+        incidents, touched_cells = resolve_incidents(
+            touched_cells, cells_left, cars_at_cell, wreck_cells, car_order, field_width, field_height
+        )
+        for position, car_names_at_pos in incidents:
+            collisions[position].append((car_names_at_pos, step_number))
+            x, y = position
+            if 0 <= x < field_width and 0 <= y < field_height:
+                wreck_grid[y * field_width + x] = 1
+            for car_name in car_names_at_pos:
+                car = car_order[car_name]
+                if not active_cars[car]:
+                    continue
+                active_cars[car] = 0
+                x, y = positions[car]
+                if 0 <= x < field_width and 0 <= y < field_height:
+                    _remove_grid_car(car, y * field_width + x, car_counts, occupants, crowded_cells)
+                else:
+                    outside_cars[positions[car]].remove(car)
+
+        if incidents:
+            moving_cars = [car for car in moving_cars if active_cars[car]]
+        # A cell left with a single car goes back to the grid
+        for cell, cars in list(crowded_cells.items()):
+            if len(cars) < 2:
+                del crowded_cells[cell]
+                if cars:
+                    occupants[cell] = cars[0]
+
+    return collisions
+
+
+def _add_grid_car(car, cell, car_counts, occupants, crowded_cells):
+    if cell in crowded_cells:
+        crowded_cells[cell].append(car)
+    elif car_counts[cell]:
+        crowded_cells[cell] = [occupants[cell], car]
+    else:
+        occupants[cell] = car
+    car_counts[cell] += 1
+    return car_counts[cell]
+
+
+def _remove_grid_car(car, cell, car_counts, occupants, crowded_cells):
+    car_counts[cell] -= 1
+    if cell in crowded_cells:
+        crowded_cells[cell].remove(car)
+    elif occupants[cell] == car:
+        occupants[cell] = -1
+
+
+def _collect_grid_cars(position, names, field_width, field_height, car_counts, occupants, crowded_cells,
+                       outside_cars, cars_at_cell):
+    x, y = position
+    if not 0 <= x < field_width or not 0 <= y < field_height:
+        cars = outside_cars.get(position)
+    elif not car_counts[y * field_width + x]:
+        cars = None
+    else:
+        cell = y * field_width + x
+        cars = crowded_cells[cell] if cell in crowded_cells else [occupants[cell]]
+    if cars:
+        cars_at_cell[position] = [names[car] for car in cars]
+
+
+def resolve_incidents(touched_cells, cells_left, cars_at_cell, wreck_cells, car_order, field_width, field_height):
+    incident_cells = []
+    for position in touched_cells:
+        car_names_at_pos = cars_at_cell.get(position)
+        if not car_names_at_pos:
+            continue
+        previous_position = _get_cell_left(position, car_names_at_pos, cells_left, field_width, field_height)
+        if previous_position is not None:
+            incident_cells.append(position)
+            if previous_position in cars_at_cell:
+                incident_cells.append(previous_position)
+        elif len(car_names_at_pos) > 1 or position in wreck_cells:
+            incident_cells.append(position)
+
+    incidents = []
+    next_touched_cells = set()
+    incident_cars = {
+        position: sorted(cars_at_cell[position], key=car_order.__getitem__) for position in incident_cells
+    }
+    for position, car_names_at_pos in sorted(incident_cars.items(), key=lambda item: car_order[item[1][0]]):
+        previous_position = _get_cell_left(position, car_names_at_pos, cells_left, field_width, field_height)
+        if previous_position is not None:
+            incidents.append((previous_position, car_names_at_pos))
+            wreck_cells.add(previous_position)
+            # A car already processed in this cell during this step is caught by the wreck on the next one
+            next_touched_cells.add(previous_position)
+
+        if position in wreck_cells or len(car_names_at_pos) > 1:
+            incidents.append((position, car_names_at_pos))
+            wreck_cells.add(position)
+
+    return incidents, next_touched_cells
+
+
+def _get_cell_left(position, car_names_at_pos, cells_left, field_width, field_height):
+    if not is_position_out_of_bounds(position, field_width, field_height):
+        return None
+    # A car that started outside the field and has not moved left no cell, so it only counts as standing in one
+    for car_name in car_names_at_pos:
+        if car_name in cells_left:
+            return cells_left[car_name]
+    return None
+
+
+def get_moving_length(path):
+    if not path:
+        return 0
+
+    # Most of a padded tail is skipped a chunk at a time, which compares in C rather than item by item
+    final_position = path[-1]
+    parked_chunk = [final_position] * _PARKED_TAIL_CHUNK
+    tail_start = len(path) - 1
+    while tail_start >= _PARKED_TAIL_CHUNK and path[tail_start - _PARKED_TAIL_CHUNK:tail_start] == parked_chunk:
+        tail_start -= _PARKED_TAIL_CHUNK
+    while tail_start and path[tail_start - 1] == final_position:
+        tail_start -= 1
+    return tail_start + 1
+
+
+def _read_window_paths(moving_cars, window_length):
+    window_paths = {}
+    parked_cars = []
+    for car_name, positions in list(moving_cars.items()):
+        window_path = list(islice(positions, window_length))
+        if len(window_path) < window_length:
+            del moving_cars[car_name]
+            parked_cars.append(car_name)
+        if window_path:
+            window_paths[car_name] = window_path
+    return window_paths, parked_cars
+
+
+def _find_interacting_cars(window_paths, window_length, previous_cells, obstacle_cells, field_width, field_height):
+    interacting_cars = set()
+    boxes = {}
+    buckets = defaultdict(list)
+
+    moving_paths = {}
+    blocked_cells = set(obstacle_cells)
+    for car_name, window_path in window_paths.items():
+        previous_cell = previous_cells[car_name]
+        if window_path.count(previous_cell) == len(window_path):
+            blocked_cells.add(previous_cell)
+        else:
+            moving_paths[car_name] = window_path
+
+    # When the moving cars could cover the whole field nearly every box overlaps another one
+    if len(moving_paths) * window_length >= field_width * field_height:
+        return set(moving_paths)
+
+    for car_name, window_path in moving_paths.items():
+        # The box starts from the previous cell, which is where a car hitting the wall is left
+        previous_cell = previous_cells[car_name]
+        xs, ys = zip(previous_cell, *window_path)
+        box = (min(xs), max(xs), min(ys), max(ys))
+        if box[0] < 0 or box[2] < 0 or box[1] >= field_width or box[3] >= field_height \
+                or previous_cell in blocked_cells or not blocked_cells.isdisjoint(window_path):
+            interacting_cars.add(car_name)
+
+        boxes[car_name] = box
+        for tile_x in range(box[0] // BROAD_PHASE_TILE, box[1] // BROAD_PHASE_TILE + 1):
+            for tile_y in range(box[2] // BROAD_PHASE_TILE, box[3] // BROAD_PHASE_TILE + 1):
+                buckets[(tile_x, tile_y)].append(car_name)
+
+    for car_names in buckets.values():
+        if len(car_names) < 2:
+            continue
+        if len(car_names) > _MAX_PAIRWISE_BUCKET:
+            interacting_cars.update(car_names)
+            continue
+        for index, car_name in enumerate(car_names):
+            for other_car_name in car_names[index + 1:]:
+                if boxes_overlap(boxes[car_name], boxes[other_car_name]):
+                    interacting_cars.add(car_name)
+                    interacting_cars.add(other_car_name)
+
+    return interacting_cars
+
+
+def boxes_overlap(box, other_box):
+    return box[0] <= other_box[1] and other_box[0] <= box[1] and box[2] <= other_box[3] and other_box[2] <= box[3]
+
+
+def _move_car(car_name, position, previous_cells, cars_at_cell):
+    previous_pos = previous_cells[car_name]
+    cars_at_previous_cell = cars_at_cell[previous_pos]
+    cars_at_previous_cell.remove(car_name)
+    if not cars_at_previous_cell:
+        del cars_at_cell[previous_pos]
+    cars_at_cell[position].append(car_name)
+    previous_cells[car_name] = position
+
+
+def _remove_cars(car_names, active_cars, moving_cars, interacting_streams, previous_cells, cars_at_cell):
+    for car_name in car_names:
+        if car_name not in active_cars:
+            continue
+        del active_cars[car_name]
+        moving_cars.pop(car_name, None)
+        interacting_streams.pop(car_name, None)
+        position = previous_cells.pop(car_name)
+        cars_at_position = cars_at_cell[position]
+        cars_at_position.remove(car_name)
+        if not cars_at_position:
+            del cars_at_cell[position]
+
+
+def is_position_out_of_bounds(position, width, height):
     x, y = position
     return not (0 <= x < width and 0 <= y < height)
 
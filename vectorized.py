@@ -0,0 +1,247 @@
+from array import array
+from collections import defaultdict
+from itertools import islice
+
+from instrumentation import instrumented
+from kernel import DIRECTIONS, FORWARD, LEFT, RIGHT, MOVE_OFFSETS, encode_commands
+from tapes import parse_tape, iter_tape_commands
+from utils import count_collision_items
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+_MIN_WINDOW = 16
+_MAX_WINDOW = 1024
+# Pads ragged tapes; a car past the end of its tape neither turns nor moves
+_NO_COMMAND = 3
+_PLAIN_COMMANDS = b"FLR"
+
+
+def is_numpy_available():
+    return np is not None
+
+
+@instrumented("generate_collisions_vectorized", count_collision_items)
+def generate_collisions_vectorized(cars_data, max_steps, field_width, field_height):
+    require_numpy()
+
+    names = list(cars_data.keys())
+    if not names or max_steps == 0:
+        return defaultdict(list)
+
+    xs, ys = paths_to_arrays(cars_data, max_steps)
+    return collide_position_arrays(names, xs, ys, field_width, field_height)
+
+
+def count_fleet_collision_items(collisions, fleet, *_args, **_kwargs):
+    incidents = sum(len(incidents_at_pos) for incidents_at_pos in collisions.values())
+    return {"cars": len(fleet), "steps": max(fleet.step_counts, default=0) + 1, "collisions": incidents}
+
+
+@instrumented("generate_fleet_collisions_vectorized", count_fleet_collision_items)
+def generate_fleet_collisions_vectorized(fleet, field_width, field_height):
+    require_numpy()
+
+    xs, ys = fleet_paths_to_arrays(fleet, get_fleet_step_limits(fleet, field_width, field_height))
+    return collide_position_arrays(fleet.names, xs, ys, field_width, field_height)
+
+
+def get_fleet_step_limits(fleet, field_width, field_height):
+    # Nothing new happens more than a step after the last wall hit or move of any car, which is when a car parked
+    # in the cell a wrecked car left is caught, so tapes are only expanded up to there
+    last_step = max((fleet.get_car(index).get_last_active_step(field_width, field_height)
+                     for index in range(len(fleet))), default=0)
+    return array("q", [min(step_count, last_step + 1) for step_count in fleet.step_counts])
+
+
+def fleet_paths_to_arrays(fleet, step_counts=None):
+    require_numpy()
+
+    if step_counts is None:
+        step_counts = fleet.step_counts
+    steps = max(step_counts, default=0) + 1
+    xs = np.empty((steps, len(fleet)), dtype=np.int64)
+    ys = np.empty((steps, len(fleet)), dtype=np.int64)
+    fill_path_arrays(xs, ys, *get_fleet_columns(fleet, step_counts=step_counts))
+    return xs, ys
+
+
+def get_fleet_columns(fleet, start=0, stop=None, step_counts=None):
+    require_numpy()
+
+    if step_counts is None:
+        step_counts = fleet.step_counts
+    cars = slice(start, stop)
+    command_starts = np.frombuffer(fleet.command_starts, dtype=np.int64)[cars]
+    command_counts = np.frombuffer(fleet.command_counts, dtype=np.int64)[cars]
+    commands = np.frombuffer(bytes(fleet.commands), dtype=np.uint8)
+    if start or stop is not None:
+        # Only this range's tapes are kept, packed back to back
+        commands = commands[_get_ragged_indexes(command_starts, command_counts)]
+        command_starts = np.cumsum(command_counts) - command_counts
+    return (
+        np.frombuffer(fleet.xs, dtype=np.int32)[cars], np.frombuffer(fleet.ys, dtype=np.int32)[cars],
+        np.frombuffer(fleet.directions, dtype=np.uint8)[cars], np.frombuffer(step_counts, dtype=np.int64)[cars],
+        commands, command_starts, command_counts
+    )
+
+
+def fill_path_arrays(xs, ys, initial_xs, initial_ys, directions, step_counts, commands, command_starts,
+                     command_counts):
+    require_numpy()
+
+    steps, car_count = xs.shape
+    command_codes, code_starts = _get_command_codes(commands, command_starts, command_counts, step_counts)
+
+    # Tapes are laid out one row per car and turned so a step's commands for every car are contiguous
+    codes = np.full((car_count, steps), _NO_COMMAND, dtype=np.uint8)
+    in_tape = np.arange(steps - 1) < step_counts[:, None]
+    codes[:, 1:][in_tape] = command_codes[_get_ragged_indexes(code_starts, step_counts)]
+    codes = np.ascontiguousarray(codes.T)
+
+    # Headings only matter mod 4, so the running sum may wrap around int8
+    turns = np.zeros(_NO_COMMAND + 1, dtype=np.int8)
+    turns[LEFT], turns[RIGHT] = -1, 1
+    headings = np.cumsum(turns[codes], axis=0, dtype=np.int8)
+    headings += directions.astype(np.int8)
+    headings &= len(DIRECTIONS) - 1
+
+    move_indexes = headings.astype(np.uint8)
+    move_indexes <<= 2
+    move_indexes |= codes
+    del headings, codes
+    deltas_x, deltas_y = np.zeros((2, len(DIRECTIONS) << 2), dtype=np.int8)
+    for direction_index, (delta_x, delta_y) in enumerate(MOVE_OFFSETS):
+        deltas_x[direction_index << 2 | FORWARD] = delta_x
+        deltas_y[direction_index << 2 | FORWARD] = delta_y
+
+    np.cumsum(deltas_x[move_indexes], axis=0, dtype=np.int64, out=xs)
+    xs += initial_xs
+    np.cumsum(deltas_y[move_indexes], axis=0, dtype=np.int64, out=ys)
+    ys += initial_ys
+
+
+def paths_to_arrays(cars_data, max_steps):
+    require_numpy()
+
+    positions = np.array([path[:max_steps] for path in cars_data.values()], dtype=np.int64)
+    positions = positions.reshape(len(cars_data), max_steps, 2)
+    return np.ascontiguousarray(positions[:, :, 0].T), np.ascontiguousarray(positions[:, :, 1].T)
+
+
+def collide_position_arrays(names, xs, ys, field_width, field_height):
+    require_numpy()
+
+    collisions = defaultdict(list)
+    steps, car_count = xs.shape
+    active = np.ones(car_count, dtype=bool)
+    wreck_codes = np.empty(0, dtype=np.int64)
+
+    window = _MIN_WINDOW
+    step = 1
+    while step < steps:
+        index = np.flatnonzero(active)
+        if index.size == 0:
+            break
+
+        stop = min(step + window, steps)
+        event_offset = _find_first_event(
+            xs[step:stop, index], ys[step:stop, index], wreck_codes, field_width, field_height
+        )
+        if event_offset == -1:
+            step = stop
+            window = min(window * 2, _MAX_WINDOW)
+            continue
+
+        step += event_offset
+        _resolve_step(names, xs, ys, step, index, active, collisions, wreck_codes, field_width, field_height)
+        wreck_codes = np.array(
+            [_encode_cell(x, y, field_width) for x, y in collisions.keys()], dtype=np.int64
+        )
+        step += 1
+        window = _MIN_WINDOW
+
+    return collisions
+
+
+def _find_first_event(window_x, window_y, wreck_codes, field_width, field_height):
+    outside = (window_x < 0) | (window_x >= field_width) | (window_y < 0) | (window_y >= field_height)
+    events = outside.any(axis=1)
+
+    codes = _encode_cell(window_x, window_y, field_width)
+    if codes.shape[1] > 1:
+        sorted_codes = np.sort(codes, axis=1)
+        events |= (sorted_codes[:, 1:] == sorted_codes[:, :-1]).any(axis=1)
+    if wreck_codes.size:
+        events |= np.isin(codes, wreck_codes).any(axis=1)
+
+    event_steps = np.flatnonzero(events)
+    if event_steps.size == 0:
+        return -1
+    return int(event_steps[0])
+
+
+def _resolve_step(names, xs, ys, step, index, active, collisions, wreck_codes, field_width, field_height):
+    step_x = xs[step, index]
+    step_y = ys[step, index]
+    codes = _encode_cell(step_x, step_y, field_width)
+    outside = (step_x < 0) | (step_x >= field_width) | (step_y < 0) | (step_y >= field_height)
+
+    _unique_codes, inverse, counts = np.unique(codes, return_inverse=True, return_counts=True)
+    relevant = outside | (counts[inverse.reshape(-1)] > 1)
+    if wreck_codes.size:
+        relevant |= np.isin(codes, wreck_codes)
+    if outside.any():
+        previous_index = index[outside]
+        previous_codes = _encode_cell(xs[step - 1, previous_index], ys[step - 1, previous_index], field_width)
+        relevant |= np.isin(codes, previous_codes)
+
+    positions_at_this_step = {}
+    for car_index in index[relevant].tolist():
+        position = (int(xs[step, car_index]), int(ys[step, car_index]))
+        positions_at_this_step.setdefault(position, []).append(car_index)
+
+    for (x, y), car_indexes in positions_at_this_step.items():
+        car_names_at_pos = [names[car_index] for car_index in car_indexes]
+
+        if not (0 <= x < field_width and 0 <= y < field_height):
+            first_index = car_indexes[0]
+            previous_position = (int(xs[step - 1, first_index]), int(ys[step - 1, first_index]))
+            collisions[previous_position].append((car_names_at_pos, step))
+            active[car_indexes] = False
+
+        if (x, y) in collisions.keys() or len(car_names_at_pos) > 1:
+            collisions[(x, y)].append((car_names_at_pos, step))
+            active[car_indexes] = False
+
+
+def _get_command_codes(commands, command_starts, command_counts, step_counts):
+    if not commands.tobytes().translate(None, _PLAIN_COMMANDS):
+        return np.frombuffer(encode_commands(commands.tobytes()), dtype=np.uint8), command_starts
+
+    # Some tapes use counts or repeat groups, so each tape is expanded into a buffer of its own, only as far as the
+    # steps its car is simulated for
+    text = commands.tobytes().decode("ascii")
+    tapes = [
+        encode_commands("".join(islice(iter_tape_commands(parse_tape(text[start:start + count])), step_count)))
+        for start, count, step_count in zip(command_starts.tolist(), command_counts.tolist(), step_counts.tolist())
+    ]
+    tape_lengths = np.fromiter(map(len, tapes), dtype=np.int64, count=len(tapes))
+    return np.frombuffer(b"".join(tapes), dtype=np.uint8), np.cumsum(tape_lengths) - tape_lengths
+
+
+def _get_ragged_indexes(starts, lengths):
+    offsets = np.cumsum(lengths) - lengths
+    return np.arange(int(lengths.sum())) + np.repeat(starts - offsets, lengths)
+
+
+def _encode_cell(x, y, field_width):
+    # Active cars are never more than one cell outside the field, so a one-cell border is enough
+    return (y + 1) * (field_width + 2) + (x + 1)
+
+
+def require_numpy():
+    if np is None:
+        raise ImportError("The numpy collision engine requires numpy to be installed")
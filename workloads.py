@@ -0,0 +1,185 @@
+import json
+import math
+import random
+
+from kernel import DIRECTIONS, MOVE_OFFSETS
+
+TAPE_LENGTH_DISTRIBUTIONS = {
+    "fixed": lambda rng, mean_length: mean_length,
+    "uniform": lambda rng, mean_length: rng.randint(0, 2 * mean_length),
+    "exponential": lambda rng, mean_length: int(rng.expovariate(1 / mean_length)) if mean_length else 0,
+    # Most tapes are short and a few are very long, like the benchmark's uneven layout
+    "uneven": lambda rng, mean_length: int(5 * mean_length * rng.random() ** 4),
+}
+# Colliding pairs start two cells apart facing each other and meet in the cell between them
+_PAIR_BLOCK_WIDTH = 3
+_FORWARD, _LEFT, _RIGHT = b"FLR"
+_FEISTEL_ROUNDS = 4
+
+
+def generate_scenarios(scenario_count, width, height, cars, start_density=None, tape_length=100,
+                       tape_distribution="fixed", forward_ratio=0.6, collision_rate=0.0, seed=0):
+    if tape_distribution not in TAPE_LENGTH_DISTRIBUTIONS:
+        raise ValueError(f"Unknown tape length distribution \"{tape_distribution}\"")
+    if not 0 <= forward_ratio <= 1 or not 0 <= collision_rate <= 1:
+        raise ValueError("Ratios must be between 0 and 1")
+
+    layout = _plan_layout(width, height, cars, start_density, collision_rate)
+    return _iter_scenarios(scenario_count, width, height, layout, tape_length,
+                           TAPE_LENGTH_DISTRIBUTIONS[tape_distribution], forward_ratio, seed)
+
+
+def _iter_scenarios(scenario_count, width, height, layout, tape_length, tape_distribution, forward_ratio, seed):
+    for scenario_index in range(scenario_count):
+        yield {
+            "id": str(scenario_index + 1),
+            "width": width,
+            "height": height,
+            # Cars are only generated while the scenario is written, so a scenario never has to fit in memory
+            "cars": _generate_cars(random.Random(f"{seed}/{scenario_index}"), layout, tape_length,
+                                   tape_distribution, forward_ratio)
+        }
+
+
+def write_text_scenarios(scenarios, output):
+    scenario_count = 0
+    for scenario in scenarios:
+        if scenario_count:
+            output.write("\n")
+        output.write(f"{scenario['width']} {scenario['height']}\n")
+        output.writelines(
+            f"{car['name']} {car['position']} {car['commands']}\n" for car in scenario["cars"]
+        )
+        scenario_count += 1
+    output.flush()
+    return scenario_count
+
+
+def write_jsonl_scenarios(scenarios, output):
+    scenario_count = 0
+    for scenario in scenarios:
+        output.write(f"{{\"id\": {json.dumps(scenario['id'])}, \"width\": {scenario['width']}, "
+                     f"\"height\": {scenario['height']}, \"cars\": [")
+        for car_index, car in enumerate(scenario["cars"]):
+            output.write(json.dumps(car) if not car_index else ", " + json.dumps(car))
+        output.write("]}\n")
+        scenario_count += 1
+    output.flush()
+    return scenario_count
+
+
+SCENARIO_WRITERS = {
+    "jsonl": write_jsonl_scenarios,
+    "text": write_text_scenarios
+}
+
+
+def _plan_layout(width, height, cars, start_density, collision_rate):
+    pair_count = int(cars * collision_rate) // 2
+    single_count = cars - 2 * pair_count
+    if start_density is None:
+        area = width * height
+    elif 0 < start_density <= 1:
+        area = math.ceil((single_count + _PAIR_BLOCK_WIDTH * pair_count) / start_density)
+    else:
+        raise ValueError("Start density must be greater than 0 and at most 1")
+
+    # Cars start in a block around the middle of the field that holds them at the requested density
+    region_width = min(width, max(math.isqrt(area - 1) + 1 if area else 0, -(-area // height) if height else 0,
+                                  _PAIR_BLOCK_WIDTH if pair_count else 1))
+    blocks_per_row = region_width // _PAIR_BLOCK_WIDTH
+    if (pair_count and not blocks_per_row) or (cars and not region_width):
+        raise ValueError(f"{cars} cars do not fit in a {width} x {height} field")
+    pair_rows = -(-pair_count // blocks_per_row) if pair_count else 0
+    single_rows = -(-single_count // region_width) if single_count else 0
+    region_height = max(pair_rows + single_rows, -(-area // region_width) if region_width else 0)
+    if region_height > height:
+        raise ValueError(f"{cars} cars do not fit in a {width} x {height} field")
+
+    left = (width - region_width) // 2
+    bottom = (height - region_height) // 2
+    single_rows = region_height - pair_rows
+    # Every car outside the colliding pairs drives up and down a lane of its own, cut as long as still fits them all
+    lane_length = region_width // -(-single_count // single_rows) if single_count else 1
+    return {
+        "pair_count": pair_count, "single_count": single_count, "left": left, "bottom": bottom,
+        "blocks_per_row": blocks_per_row, "pair_rows": pair_rows, "single_rows": single_rows,
+        "lane_length": lane_length, "lanes_per_row": region_width // lane_length
+    }
+
+
+def _generate_cars(rng, layout, tape_length, tape_distribution, forward_ratio):
+    command_table = _get_command_table(forward_ratio)
+
+    def get_commands():
+        return rng.randbytes(tape_distribution(rng, tape_length)).translate(command_table)
+
+    left, bottom = layout["left"], layout["bottom"]
+    car_index = 0
+    for block in _iter_shuffled(rng, layout["pair_rows"] * layout["blocks_per_row"], layout["pair_count"]):
+        row, column = divmod(block, layout["blocks_per_row"])
+        x, y = left + column * _PAIR_BLOCK_WIDTH, bottom + row
+        # Both cars drive into the middle cell on their first step, then carry on with a random tape
+        yield {"name": f"car {car_index}", "position": f"{x} {y} E", "commands": "F" + get_commands().decode("ascii")}
+        yield {"name": f"car {car_index + 1}", "position": f"{x + _PAIR_BLOCK_WIDTH - 1} {y} W",
+               "commands": "F" + get_commands().decode("ascii")}
+        car_index += 2
+
+    bottom += layout["pair_rows"]
+    lane_length = layout["lane_length"]
+    for lane in _iter_shuffled(rng, layout["single_rows"] * layout["lanes_per_row"], layout["single_count"]):
+        row, column = divmod(lane, layout["lanes_per_row"])
+        start = left + column * lane_length
+        x, direction_index = start + rng.randrange(lane_length), rng.randrange(len(DIRECTIONS))
+        commands = _keep_in_lane(get_commands(), x, direction_index, start, start + lane_length - 1)
+        yield {"name": f"car {car_index}", "position": f"{x} {bottom + row} {DIRECTIONS[direction_index]}",
+               "commands": commands.decode("ascii")}
+        car_index += 1
+
+
+def _keep_in_lane(commands, x, direction_index, start, end):
+    # Turns face the car the way with more room, and a forward move that would leave the lane becomes a turn that
+    # the next drivable turn pays back, so cars never meet outside the colliding pairs and the ratio still holds
+    kept = bytearray(commands)
+    owed_moves = 0
+    for index, command in enumerate(kept):
+        room = (0, end - x, 0, x - start)
+        if command == _FORWARD and not room[direction_index]:
+            owed_moves += 1
+            command = _LEFT
+        elif command != _FORWARD and owed_moves and room[direction_index]:
+            owed_moves -= 1
+            command = _FORWARD
+
+        if command == _FORWARD:
+            x += MOVE_OFFSETS[direction_index][0]
+        else:
+            command = _RIGHT if room[(direction_index + 1) % len(room)] >= room[direction_index - 1] else _LEFT
+            direction_index = (direction_index + (1 if command == _RIGHT else -1)) % len(room)
+        kept[index] = command
+    return kept
+
+
+def _get_command_table(forward_ratio):
+    # Random bytes are mapped straight onto commands, so ratios are kept to the nearest 1/256
+    forward_count = round(forward_ratio * 256)
+    left_count = (256 - forward_count) // 2
+    return b"F" * forward_count + b"L" * left_count + b"R" * (256 - forward_count - left_count)
+
+
+def _iter_shuffled(rng, size, count):
+    # A keyed Feistel network permutes the power-of-two range covering size and values past the end are skipped,
+    # so distinct cells are drawn without keeping a set of the used ones
+    half_bits = max(1, ((size - 1).bit_length() + 1) // 2)
+    mask = (1 << half_bits) - 1
+    keys = [rng.getrandbits(32) for _ in range(_FEISTEL_ROUNDS)]
+    for index in range(1 << 2 * half_bits):
+        if not count:
+            return
+        left, right = index >> half_bits, index & mask
+        for key in keys:
+            left, right = right, left ^ ((((right ^ key) * 0x9E3779B1) >> half_bits ^ right * 0x85EBCA6B) & mask)
+        cell = left << half_bits | right
+        if cell < size:
+            yield cell
+            count -= 1